@@ -0,0 +1,327 @@
+"""
+Two-tier caching.
+
+TwoTierCache is the default cache backend. Reads go to a small
+in-process LRU first and fall back to a shared backend (the 'shared'
+alias in CACHES: file-based or database) that every worker sees. Writes
+go through to both. A value copied into the local tier lives there for
+at most LOCAL_TIMEOUT seconds, so another worker's write or
+invalidation shows up here within that window.
+
+Namespace gives each app its own key space with versioned
+invalidation: keys embed the namespace's current version token and
+invalidate() swaps the token, so every old key becomes unreachable at
+once and expires on its own.
+
+Hits and misses are counted per namespace in each process and added to
+totals in the shared tier every STATS_INTERVAL seconds; stats() reads
+the totals back for the admin dashboard.
+"""
+
+import pickle
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+LOCAL_MAX_ENTRIES = 1000
+LOCAL_TIMEOUT = 5
+STATS_INTERVAL = 30
+
+STATS_PREFIX = 'cachestats'
+STATS_GROUPS_KEY = f'{STATS_PREFIX}:groups'
+
+# Hit and miss kinds
+LOCAL_HIT = 'local'
+SHARED_HIT = 'shared'
+MISS = 'miss'
+KINDS = (LOCAL_HIT, SHARED_HIT, MISS)
+
+_MISSING = object()
+
+# Local tiers and their counters are per process, not per thread: Django
+# creates a backend instance for every thread, so they live here keyed
+# by LOCATION, as LocMemCache does it.
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+
+def key_group(key):
+    """
+    The namespace a key is counted under: everything before the first
+    colon, the fragment name for {% cache %} keys, else 'other'.
+    """
+    if ':' in key:
+        return key.split(':', 1)[0]
+    if key.startswith('template.cache.'):
+        return key.rsplit('.', 1)[0]
+    return 'other'
+
+
+# ----------------------------
+# LOCAL TIER
+# ----------------------------
+
+class _LocalTier:
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.pending = Counter()
+        self.last_flush = time.monotonic()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires, pickled = entry
+            if expires <= time.monotonic():
+                del self.entries[key]
+                return _MISSING
+            self.entries.move_to_end(key)
+        return pickle.loads(pickled)
+
+    def set(self, key, value, timeout):
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self.entries[key] = (time.monotonic() + timeout, pickled)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            return self.entries.pop(key, None) is not None
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def count(self, key, kind):
+        with self.lock:
+            self.pending[(key_group(key), kind)] += 1
+
+    def take_pending(self, interval):
+        """Hand back the unflushed counts once `interval` seconds have passed."""
+        with self.lock:
+            now = time.monotonic()
+            if now - self.last_flush < interval or not self.pending:
+                return None
+            pending, self.pending = self.pending, Counter()
+            self.last_flush = now
+        return pending
+
+
+# ----------------------------
+# BACKEND
+# ----------------------------
+
+class TwoTierCache(BaseCache):
+    """
+    OPTIONS:
+        SHARED              alias of the shared backend ('shared')
+        LOCAL_MAX_ENTRIES   LRU bound of the local tier per process
+        LOCAL_TIMEOUT       seconds a value may be served locally
+        STATS_INTERVAL      seconds between hit/miss count flushes
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = options.get('SHARED', 'shared')
+        self.local_timeout = options.get('LOCAL_TIMEOUT', LOCAL_TIMEOUT)
+        self.stats_interval = options.get('STATS_INTERVAL', STATS_INTERVAL)
+
+        with _tiers_lock:
+            self.local = _tiers.setdefault(
+                location,
+                _LocalTier(options.get('LOCAL_MAX_ENTRIES', LOCAL_MAX_ENTRIES))
+            )
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _local_timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT or timeout is None:
+            return self.local_timeout
+        return min(timeout, self.local_timeout)
+
+    # Reads
+
+    def get(self, key, default=None, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        value = self.local.get(local_key)
+        if value is not _MISSING:
+            self._count(key, LOCAL_HIT)
+            return value
+
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self._count(key, MISS)
+            return default
+
+        self._count(key, SHARED_HIT)
+        self.local.set(local_key, value, self.local_timeout)
+        return value
+
+    def has_key(self, key, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        if self.local.get(local_key) is not _MISSING:
+            return True
+        return self.shared.has_key(key, version=version)
+
+    # Writes
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        self.shared.set(key, value, timeout, version=version)
+        self._store_locally(local_key, value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        if not self.shared.add(key, value, timeout, version=version):
+            return False
+        self._store_locally(local_key, value, timeout)
+        return True
+
+    def _store_locally(self, local_key, value, timeout):
+        local_timeout = self._local_timeout(timeout)
+        if local_timeout > 0:
+            self.local.set(local_key, value, local_timeout)
+        else:
+            self.local.delete(local_key)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self.local.delete(self.make_and_validate_key(key, version=version))
+        return self.shared.touch(key, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self.local.delete(self.make_and_validate_key(key, version=version))
+        return self.shared.incr(key, delta, version=version)
+
+    def delete(self, key, version=None):
+        self.local.delete(self.make_and_validate_key(key, version=version))
+        return self.shared.delete(key, version=version)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    # Stats
+
+    def _count(self, key, kind):
+        self.local.count(key, kind)
+        pending = self.local.take_pending(self.stats_interval)
+        if pending:
+            self._flush(pending)
+
+    def flush_stats(self):
+        pending = self.local.take_pending(0)
+        if pending:
+            self._flush(pending)
+
+    def _flush(self, pending):
+        shared = self.shared
+        for (group, kind), delta in pending.items():
+            key = f'{STATS_PREFIX}:{group}:{kind}'
+            shared.add(key, 0, None)
+            try:
+                shared.incr(key, delta)
+            except ValueError:
+                # Evicted between add() and incr()
+                shared.set(key, delta, None)
+
+        groups = shared.get(STATS_GROUPS_KEY, set())
+        new = {group for group, _ in pending} - groups
+        if new:
+            shared.set(STATS_GROUPS_KEY, groups | new, None)
+
+    def stats(self):
+        """
+        Hit/miss totals across every worker, one dict per namespace,
+        including this process's counts not yet flushed.
+        """
+        self.flush_stats()
+        shared = self.shared
+        groups = sorted(shared.get(STATS_GROUPS_KEY, set()))
+        keys = [f'{STATS_PREFIX}:{group}:{kind}' for group in groups for kind in KINDS]
+        totals = shared.get_many(keys)
+
+        rows = []
+        for group in groups:
+            counts = {kind: totals.get(f'{STATS_PREFIX}:{group}:{kind}', 0) for kind in KINDS}
+            hits = counts[LOCAL_HIT] + counts[SHARED_HIT]
+            lookups = hits + counts[MISS]
+            rows.append({
+                'namespace': group,
+                'local_hits': counts[LOCAL_HIT],
+                'shared_hits': counts[SHARED_HIT],
+                'misses': counts[MISS],
+                'hit_rate': hits / lookups if lookups else None,
+            })
+        return rows
+
+
+def stats():
+    """Hit/miss totals of the default cache, or [] if it is not two-tier."""
+    backend = caches['default']
+    if isinstance(backend, TwoTierCache):
+        return backend.stats()
+    return []
+
+
+# ----------------------------
+# NAMESPACES
+# ----------------------------
+
+class Namespace:
+    """
+    An app's key space, e.g. Namespace('courses', 'catalogue'). Keys
+    are stored as 'courses.catalogue:<version>:<key>'; invalidate()
+    moves the namespace to a new version. Tokens are random rather than
+    a counter so a version can never come round again while old keys
+    are still cached.
+    """
+
+    def __init__(self, app, name, timeout=DEFAULT_TIMEOUT):
+        self.name = f'{app}.{name}'
+        self.timeout = timeout
+        self.version_key = f'versions:{self.name}'
+
+    def version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            cache.add(self.version_key, uuid.uuid4().hex, None)
+            version = cache.get(self.version_key)
+        return version
+
+    def key(self, key):
+        return f'{self.name}:{self.version()}:{key}'
+
+    def get(self, key, default=None):
+        return cache.get(self.key(key), default)
+
+    def set(self, key, value, timeout=None):
+        cache.set(self.key(key), value, self.timeout if timeout is None else timeout)
+
+    def get_or_set(self, key, default, timeout=None):
+        """Cached value of key, or call default(), cache and return its result."""
+        key = self.key(key)
+        value = cache.get(key, _MISSING)
+        if value is _MISSING:
+            value = default()
+            cache.set(key, value, self.timeout if timeout is None else timeout)
+        return value
+
+    def delete(self, key):
+        cache.delete(self.key(key))
+
+    def invalidate(self):
+        cache.set(self.version_key, uuid.uuid4().hex, None)
@@ -0,0 +1,305 @@
+"""
+Opt-in request profiling.
+
+With PROFILING_ENABLED = True, a staff or admin user can add ?profile=1
+to any URL. The request is run under a stack sampler: a background
+thread reads the request thread's stack every PROFILING_INTERVAL seconds
+and counts identical stacks. Sampling keeps the overhead flat however
+many Python calls the view makes (template rendering, ORM, PDF work),
+which deterministic profilers like cProfile do not.
+
+Profiles are written to PROFILING_DIR/<url name>/ as collapsed stacks
+(the flamegraph.pl / speedscope input format) plus a JSON summary. The
+newest PROFILING_KEEP profiles are kept per URL name.
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+import zlib
+from collections import Counter
+from html import escape
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+
+QUERY_PARAM = 'profile'
+
+DEFAULT_INTERVAL = 0.001
+DEFAULT_KEEP = 20
+
+_SAFE_NAME = re.compile(r'^[\w-]+$')
+
+
+def profile_dir():
+    return str(getattr(settings, 'PROFILING_DIR', settings.BASE_DIR / 'profiles'))
+
+
+def can_profile(user):
+    return user.is_authenticated and (user.is_staff or getattr(user, 'role', None) == 'admin')
+
+
+# ----------------------------
+# STACK SAMPLER
+# ----------------------------
+
+def _short_path(filename):
+    base = str(settings.BASE_DIR) + os.sep
+    if filename.startswith(base):
+        return filename[len(base):]
+    _, sep, tail = filename.partition('site-packages' + os.sep)
+    return tail if sep else os.path.basename(filename)
+
+
+def frame_label(frame):
+    code = frame.f_code
+    label = f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+    return label.replace(';', ':')
+
+
+class StackSampler:
+    """
+    Context manager sampling the calling thread. Stacks are recorded
+    root-first and stop at the frame that entered the sampler.
+
+    The sampler needs the GIL to run, so CPU-bound code is sampled at
+    most once per sys.getswitchinterval() (5 ms by default).
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self._ident = threading.get_ident()
+        self._base = sys._getframe(1)
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self._base = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._ident)
+            stack = []
+            while frame is not None and frame is not self._base:
+                stack.append(frame_label(frame))
+                frame = frame.f_back
+            if stack and not self._stop.is_set():
+                stack.reverse()
+                self.stacks[tuple(stack)] += 1
+                self.samples += 1
+
+
+# ----------------------------
+# STORAGE
+# ----------------------------
+
+def _url_dir_name(url_name):
+    return re.sub(r'[^\w-]', '_', url_name or '') or '_unnamed'
+
+
+def save_profile(url_name, summary, stacks):
+    """
+    Write collapsed stacks and a JSON summary; returns the profile ID,
+    "<url dir>/<timestamp>-<suffix>".
+    """
+    name = _url_dir_name(url_name)
+    directory = os.path.join(profile_dir(), name)
+    os.makedirs(directory, exist_ok=True)
+
+    stamp = f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:6]}"
+    base = os.path.join(directory, stamp)
+
+    with open(base + '.folded', 'w', encoding='utf-8') as fh:
+        fh.write(collapsed(stacks))
+
+    with open(base + '.json', 'w', encoding='utf-8') as fh:
+        json.dump({
+            **summary,
+            'id': f"{name}/{stamp}",
+            'name': name,
+            'stamp': stamp,
+            'url_name': url_name,
+        }, fh)
+
+    _prune(directory, getattr(settings, 'PROFILING_KEEP', DEFAULT_KEEP))
+    return f"{name}/{stamp}"
+
+
+def _prune(directory, keep):
+    stamps = sorted(
+        (entry[:-5] for entry in os.listdir(directory) if entry.endswith('.json')),
+        reverse=True
+    )
+    for stamp in stamps[keep:]:
+        for ext in ('.json', '.folded'):
+            try:
+                os.unlink(os.path.join(directory, stamp + ext))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles(limit=50):
+    """Stored profile summaries, slowest first."""
+    root = profile_dir()
+    summaries = []
+
+    if os.path.isdir(root):
+        for name in os.listdir(root):
+            directory = os.path.join(root, name)
+            if not os.path.isdir(directory):
+                continue
+            for entry in os.listdir(directory):
+                if not entry.endswith('.json'):
+                    continue
+                try:
+                    with open(os.path.join(directory, entry), encoding='utf-8') as fh:
+                        summaries.append(json.load(fh))
+                except (OSError, ValueError):
+                    continue
+
+    summaries.sort(key=lambda s: s['duration_ms'], reverse=True)
+    return summaries[:limit]
+
+
+def load_stacks(profile_id):
+    """
+    Read a profile back as a Counter of stacks. Raises FileNotFoundError
+    for unknown or malformed IDs.
+    """
+    name, _, stamp = profile_id.partition('/')
+    if not (_SAFE_NAME.match(name) and _SAFE_NAME.match(stamp)):
+        raise FileNotFoundError(profile_id)
+
+    stacks = Counter()
+    with open(os.path.join(profile_dir(), name, stamp + '.folded'), encoding='utf-8') as fh:
+        for line in fh:
+            stack, _, count = line.rstrip('\n').rpartition(' ')
+            stacks[tuple(stack.split(';'))] += int(count)
+    return stacks
+
+
+def collapsed(stacks):
+    return ''.join(f"{';'.join(stack)} {count}\n" for stack, count in stacks.most_common())
+
+
+# ----------------------------
+# FLAMEGRAPH
+# ----------------------------
+
+FRAME_HEIGHT = 16
+SVG_WIDTH = 1200
+MIN_WIDTH = 0.5
+
+
+def _colour(label):
+    h = zlib.crc32(label.split(' (')[0].encode()) & 0xFFFF
+    return f"rgb({205 + h % 50},{(h >> 4) % 180 + 40},{(h >> 8) % 55})"
+
+
+def flamegraph_svg(stacks, title="Flame graph"):
+    """
+    Render stacks as a static SVG flame graph, root at the bottom.
+    Frame widths are proportional to sample counts.
+    """
+    root = {'children': {}, 'value': 0}
+    for stack, count in stacks.items():
+        root['value'] += count
+        node = root
+        for label in stack:
+            node = node['children'].setdefault(label, {'children': {}, 'value': 0})
+            node['value'] += count
+
+    total = root['value'] or 1
+    scale = SVG_WIDTH / total
+    rects = []
+    depth_max = 0
+
+    def walk(node, x, depth):
+        nonlocal depth_max
+        depth_max = max(depth_max, depth)
+        for label, child in sorted(node['children'].items()):
+            width = child['value'] * scale
+            if width >= MIN_WIDTH:
+                rects.append((label, child['value'], x, depth, width))
+                walk(child, x, depth + 1)
+            x += width
+
+    walk(root, 0.0, 0)
+
+    height = (depth_max + 2) * FRAME_HEIGHT + 24
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{SVG_WIDTH}" height="{height}" '
+        f'font-family="Verdana" font-size="11">',
+        f'<text x="{SVG_WIDTH / 2}" y="16" text-anchor="middle" font-size="14">{escape(title)}</text>',
+    ]
+    for label, value, x, depth, width in rects:
+        y = height - (depth + 1) * FRAME_HEIGHT
+        tip = f"{label} — {value} samples ({value * 100 / total:.1f}%)"
+        parts.append(
+            f'<g><title>{escape(tip)}</title>'
+            f'<rect x="{x:.2f}" y="{y}" width="{width:.2f}" height="{FRAME_HEIGHT - 1}" '
+            f'fill="{_colour(label)}" rx="2"/>'
+        )
+        chars = int(width / 7)
+        if chars >= 3:
+            text = label if len(label) <= chars else label[:chars - 2] + '..'
+            parts.append(f'<text x="{x + 3:.2f}" y="{y + 11}">{escape(text)}</text>')
+        parts.append('</g>')
+    parts.append('</svg>')
+    return '\n'.join(parts)
+
+
+# ----------------------------
+# MIDDLEWARE
+# ----------------------------
+
+class ProfilingMiddleware:
+    """
+    Must come after AuthenticationMiddleware. Does nothing unless
+    PROFILING_ENABLED is set.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.interval = getattr(settings, 'PROFILING_INTERVAL', DEFAULT_INTERVAL)
+
+    def __call__(self, request):
+        if QUERY_PARAM not in request.GET or not can_profile(request.user):
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        with StackSampler(self.interval) as sampler:
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        profile_id = save_profile(
+            match.url_name if match else None,
+            {
+                'path': request.get_full_path(),
+                'method': request.method,
+                'status': response.status_code,
+                'duration_ms': round(duration * 1000, 1),
+                'samples': sampler.samples,
+                'user': request.user.get_username(),
+                'created': time.time(),
+            },
+            sampler.stacks,
+        )
+        response['X-Profile-Id'] = profile_id
+        return response
@@ -0,0 +1,141 @@
+"""
+Per-request query accounting.
+
+QueryRecorder is a connection.execute_wrapper that counts queries, times
+them and groups them by SQL shape; the same shape running many times in
+one request is the signature of an N+1 loop.
+
+Views declare how many queries they may issue with @query_budget(n).
+QueryBudgetMiddleware (enabled when DEBUG is on) reports every request
+in a Server-Timing header and logs a warning when a view goes over its
+budget or repeats a query shape. Tests enforce the same budgets through
+SmartLearn.testing.QueryBudgetMixin.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+# IN (%s, %s, %s) -> IN (...), so batches of different sizes share a shape
+_PLACEHOLDER_LIST = re.compile(r'\((?:\s*%s\s*,)*\s*%s\s*\)')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(queries):
+    """
+    Declares the most queries a view may issue per request, counting
+    the session and user lookups done by middleware.
+    """
+    def decorator(view_func):
+        view_func.query_budget = queries
+        return view_func
+    return decorator
+
+
+def sql_shape(sql):
+    return _PLACEHOLDER_LIST.sub('(...)', sql)
+
+
+# ----------------------------
+# RECORDER
+# ----------------------------
+
+class QueryRecorder:
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.shapes[sql_shape(sql)] += 1
+
+    def record(self):
+        """
+        Context manager installing the recorder on every database
+        connection for the current thread.
+        """
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+    @property
+    def duplicates(self):
+        return {shape: n for shape, n in self.shapes.items() if n > 1}
+
+    def server_timing(self, total=None):
+        parts = [
+            f'db;desc="{self.count} queries";dur={self.duration * 1000:.1f}',
+        ]
+        duplicates = self.duplicates
+        if duplicates:
+            repeated = sum(duplicates.values()) - len(duplicates)
+            parts.append(f'dup;desc="{repeated} repeated queries"')
+        if total is not None:
+            parts.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(parts)
+
+
+# ----------------------------
+# MIDDLEWARE
+# ----------------------------
+
+class QueryBudgetMiddleware:
+    """
+    Development middleware. Set QUERY_BUDGET_STRICT = True to raise
+    QueryBudgetExceeded instead of logging.
+    """
+
+    def __init__(self, get_response):
+        # The test runner switches DEBUG off; tests use QueryBudgetMixin
+        if not settings.DEBUG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        request.query_budget = None
+
+        start = time.perf_counter()
+        with recorder.record():
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+
+        response['Server-Timing'] = recorder.server_timing(total)
+        self.check(request, recorder)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = getattr(view_func, 'query_budget', None)
+
+    def check(self, request, recorder):
+        for shape, n in recorder.duplicates.items():
+            logger.warning("%s ran the same query %d times: %s", request.path, n, shape)
+
+        budget = request.query_budget
+        if budget is None or recorder.count <= budget:
+            return
+
+        message = f"{request.path} issued {recorder.count} queries (budget {budget})"
+        if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
@@ -58,6 +58,17 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+if DEBUG:
+    # Query count and DB time per request, reported as Server-Timing
+    MIDDLEWARE.insert(0, 'SmartLearn.querybudget.QueryBudgetMiddleware')
+
+# Sampled profiles of ?profile=1 requests by staff, listed at
+# /dashboard/admin/profiles/. Off unless PROFILING_ENABLED is set.
+MIDDLEWARE.append('SmartLearn.profiling.ProfilingMiddleware')
+
+PROFILING_ENABLED = False
+PROFILING_DIR = BASE_DIR / 'profiles'
+
 ROOT_URLCONF = 'SmartLearn.urls'
 
 TEMPLATES = [
@@ -89,6 +100,38 @@ DATABASES = {
 }
 
 
+# Caches
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+#
+# 'default' is a per-process LRU in front of 'shared', which every
+# worker reads and writes (see SmartLearn/cache.py). To share across
+# hosts as well, point 'shared' at the database instead:
+#     {'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+#      'LOCATION': 'smartlearn_cache'}
+# and run `python manage.py createcachetable`.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'SmartLearn.cache.TwoTierCache',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_MAX_ENTRIES': 1000,
+            'LOCAL_TIMEOUT': 5,
+            'STATS_INTERVAL': 30,
+        },
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+# Tests swap the shared tier for local memory (SmartLearn/test_settings.py)
+TEST_RUNNER = 'SmartLearn.testing.TestRunner'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -128,3 +171,28 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Lesson videos are stored under PROTECTED_MEDIA_ROOT, outside
+# MEDIA_ROOT and without a URL (courses.storage), and only streamed by
+# courses.views.lesson_video after an access check. Set MEDIA_OFFLOAD to
+# 'x-sendfile' (Apache, lighttpd) or 'x-accel-redirect' (nginx) to let
+# the web server send the bytes; for nginx, MEDIA_ACCEL_PREFIX must be
+# an `internal` location aliased to PROTECTED_MEDIA_ROOT. Never publish
+# PROTECTED_MEDIA_ROOT itself.
+PROTECTED_MEDIA_ROOT = BASE_DIR / 'protected_media'
+MEDIA_OFFLOAD = None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
+# Resumable lesson uploads (courses.uploads) collect chunks here. Keep it
+# on the same file system as the media roots so finishing an upload is a
+# rename rather than a copy; purge_stale_uploads removes abandoned ones.
+RESUMABLE_UPLOAD_DIR = BASE_DIR / 'uploads'
+RESUMABLE_UPLOAD_MAX_SIZE = 20 * 1024 ** 3
+
+# Lesson videos are transcoded to HLS renditions by the transcode_videos
+# command (courses.transcoding), which needs ffmpeg and ffprobe. Each
+# worker runs one ffmpeg process, and ffmpeg uses every core it gets,
+# so keep this low on machines that also serve requests.
+VIDEO_TRANSCODE_WORKERS = 2
+FFMPEG_BINARY = 'ffmpeg'
+FFPROBE_BINARY = 'ffprobe'
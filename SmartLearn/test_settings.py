@@ -0,0 +1,20 @@
+"""
+Settings for test runs.
+
+`manage.py test` applies the CACHES below through TEST_RUNNER
+(SmartLearn.testing.TestRunner). Other runners, such as pytest-django,
+should use this module as DJANGO_SETTINGS_MODULE.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import CACHES as SITE_CACHES
+
+
+# Tests must not read or leave behind the dev server's cache files
+CACHES = {
+    **SITE_CACHES,
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'smartlearn-tests',
+    },
+}
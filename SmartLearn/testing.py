@@ -0,0 +1,50 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+from django.urls import resolve
+
+from .querybudget import QueryRecorder
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin: fetch a URL and fail if it issues more queries than
+    its view declares with @query_budget, reporting any repeated SQL.
+    """
+
+    def assertWithinBudget(self, url, method='get', data=None, **extra):
+        view = resolve(url.split('?')[0]).func
+        budget = getattr(view, 'query_budget', None)
+        if budget is None:
+            self.fail(f"{url} has no @query_budget.")
+
+        recorder = QueryRecorder()
+        with recorder.record():
+            response = getattr(self.client, method)(url, data, **extra)
+
+        if recorder.count > budget:
+            repeated = '\n'.join(
+                f"  {n}x {shape}" for shape, n in recorder.duplicates.items()
+            )
+            self.fail(
+                f"{url} issued {recorder.count} queries, budget is {budget}."
+                + (f"\nRepeated:\n{repeated}" if repeated else "")
+            )
+        return response
+
+
+class TestRunner(DiscoverRunner):
+    """
+    `manage.py test` with the test settings' caches, so no run touches
+    the dev server's cache files.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        from . import test_settings
+
+        self._test_settings = override_settings(CACHES=test_settings.CACHES)
+        self._test_settings.enable()
+        super().setup_test_environment(**kwargs)
+
+    def teardown_test_environment(self, **kwargs):
+        super().teardown_test_environment(**kwargs)
+        self._test_settings.disable()
@@ -0,0 +1,404 @@
+import shutil
+import tempfile
+from collections import Counter
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import TestCase, override_settings
+from django.urls import URLPattern, get_resolver
+
+from accounts.models import User
+from certificates.models import Certificate
+from courses.models import Category, Course, Lesson
+from enrollments.models import Enrollment, LessonProgress
+from quizzes.models import Question, Quiz, QuizResult
+from dashboard import views as dashboard_views
+from .cache import Namespace, TwoTierCache
+from .profiling import flamegraph_svg
+from .querybudget import QueryBudgetExceeded, sql_shape
+from .testing import QueryBudgetMixin
+
+BUDGETED_URLCONFS = ('courses.urls', 'dashboard.urls', 'quizzes.urls')
+
+MIDDLEWARE = 'SmartLearn.querybudget.QueryBudgetMiddleware'
+
+
+def budgeted_views():
+    for urlconf in BUDGETED_URLCONFS:
+        for pattern in get_resolver(urlconf).url_patterns:
+            if isinstance(pattern, URLPattern):
+                yield urlconf, pattern
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    Every page is fetched with several courses, lessons and results in
+    place, so a per-row query shows up as a budget overrun.
+    """
+
+    COURSES = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create_user(
+            username="teacher", password="pass12345",
+            role='instructor', is_approved=True
+        )
+        cls.student = User.objects.create_user(
+            username="student", password="pass12345", role='student'
+        )
+        cls.admin = User.objects.create_user(
+            username="admin", password="pass12345", role='admin'
+        )
+        cls.category = category = Category.objects.create(name="Programming")
+
+        for c in range(cls.COURSES):
+            course = Course.objects.create(
+                instructor=cls.instructor,
+                title=f"Course {c}",
+                description="Description",
+                category=category,
+                status='published',
+                is_approved=True
+            )
+            lessons = Lesson.objects.bulk_create([
+                Lesson(course=course, title=f"Lesson {i}", order=i,
+                       pdf_notes=f"notes/{c}-{i}.pdf")
+                for i in range(1, 5)
+            ])
+            quiz = Quiz.objects.create(course=course, title=f"Quiz {c}")
+            Question.objects.bulk_create([
+                Question(quiz=quiz, text=f"Q{i}", option1="a", option2="b",
+                         option3="c", option4="d", correct_option=1)
+                for i in range(3)
+            ])
+            enrollment = Enrollment.objects.create(
+                student=cls.student, course=course, total_lessons=4, completed_lessons=4
+            )
+            LessonProgress.objects.bulk_create([
+                LessonProgress(enrollment=enrollment, lesson=lesson, completed=True)
+                for lesson in lessons
+            ])
+            QuizResult.objects.create(quiz=quiz, user=cls.student, score=90, passed=True)
+            Certificate.objects.create(user=cls.student, course=course)
+
+        cls.course = course
+        cls.lessons = lessons
+        cls.lesson = lessons[1]
+        cls.quiz = quiz
+
+    def test_every_view_declares_a_budget(self):
+        missing = [
+            f"{urlconf}: {pattern.name}"
+            for urlconf, pattern in budgeted_views()
+            if not hasattr(pattern.callback, 'query_budget')
+        ]
+        self.assertEqual(missing, [])
+
+    def test_student_pages(self):
+        self.client.force_login(self.student)
+        course, lesson = self.course.id, self.lesson.id
+
+        for url in [
+            '/',
+            '/courses/',
+            '/courses/?q=course',
+            '/courses/feed/',
+            '/courses/search/suggest/?q=cou',
+            f'/course/{course}/',
+            f'/course/{course}/lesson/{lesson}/',
+            f'/course/{course}/resume/',
+            '/dashboard/',
+            '/dashboard/student/',
+            '/dashboard/student/profile/',
+            '/dashboard/student/profile/edit/',
+            '/dashboard/student/notes/',
+            '/dashboard/student/certificates/',
+            '/dashboard/student/courses/',
+            '/dashboard/student/quizzes/',
+            '/dashboard/student/assignments/',
+            f'/quizzes/{self.quiz.id}/',
+        ]:
+            with self.subTest(url=url):
+                self.assertWithinBudget(url)
+
+        with self.subTest(url='quiz submission'):
+            self.assertWithinBudget(f'/quizzes/{self.quiz.id}/', method='post', data={})
+
+    def test_instructor_pages(self):
+        self.client.force_login(self.instructor)
+        course, lesson = self.course.id, self.lesson.id
+
+        for url in [
+            '/create/',
+            f'/instructor/course/{course}/lessons/',
+            f'/instructor/course/{course}/lesson/{lesson}/edit/',
+            '/instructor/my-courses/',
+            '/instructor/students/',
+            '/dashboard/instructor/',
+            '/dashboard/instructor/profile/',
+            '/dashboard/instructor/profile/edit/',
+            '/dashboard/instructor/courses/',
+            '/dashboard/instructor/students/',
+            '/dashboard/instructor/analytics/',
+            f'/dashboard/instructor/course/{course}/lessons/',
+            '/quizzes/instructor/',
+            f'/quizzes/instructor/{self.quiz.id}/questions/',
+            # quizzes/instructor_quiz_results.html is not written yet
+        ]:
+            with self.subTest(url=url):
+                self.assertWithinBudget(url)
+
+    def test_admin_pages(self):
+        self.client.force_login(self.admin)
+
+        for url in [
+            '/dashboard/admin/',
+            '/dashboard/admin/approve-instructors/',
+            '/dashboard/admin/approve-courses/',
+            '/dashboard/admin/profiles/',
+        ]:
+            with self.subTest(url=url):
+                self.assertWithinBudget(url)
+
+    def test_write_actions(self):
+        course, lesson = self.course.id, self.lesson.id
+        other = Course.objects.create(
+            instructor=self.instructor, title="Other", description="Description",
+            status='published', is_approved=True
+        )
+
+        self.client.force_login(self.instructor)
+        for url, data in [
+            ('/create/', {'title': "New", 'description': "D", 'category': self.category.id}),
+            (f'/instructor/course/{course}/lessons/', {'title': "Extra", 'order': 9}),
+            (f'/instructor/course/{course}/lesson/{lesson}/edit/', {'title': "Renamed", 'order': 2}),
+            (f'/dashboard/instructor/course/{course}/lessons/', {'title': "More", 'order': 10}),
+            (f'/instructor/course/{course}/lesson/{self.lessons[3].id}/delete/', {}),
+            (f'/quizzes/instructor/create/{other.id}/', {'title': "Quiz", 'pass_mark': 50}),
+            (f'/quizzes/instructor/{self.quiz.id}/questions/', {
+                'text': "Q", 'option1': "a", 'option2': "b",
+                'option3': "c", 'option4': "d", 'correct_option': 1,
+            }),
+            ('/dashboard/instructor/profile/edit/', {'full_name': "T Eacher", 'email': "t@example.com"}),
+        ]:
+            with self.subTest(url=url):
+                self.assertWithinBudget(url, method='post', data=data)
+
+        self.client.force_login(self.student)
+        for url, data in [
+            (f'/lesson/{self.lesson.id}/complete/', {}),
+            ('/dashboard/student/profile/edit/', {'full_name': "S Tudent", 'email': "s@example.com"}),
+        ]:
+            with self.subTest(url=url):
+                self.assertWithinBudget(url, method='post', data=data)
+
+        self.client.force_login(self.admin)
+        for url, data in [
+            ('/dashboard/admin/approve-instructors/', {'user_id': self.instructor.id}),
+            ('/dashboard/admin/approve-courses/', {'course_id': other.id}),
+        ]:
+            with self.subTest(url=url):
+                self.assertWithinBudget(url, method='post', data=data)
+
+    def test_completing_the_current_lesson(self):
+        # The fixture's lessons are all complete; reopen the last one
+        enrollment = Enrollment.objects.get(student=self.student, course=self.course)
+        LessonProgress.objects.filter(enrollment=enrollment, lesson=self.lessons[3]).update(completed=False)
+        Enrollment.objects.filter(pk=enrollment.pk).update(completed_lessons=3, unlocked_order=4)
+
+        self.client.force_login(self.student)
+        self.assertWithinBudget(f'/lesson/{self.lessons[3].id}/complete/', method='post', data={})
+
+        enrollment.refresh_from_db()
+        self.assertEqual(enrollment.completed_lessons, 4)
+
+
+@override_settings(
+    DEBUG=True,
+    MIDDLEWARE=[MIDDLEWARE] + [m for m in settings.MIDDLEWARE if m != MIDDLEWARE]
+)
+class QueryBudgetMiddlewareTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user(
+            username="student", password="pass12345", role='student'
+        )
+
+    def setUp(self):
+        self.client.force_login(self.student)
+
+    def test_server_timing_header(self):
+        response = self.client.get('/dashboard/student/notes/')
+
+        self.assertRegex(response['Server-Timing'], r'^db;desc="3 queries";dur=[\d.]+, total;dur=')
+
+    def test_over_budget_logs_or_raises(self):
+        with mock.patch.object(dashboard_views.student_notes, 'query_budget', 1):
+            with self.assertLogs('SmartLearn.querybudget', 'WARNING') as logs:
+                self.client.get('/dashboard/student/notes/')
+            self.assertIn("issued 3 queries (budget 1)", logs.output[0])
+
+            with self.settings(QUERY_BUDGET_STRICT=True):
+                with self.assertRaises(QueryBudgetExceeded), self.assertLogs('django.request'):
+                    self.client.get('/dashboard/student/notes/')
+
+    def test_in_lists_share_a_shape(self):
+        self.assertEqual(
+            sql_shape('SELECT 1 WHERE id IN (%s, %s, %s)'),
+            sql_shape('SELECT 1 WHERE id IN (%s)'),
+        )
+
+
+class ProfilingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username="admin", password="pass12345", role='admin'
+        )
+        cls.student = User.objects.create_user(
+            username="student", password="pass12345", role='student'
+        )
+
+    def setUp(self):
+        self.profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profile_dir, ignore_errors=True)
+        self.settings_override = override_settings(
+            PROFILING_ENABLED=True,
+            PROFILING_DIR=self.profile_dir,
+            PROFILING_INTERVAL=0.0001,
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def test_admin_request_is_profiled_and_listed(self):
+        self.client.force_login(self.admin)
+
+        response = self.client.get('/courses/?profile=1')
+
+        profile_id = response['X-Profile-Id']
+        self.assertTrue(profile_id.startswith('courses_list/'))
+
+        listing = self.client.get('/dashboard/admin/profiles/')
+        self.assertContains(listing, '/courses/?profile=1')
+
+        name, stamp = profile_id.split('/')
+        svg = self.client.get(f'/dashboard/admin/profiles/{name}/{stamp}.svg')
+        self.assertEqual(svg['Content-Type'], 'image/svg+xml')
+        self.assertEqual(
+            self.client.get(f'/dashboard/admin/profiles/{name}/{stamp}.exe').status_code, 404
+        )
+
+    def test_students_are_never_profiled(self):
+        self.client.force_login(self.student)
+
+        response = self.client.get('/courses/?profile=1')
+
+        self.assertNotIn('X-Profile-Id', response)
+
+    def test_flamegraph_widths_follow_samples(self):
+        stacks = Counter({
+            ('view', 'render'): 3,
+            ('view', 'query'): 1,
+        })
+
+        svg = flamegraph_svg(stacks)
+
+        self.assertIn('width="1200.00"', svg)
+        self.assertIn('width="900.00"', svg)
+        self.assertIn('width="300.00"', svg)
+
+
+class TwoTierCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username="admin", password="pass12345", role='admin'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.backend = TwoTierCache(f'tests-{self._testMethodName}', {
+            'OPTIONS': {'SHARED': 'shared', 'LOCAL_MAX_ENTRIES': 2, 'LOCAL_TIMEOUT': 5},
+        })
+        self.shared = caches['shared']
+
+    def test_tests_never_use_the_file_cache(self):
+        self.assertIsInstance(self.shared, LocMemCache)
+
+    def test_reads_fall_back_to_shared_and_writes_go_through(self):
+        self.backend.set('courses:a', 1)
+        self.assertEqual(self.shared.get('courses:a'), 1)
+
+        # Another worker's write reaches this one once the local copy expires
+        self.shared.set('courses:a', 2)
+        self.assertEqual(self.backend.get('courses:a'), 1)
+        with mock.patch('SmartLearn.cache.time.monotonic', return_value=10**9):
+            self.assertEqual(self.backend.get('courses:a'), 2)
+
+        self.backend.delete('courses:a')
+        self.assertIsNone(self.shared.get('courses:a'))
+        self.assertIsNone(self.backend.get('courses:a'))
+
+    def test_local_tier_is_bounded_lru(self):
+        for key in ('a:1', 'a:2', 'a:3'):
+            self.backend.set(key, key)
+
+        self.assertEqual(list(self.backend.local.entries), [
+            self.backend.make_key('a:2'), self.backend.make_key('a:3'),
+        ])
+        # Still served, from the shared tier
+        self.assertEqual(self.backend.get('a:1'), 'a:1')
+
+    def test_hits_and_misses_are_counted_per_namespace(self):
+        self.backend.set('courses:a', 1)
+        self.backend.get('courses:a')
+        self.backend.local.clear()
+        self.backend.get('courses:a')
+        self.backend.get('courses:b')
+        self.backend.get('template.cache.course_card.abc')
+
+        rows = {row['namespace']: row for row in self.backend.stats()}
+
+        self.assertEqual(
+            {key: rows['courses'][key] for key in ('local_hits', 'shared_hits', 'misses')},
+            {'local_hits': 1, 'shared_hits': 1, 'misses': 1}
+        )
+        self.assertEqual(rows['template.cache.course_card']['misses'], 1)
+
+    def test_namespace_invalidation_hides_old_keys(self):
+        namespace = Namespace('tests', 'things')
+        namespace.set('x', 'old')
+
+        namespace.invalidate()
+
+        self.assertIsNone(namespace.get('x'))
+        self.assertEqual(namespace.get_or_set('x', lambda: 'new'), 'new')
+        self.assertEqual(namespace.get('x'), 'new')
+
+    def test_catalogue_and_admin_counts_follow_writes(self):
+        instructor = User.objects.create_user(
+            username="teacher", password="pass12345",
+            role='instructor', is_approved=True
+        )
+        self.client.get('/courses/feed/')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/courses/feed/').json()['results'], [])
+
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get('/dashboard/admin/').context['courses'], 0)
+
+        Course.objects.create(
+            instructor=instructor, title="Fresh", description="Description",
+            status='published', is_approved=True
+        )
+
+        self.assertEqual(len(self.client.get('/courses/feed/').json()['results']), 1)
+        response = self.client.get('/dashboard/admin/')
+        self.assertEqual(response.context['courses'], 1)
+        self.assertContains(response, 'courses.catalogue')
@@ -0,0 +1,156 @@
+"""
+Profile picture normalization.
+
+Uploads are whatever the user's phone or camera produced: several
+megabytes, rotated by an EXIF tag, and carrying location and device
+metadata. When a user is saved with a new picture, build():
+
+- re-encodes the original with its orientation applied, its long side
+  capped at ORIGINAL_MAX_SIZE and no metadata, and deletes the upload;
+- writes square, centre-cropped JPEG variants at SIZES;
+- records both in User.avatar_variants.
+
+All names carry a hash of the upload's content (and the user's ID), so
+a file never changes once written and is served by the avatar view with
+far-future cache headers. Pages use the {% avatar %} tag, which picks a
+variant for the displayed size; the original is only linked to, never
+embedded.
+"""
+
+import hashlib
+import logging
+import posixpath
+import re
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.urls import reverse
+from PIL import Image, ImageOps
+
+from .models import User
+
+
+logger = logging.getLogger(__name__)
+
+SIZES = (64, 128, 256)
+
+ORIGINAL_MAX_SIZE = 1024
+
+VARIANT_DIR = 'avatars'
+
+JPEG_OPTIONS = {'quality': 85, 'optimize': True, 'progressive': True}
+
+VARIANT_NAME = re.compile(r'^[0-9a-f]{16}-(?:%s)\.jpg$' % '|'.join(map(str, SIZES)))
+
+
+def variant_name(digest, size):
+    return f"{digest}-{size}.jpg"
+
+
+# ----------------------------
+# LOOKUP
+# ----------------------------
+
+def ready_hash(user):
+    """Hash of the user's current picture's variants, or '' if there are none."""
+    # Anonymous users have neither field
+    picture = getattr(user, 'profile_picture', None)
+    record = getattr(user, 'avatar_variants', None) or {}
+    if not picture or record.get('source') != picture.name:
+        return ''
+    return record.get('hash', '')
+
+
+def avatar_url(user, size):
+    """Smallest variant covering `size` pixels (else the largest), or None."""
+    digest = ready_hash(user)
+    if not digest:
+        return None
+    chosen = next((s for s in SIZES if s >= size), SIZES[-1])
+    return reverse('avatar', args=[variant_name(digest, chosen)])
+
+
+# ----------------------------
+# GENERATION
+# ----------------------------
+
+def is_stale(user):
+    record = user.avatar_variants or {}
+    return (user.profile_picture.name or '') != record.get('source', '')
+
+
+def build(user):
+    """
+    Normalize the user's current picture, write its variants, delete
+    the previous picture's, and store the record. An upload that cannot
+    be decoded is left as it is and recorded without variants; pages
+    then show the initial instead. Returns the record.
+    """
+    old = user.avatar_variants or {}
+    record = {}
+
+    if user.profile_picture:
+        try:
+            record = _render(user)
+        except (OSError, ValueError, Image.DecompressionBombError) as exc:
+            logger.warning("Could not process profile picture %s: %s", user.profile_picture.name, exc)
+            record = {'source': user.profile_picture.name, 'hash': ''}
+
+    if old.get('hash') and old['hash'] != record.get('hash'):
+        storage = user.profile_picture.storage
+        storage.delete(old['source'])
+        for size in SIZES:
+            storage.delete(posixpath.join(VARIANT_DIR, variant_name(old['hash'], size)))
+
+    User.objects.filter(pk=user.pk).update(
+        profile_picture=record.get('source') or None,
+        avatar_variants=record
+    )
+    user.profile_picture = record.get('source') or None
+    user.avatar_variants = record
+    return record
+
+
+def _render(user):
+    field = user.profile_picture
+    storage = field.storage
+    upload = field.name
+
+    with storage.open(upload, 'rb') as source:
+        data = source.read()
+    digest = hashlib.sha256(f"{user.pk}:".encode() + data).hexdigest()[:16]
+
+    with Image.open(BytesIO(data)) as image:
+        image.draft('RGB', (ORIGINAL_MAX_SIZE, ORIGINAL_MAX_SIZE))
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    image.thumbnail((ORIGINAL_MAX_SIZE, ORIGINAL_MAX_SIZE), Image.Resampling.LANCZOS)
+    if has_alpha:
+        original_name = posixpath.join(posixpath.dirname(upload), f"{digest}.png")
+        _write(storage, original_name, image, 'PNG', {'optimize': True})
+        flat = Image.new('RGB', image.size, 'white')
+        flat.paste(image, mask=image.getchannel('A'))
+        image = flat
+    else:
+        original_name = posixpath.join(posixpath.dirname(upload), f"{digest}.jpg")
+        _write(storage, original_name, image, 'JPEG', {'quality': 90})
+
+    for size in SIZES:
+        square = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+        _write(storage, posixpath.join(VARIANT_DIR, variant_name(digest, size)), square, 'JPEG', JPEG_OPTIONS)
+
+    if upload != original_name:
+        storage.delete(upload)
+
+    return {'source': original_name, 'hash': digest}
+
+
+def _write(storage, name, image, pil_format, options):
+    # Content-addressed: an existing file already has these bytes
+    if storage.exists(name):
+        return
+    buffer = BytesIO()
+    image.save(buffer, pil_format, **options)
+    storage.save(name, ContentFile(buffer.getvalue()))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from accounts import avatars
+from accounts.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Normalize profile pictures that have no avatar variants yet, "
+        "e.g. ones uploaded before avatars were processed."
+    )
+
+    def handle(self, *args, **options):
+        users = User.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True)
+
+        built = 0
+        for user in users.iterator():
+            if avatars.is_stale(user):
+                record = avatars.build(user)
+                built += 1
+                self.stdout.write(f"{user.username}: {record['source']}")
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {built} profile pictures."))
@@ -13,6 +13,9 @@ class User(AbstractUser):
     is_approved = models.BooleanField(default=False)
 
     profile_picture = models.ImageField(upload_to='profiles/', blank=True, null=True)
+    # Square, metadata-free copies written by accounts.avatars:
+    # {'source': name, 'hash': content hash naming the variants}
+    avatar_variants = models.JSONField(default=dict, blank=True, editable=False)
     mobile = models.CharField(max_length=15, blank=True, null=True)
 
     def __str__(self):
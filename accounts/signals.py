@@ -0,0 +1,15 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from . import avatars
+from .models import User
+
+
+# ----------------------------
+# AVATAR VARIANTS
+# ----------------------------
+
+@receiver(post_save, sender=User)
+def build_avatar_variants(sender, instance, raw=False, **kwargs):
+    if not raw and avatars.is_stale(instance):
+        avatars.build(instance)
@@ -0,0 +1,37 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+from accounts import avatars
+
+register = template.Library()
+
+
+@register.filter
+def has_avatar(user):
+    return bool(avatars.ready_hash(user))
+
+
+@register.simple_tag
+def avatar(user, size, **attrs):
+    """
+    <img> of the user's avatar drawn at `size` CSS pixels, with a 2x
+    variant for high-density screens. Renders nothing for users without
+    variants; guard with {% if user|has_avatar %} to show a fallback.
+
+        {% avatar user 38 class="rounded-circle" %}
+    """
+    if not avatars.ready_hash(user):
+        return ''
+
+    attrs.setdefault('alt', user.get_username())
+    attrs.setdefault('width', size)
+    attrs.setdefault('height', size)
+
+    return format_html(
+        '<img src="{}" srcset="{} 1x, {} 2x"{}>',
+        avatars.avatar_url(user, size),
+        avatars.avatar_url(user, size),
+        avatars.avatar_url(user, size * 2),
+        flatatt(attrs)
+    )
@@ -1,3 +1,89 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from io import BytesIO
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from . import avatars
+from .models import User
+
+
+def photo_upload(name='me.jpg', size=(1200, 800), orientation=None):
+    image = Image.new('RGB', size, 'navy')
+    exif = Image.Exif()
+    exif[0x010F] = "PhoneMaker"  # Make
+    if orientation:
+        exif[0x0112] = orientation
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', exif=exif.tobytes())
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+class AvatarTests(TestCase):
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.user = User.objects.create_user(
+            username="student", password="pass12345", role='student'
+        )
+
+    def upload(self, picture):
+        self.user.profile_picture = picture
+        self.user.save()
+        return self.user.avatar_variants
+
+    def test_upload_is_normalized_into_square_variants(self):
+        record = self.upload(photo_upload(orientation=6))
+
+        self.assertFalse(os.path.exists(os.path.join(self.media, 'profiles', 'me.jpg')))
+        with Image.open(os.path.join(self.media, record['source'])) as original:
+            # Rotated upright, capped and stripped of metadata
+            self.assertEqual(original.size, (683, 1024))
+            self.assertEqual(len(original.getexif()), 0)
+
+        for size in avatars.SIZES:
+            name = os.path.join(self.media, 'avatars', avatars.variant_name(record['hash'], size))
+            with Image.open(name) as variant:
+                self.assertEqual(variant.size, (size, size))
+
+        self.assertEqual(User.objects.get(pk=self.user.pk).profile_picture.name, record['source'])
+
+    def test_variant_is_served_with_far_future_headers(self):
+        record = self.upload(photo_upload())
+        url = avatars.avatar_url(self.user, 38)
+        self.assertTrue(url.endswith(f"{record['hash']}-64.jpg"))
+
+        response = self.client.get(url)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(self.client.get('/accounts/avatars/../db.sqlite3').status_code, 404)
+
+    def test_pages_embed_variants_not_the_original(self):
+        record = self.upload(photo_upload())
+        self.client.force_login(self.user)
+
+        response = self.client.get('/dashboard/student/profile/')
+
+        self.assertContains(response, f"{record['hash']}-256.jpg 2x")
+        self.assertNotContains(response, record['source'])
+
+    def test_replacing_picture_removes_previous_files(self):
+        first = self.upload(photo_upload())
+        second = self.upload(photo_upload(size=(300, 300)))
+
+        self.assertNotEqual(first['hash'], second['hash'])
+        self.assertFalse(os.path.exists(os.path.join(self.media, first['source'])))
+        self.assertFalse(os.path.exists(
+            os.path.join(self.media, 'avatars', avatars.variant_name(first['hash'], 64))
+        ))
@@ -11,5 +11,7 @@ urlpatterns = [
 
     path("login/", views.custom_login, name="login"),
     path("logout/", views.custom_logout, name="logout"),
+
+    path("avatars/<str:name>", views.avatar, name="avatar"),
 ]
 
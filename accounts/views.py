@@ -3,9 +3,12 @@ from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from .forms import CustomUserCreationForm, CustomAuthenticationForm
 from .models import User
+from . import avatars
 
 from django.contrib import messages
 from django.contrib.auth import authenticate , login, logout
+from django.http import FileResponse, Http404
+from django.views.decorators.http import etag, require_GET
 
 
 
@@ -187,3 +190,29 @@ def register_instructor(request):
         "form": form,
         "selected_role": "instructor"
     })
+
+
+# ----------------------------
+# AVATAR VARIANTS
+# ----------------------------
+# Variant names are content hashes, so a URL always returns the same
+# bytes: browsers and proxies may keep them for a year without asking.
+
+AVATAR_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+@require_GET
+@etag(lambda request, name: name)
+def avatar(request, name):
+    if not avatars.VARIANT_NAME.match(name):
+        raise Http404("Unknown avatar.")
+
+    storage = User._meta.get_field('profile_picture').storage
+    try:
+        file = storage.open(f"{avatars.VARIANT_DIR}/{name}", 'rb')
+    except FileNotFoundError:
+        raise Http404("Unknown avatar.")
+
+    response = FileResponse(file, content_type='image/jpeg')
+    response['Cache-Control'] = AVATAR_CACHE_CONTROL
+    return response
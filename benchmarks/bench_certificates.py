@@ -0,0 +1,70 @@
+"""
+Compare per-certificate wall time: full xhtml2pdf render vs. the
+compiled certificate layout, one at a time and through render_batch.
+
+    python benchmarks/bench_certificates.py --count 200
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'SmartLearn.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from accounts.models import User  # noqa: E402
+from certificates.rendering import get_layout, render_batch, render_certificate  # noqa: E402
+from certificates.utils import render_certificate_html  # noqa: E402
+from courses.models import Course  # noqa: E402
+
+
+def students(count):
+    # Unsaved instances: rendering only reads names, titles and IDs
+    course = Course(id=1, title="Full Stack Web Development with Django")
+    for i in range(count):
+        yield User(id=i + 1, username=f"student{i}", first_name="Student", last_name=str(i)), course
+
+
+def timed(label, count, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(
+        f"  {label:<16} {elapsed / count * 1000:8.2f} ms/cert"
+        f"   {count / elapsed * 60:10.0f} certs/min"
+    )
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=200)
+    parser.add_argument('--legacy-count', type=int, default=20,
+                        help="Full renders are slow; time fewer of them.")
+    args = parser.parse_args()
+
+    # xhtml2pdf logs every unsupported CSS property
+    logging.disable(logging.WARNING)
+
+    start = time.perf_counter()
+    get_layout()
+    print(f"Layout compiled in {(time.perf_counter() - start) * 1000:.1f} ms\n")
+
+    timed("full render", args.legacy_count, lambda: [
+        render_certificate_html(user, course) for user, course in students(args.legacy_count)
+    ])
+    timed("compiled", args.count, lambda: [
+        render_certificate(user, course) for user, course in students(args.count)
+    ])
+    timed("compiled batch", args.count, lambda: list(render_batch(students(args.count))))
+
+
+if __name__ == '__main__':
+    main()
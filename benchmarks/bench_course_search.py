@@ -0,0 +1,125 @@
+"""
+Compare course search latency: FTS5 index vs. the icontains Q filter.
+
+Seeds a throwaway test database with N published courses, then times
+both backends over the same queries. Run from the project root:
+
+    python benchmarks/bench_course_search.py --sizes 10000 100000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'SmartLearn.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from accounts.models import User  # noqa: E402
+from courses.models import Category, Course  # noqa: E402
+from courses.search import QFilterBackend, SQLiteFTSBackend  # noqa: E402
+
+
+WORDS = (
+    "python django web data science machine learning design marketing "
+    "finance excel photography music guitar piano writing business "
+    "cloud security network linux docker kubernetes react javascript "
+    "statistics algebra calculus physics chemistry biology history"
+).split()
+
+QUERIES = ["python", "machine learning", "dja", "kubernetes docker", "pho", "history"]
+
+
+def seed(start, stop, rng):
+    instructor, _ = User.objects.get_or_create(
+        username="bench_instructor", defaults={'role': 'instructor'}
+    )
+    categories = [
+        Category.objects.get_or_create(name=word.title())[0]
+        for word in WORDS[:10]
+    ]
+
+    batch = []
+    for i in range(start, stop):
+        title = " ".join(rng.sample(WORDS, 3)).title()
+        description = " ".join(rng.choices(WORDS, k=40))
+        batch.append(Course(
+            instructor=instructor,
+            title=f"{title} {i}",
+            description=description,
+            category=rng.choice(categories),
+            status='published',
+            is_approved=True
+        ))
+        if len(batch) == 5000:
+            Course.objects.bulk_create(batch)
+            batch = []
+    Course.objects.bulk_create(batch)
+
+
+def time_backend(backend, repeat, page_size):
+    samples = []
+    for _ in range(repeat):
+        for query in QUERIES:
+            start = time.perf_counter()
+            backend.count(query)
+            backend.search_ids(query, page_size)
+            samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'p50_ms': statistics.median(samples),
+        'p95_ms': samples[int(len(samples) * 0.95) - 1],
+        'mean_ms': statistics.fmean(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--page-size', type=int, default=12)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+
+    try:
+        rng = random.Random(args.seed)
+        seeded = 0
+
+        # Sizes grow monotonically, so each run only adds the difference
+        for size in sorted(args.sizes):
+            seed(seeded, size, rng)
+            seeded = size
+            fts = SQLiteFTSBackend()
+            fts.rebuild()
+
+            results = {
+                'q_filter': time_backend(QFilterBackend(), args.repeat, args.page_size),
+                'fts5': time_backend(fts, args.repeat, args.page_size),
+            }
+
+            print(f"\n{size} published courses")
+            for name, stats in results.items():
+                print(
+                    f"  {name:<9} p50 {stats['p50_ms']:8.2f} ms"
+                    f"   p95 {stats['p95_ms']:8.2f} ms"
+                    f"   mean {stats['mean_ms']:8.2f} ms"
+                )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,337 @@
+"""
+Benchmark the core student journey through the Django test client.
+
+Seeds a throwaway test database at the chosen scale, then drives each
+flow as a randomly picked enrolled student and reports p50/p95/p99
+latency, queries per request and throughput. Results are saved as JSON;
+pass --compare with an earlier file to flag regressions.
+
+    python benchmarks/bench_student_journey.py --scale 1k
+    python benchmarks/bench_student_journey.py --scale 1k --compare benchmarks/results/<earlier>.json
+
+Runs under SmartLearn.test_settings, so the site's cached pages are
+neither read nor overwritten.
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'SmartLearn.test_settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from courses.models import Lesson  # noqa: E402
+from enrollments.models import Enrollment, LessonProgress  # noqa: E402
+from enrollments.synthetic import SCALES, WORDS, bulk_load_pragmas, generate  # noqa: E402
+from quizzes.models import Question  # noqa: E402
+from SmartLearn.querybudget import QueryRecorder  # noqa: E402
+
+
+RESULTS_DIR = BASE_DIR / 'benchmarks' / 'results'
+
+SAMPLE_STUDENTS = 100
+
+
+# ----------------------------
+# FIXTURES
+# ----------------------------
+
+class Journey:
+    """
+    A sample of enrolled students with logged-in clients, plus the
+    lesson and question IDs the flows need. Built before timing starts.
+    """
+
+    def __init__(self, rng):
+        self.rng = rng
+
+        last_id = Enrollment.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        ids = rng.sample(range(1, last_id + 1), min(SAMPLE_STUDENTS * 5, last_id))
+        enrollments = list(
+            Enrollment.objects.filter(id__in=ids).select_related('student', 'course__quiz')
+        )
+
+        self.in_progress = [e for e in enrollments if e.completed_lessons < e.total_lessons]
+        self.finished = [e for e in enrollments if e.total_lessons and e.completed_lessons == e.total_lessons]
+        self.in_progress = self.in_progress[:SAMPLE_STUDENTS]
+        self.finished = self.finished[:SAMPLE_STUDENTS]
+
+        # Index of each in-progress student's next lesson; completing it
+        # moves the student on, so repeat requests are real writes
+        self.next_lesson = {e.id: e.completed_lessons for e in self.in_progress}
+
+        course_ids = {e.course_id for e in self.in_progress + self.finished}
+        self.lessons = {}
+        for lesson_id, course_id in (
+            Lesson.objects.filter(course_id__in=course_ids)
+            .order_by('order').values_list('id', 'course_id')
+        ):
+            self.lessons.setdefault(course_id, []).append(lesson_id)
+
+        # The seed data stops at each student's current lesson; the player
+        # would create the rest of the progress rows as they are watched
+        LessonProgress.objects.bulk_create([
+            LessonProgress(enrollment_id=e.id, lesson_id=lesson_id)
+            for e in self.in_progress
+            for lesson_id in self.lessons[e.course_id][e.completed_lessons:]
+        ], ignore_conflicts=True)
+
+        quiz_ids = {e.course.quiz.id for e in self.finished}
+        self.questions = {}
+        for question_id, quiz_id in (
+            Question.objects.filter(quiz_id__in=quiz_ids).values_list('id', 'quiz_id')
+        ):
+            self.questions.setdefault(quiz_id, []).append(question_id)
+
+        self.clients = {}
+        for enrollment in self.in_progress + self.finished:
+            if enrollment.student_id not in self.clients:
+                client = Client()
+                client.force_login(enrollment.student)
+                self.clients[enrollment.student_id] = client
+
+    def pick(self, pool):
+        if not pool:
+            raise RuntimeError("No sampled student left for this flow; use a larger --scale.")
+        enrollment = self.rng.choice(pool)
+        return enrollment, self.clients[enrollment.student_id]
+
+    def with_lessons_left(self):
+        return [
+            e for e in self.in_progress
+            if self.next_lesson[e.id] < len(self.lessons[e.course_id])
+        ]
+
+
+# ----------------------------
+# FLOWS
+# ----------------------------
+# Each returns (client, method, url, data)
+
+def course_search(journey):
+    _, client = journey.pick(journey.in_progress)
+    return client, 'get', f"/courses/?q={journey.rng.choice(WORDS)[:4]}", None
+
+
+def course_detail(journey):
+    enrollment, client = journey.pick(journey.in_progress)
+    return client, 'get', f"/course/{enrollment.course_id}/", None
+
+
+def lesson_player(journey):
+    enrollment, client = journey.pick(journey.in_progress)
+    # Any lesson up to the first incomplete one is unlocked
+    unlocked = journey.lessons[enrollment.course_id][:journey.next_lesson[enrollment.id] + 1]
+    lesson_id = journey.rng.choice(unlocked)
+    return client, 'get', f"/course/{enrollment.course_id}/lesson/{lesson_id}/", None
+
+
+def mark_lesson_complete(journey):
+    enrollment, client = journey.pick(journey.with_lessons_left())
+    lesson_id = journey.lessons[enrollment.course_id][journey.next_lesson[enrollment.id]]
+    journey.next_lesson[enrollment.id] += 1
+    return client, 'post', f"/lesson/{lesson_id}/complete/", {}
+
+
+def quiz_submit(journey):
+    enrollment, client = journey.pick(journey.finished)
+    quiz_id = enrollment.course.quiz.id
+    answers = {
+        str(question_id): str(journey.rng.randint(1, 4))
+        for question_id in journey.questions[quiz_id]
+    }
+    return client, 'post', f"/quizzes/{quiz_id}/", answers
+
+
+def student_dashboard(journey):
+    _, client = journey.pick(journey.in_progress)
+    return client, 'get', "/dashboard/student/", None
+
+
+FLOWS = {
+    flow.__name__: flow
+    for flow in (
+        course_search, course_detail, lesson_player,
+        mark_lesson_complete, quiz_submit, student_dashboard,
+    )
+}
+
+
+# ----------------------------
+# MEASUREMENT
+# ----------------------------
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of a sorted list."""
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def run_flow(flow, journey, requests, warmup):
+    for _ in range(warmup):
+        client, method, url, data = flow(journey)
+        getattr(client, method)(url, data)
+
+    latencies = []
+    queries = []
+    errors = 0
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        client, method, url, data = flow(journey)
+        recorder = QueryRecorder()
+
+        start = time.perf_counter()
+        with recorder.record():
+            response = getattr(client, method)(url, data)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        queries.append(recorder.count)
+        if response.status_code >= 400:
+            errors += 1
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': requests,
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'mean_ms': round(statistics.fmean(latencies), 2),
+        'queries_mean': round(statistics.fmean(queries), 2),
+        'queries_max': max(queries),
+        'throughput_rps': round(requests / wall, 1),
+    }
+
+
+# ----------------------------
+# REPORTING
+# ----------------------------
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(flows):
+    print(f"\n  {'flow':<22}{'p50':>9}{'p95':>9}{'p99':>9}{'queries':>9}{'req/s':>9}{'errors':>8}")
+    for name, stats in flows.items():
+        print(
+            f"  {name:<22}{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}"
+            f"{stats['queries_mean']:>9.1f}{stats['throughput_rps']:>9.1f}{stats['errors']:>8}"
+        )
+
+
+def compare(current, baseline, threshold):
+    """
+    Print p95 and query deltas against a baseline run. Returns the
+    flows that regressed: p95 slower by more than threshold percent, or
+    more queries per request.
+    """
+    regressions = []
+    print(f"\n  vs {baseline['meta'].get('revision')} ({baseline['meta']['created']})")
+
+    for name, stats in current['flows'].items():
+        before = baseline['flows'].get(name)
+        if not before:
+            continue
+        change = (stats['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0
+        extra_queries = stats['queries_max'] - before['queries_max']
+
+        flag = ''
+        if change > threshold or extra_queries > 0:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"  {name:<22} p95 {change:+7.1f}%   queries {extra_queries:+d}{flag}")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', choices=SCALES, default='1k')
+    parser.add_argument('--flows', nargs='+', choices=FLOWS, default=list(FLOWS))
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', type=Path)
+    parser.add_argument('--compare', type=Path, help="Earlier results file to compare against.")
+    parser.add_argument('--threshold', type=float, default=20.0,
+                        help="Allowed p95 slowdown in percent before --compare fails.")
+    args = parser.parse_args()
+
+    # Certificate jobs and query-budget warnings would flood the output
+    logging.disable(logging.WARNING)
+
+    setup_test_environment(debug=False)
+    old_name = connection.creation.create_test_db(verbosity=0)
+
+    try:
+        print(f"Seeding {args.scale} dataset")
+        start = time.perf_counter()
+        with bulk_load_pragmas():
+            generate(SCALES[args.scale], seed=args.seed)
+        print(f"  seeded in {time.perf_counter() - start:.1f} s")
+
+        journey = Journey(random.Random(args.seed))
+        flows = {
+            name: run_flow(FLOWS[name], journey, args.requests, args.warmup)
+            for name in args.flows
+        }
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    result = {
+        'meta': {
+            'scale': args.scale,
+            'seed': args.seed,
+            'requests': args.requests,
+            'revision': git_revision(),
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+        },
+        'flows': flows,
+    }
+    print_table(flows)
+
+    output = args.output or RESULTS_DIR / (
+        f"journey-{args.scale}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2))
+    print(f"\nSaved {output}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        if compare(result, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
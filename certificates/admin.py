@@ -1,7 +1,13 @@
 from django.contrib import admin
-from .models import Certificate
+from .models import Certificate, CertificateJob
 
 
 @admin.register(Certificate)
 class CertificateAdmin(admin.ModelAdmin):
     list_display = ('user', 'course', 'issue_date')
+
+
+@admin.register(CertificateJob)
+class CertificateJobAdmin(admin.ModelAdmin):
+    list_display = ('certificate', 'status', 'attempts', 'run_after', 'updated_at')
+    list_filter = ('status',)
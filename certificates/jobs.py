@@ -0,0 +1,121 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Certificate, CertificateJob
+from .utils import generate_certificate_pdf
+
+logger = logging.getLogger(__name__)
+
+# A running job older than this is assumed to belong to a dead worker
+STALE_AFTER = timedelta(minutes=10)
+RETRY_BASE_DELAY = timedelta(seconds=30)
+
+
+# ----------------------------
+# ENQUEUE
+# ----------------------------
+
+def enqueue_certificate(user, course):
+    """
+    Ensure a Certificate exists and, if its PDF is missing, that a job
+    is queued to render it. Safe to call on every passing submission.
+    """
+    with transaction.atomic():
+        cert, _ = Certificate.objects.get_or_create(user=user, course=course)
+
+        if not cert.certificate_file:
+            job, created = CertificateJob.objects.get_or_create(certificate=cert)
+
+            if not created and job.status in ('failed', 'done'):
+                job.status = 'queued'
+                job.attempts = 0
+                job.run_after = timezone.now()
+                job.last_error = ''
+                job.save()
+
+            cert.job = job
+
+    return cert
+
+
+# ----------------------------
+# WORKER
+# ----------------------------
+
+def claim_next_job(now=None):
+    """
+    Atomically move the next runnable job to 'running'. The UPDATE only
+    succeeds if the row is still in the state we read, so concurrent
+    workers never claim the same job.
+    """
+    now = now or timezone.now()
+    runnable = CertificateJob.objects.filter(
+        Q(status='queued', run_after__lte=now) |
+        Q(status='running', locked_at__lt=now - STALE_AFTER)
+    ).order_by('run_after', 'id')
+
+    for job in runnable[:10]:
+        claimed = CertificateJob.objects.filter(
+            pk=job.pk,
+            status=job.status,
+            locked_at=job.locked_at
+        ).update(
+            status='running',
+            locked_at=now,
+            attempts=F('attempts') + 1
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+    return None
+
+
+def run_job(job):
+    cert = Certificate.objects.select_related('user', 'course').get(pk=job.certificate_id)
+
+    try:
+        if not cert.certificate_file:
+            pdf_file = generate_certificate_pdf(user=cert.user, course=cert.course)
+            if pdf_file is None:
+                raise RuntimeError("PDF rendering reported an error.")
+            cert.certificate_file.save(pdf_file.name, pdf_file)
+
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            job.status = 'failed'
+            logger.error("Certificate job %s failed permanently", job.pk)
+        else:
+            job.status = 'queued'
+            job.run_after = timezone.now() + RETRY_BASE_DELAY * (2 ** (job.attempts - 1))
+            logger.warning("Certificate job %s failed, retrying", job.pk)
+    else:
+        job.status = 'done'
+        job.last_error = ''
+
+    job.locked_at = None
+    job.save(update_fields=['status', 'run_after', 'locked_at', 'last_error', 'updated_at'])
+    return job.status
+
+
+def run_pending(max_jobs=None):
+    """
+    Drain runnable jobs. Returns a dict of counts per final status.
+    """
+    counts = {'done': 0, 'queued': 0, 'failed': 0}
+    processed = 0
+
+    while max_jobs is None or processed < max_jobs:
+        job = claim_next_job()
+        if job is None:
+            break
+        counts[run_job(job)] += 1
+        processed += 1
+
+    return counts
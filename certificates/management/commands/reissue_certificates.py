@@ -0,0 +1,147 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from certificates.models import Certificate
+from certificates.reissue import (
+    ReissueStats,
+    init_worker,
+    iter_chunks,
+    load_checkpoint,
+    new_checkpoint,
+    render_chunk,
+    save_checkpoint,
+)
+from certificates.rendering import DEFAULT_TEMPLATE, LayoutError, get_layout
+
+
+class Command(BaseCommand):
+    help = "Regenerate every certificate PDF with the current template, in parallel."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Rendering processes (default: CPU count)."
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=200,
+            help="Certificates per chunk handed to a worker."
+        )
+        parser.add_argument(
+            '--checkpoint',
+            default=os.path.join(settings.MEDIA_ROOT, 'certificates', '.reissue-checkpoint.json'),
+            help="File recording progress so an interrupted run can resume. "
+                 "A finished run, or one for another template, is not resumed."
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help="Ignore the checkpoint and re-issue everything."
+        )
+        parser.add_argument(
+            '--template',
+            default=DEFAULT_TEMPLATE,
+            help="Certificate template to render."
+        )
+
+    def handle(self, *args, **options):
+        template = options['template']
+        checkpoint = options['checkpoint']
+        workers = max(options['workers'], 1)
+
+        # Compile before forking so a broken template fails fast
+        # and forked workers inherit the compiled layout
+        try:
+            get_layout(template)
+        except LayoutError as exc:
+            raise CommandError(str(exc))
+
+        state = new_checkpoint(template)
+        if not options['restart']:
+            state = load_checkpoint(checkpoint, template)
+            if state['last_id']:
+                self.stdout.write(
+                    f"Resuming after certificate {state['last_id']}, "
+                    f"retrying {len(state['failed'])} failed."
+                )
+
+        stats = ReissueStats()
+        chunk_size = options['chunk_size']
+        # Earlier failures first; their chunks leave last_id alone
+        retries = (
+            (None, rows, missing)
+            for _, rows, missing in iter_chunks(
+                Certificate.objects.filter(id__in=state['failed']), 0, chunk_size
+            )
+        )
+        chunks = chain(retries, iter_chunks(Certificate.objects.all(), state['last_id'], chunk_size))
+        in_flight = deque()
+        start = time.perf_counter()
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+            for last_id, rows, missing in chunks:
+                in_flight.append((last_id, missing, pool.submit(render_chunk, rows, template)))
+
+                # Bounded look-ahead keeps memory flat on huge tables
+                if len(in_flight) >= workers * 2:
+                    self._finish(in_flight.popleft(), state, stats, checkpoint)
+
+            while in_flight:
+                self._finish(in_flight.popleft(), state, stats, checkpoint)
+
+        state['complete'] = True
+        save_checkpoint(checkpoint, state)
+
+        stats.elapsed = time.perf_counter() - start
+        self._report(stats, state)
+
+    def _finish(self, entry, state, stats, checkpoint):
+        last_id, missing, future = entry
+        ok, failures = future.result()
+
+        ok_ids = set(ok)
+        named = [cert for cert in missing if cert.id in ok_ids]
+        if named:
+            Certificate.objects.bulk_update(named, ['certificate_file'])
+
+        stats.done += len(ok)
+        stats.failed.extend(failures)
+
+        # Chunks finish in submission order, so last_id only moves forward
+        if last_id is not None:
+            state['last_id'] = last_id
+        state['done'] += len(ok)
+        state['failed'] = sorted(
+            (set(state['failed']) - ok_ids) | {cert_id for cert_id, _ in failures}
+        )
+        save_checkpoint(checkpoint, state)
+
+        position = f"up to #{last_id}" if last_id is not None else "retries"
+        self.stdout.write(f"  {position}: {stats.done} re-issued, {len(stats.failed)} failed")
+
+    def _report(self, stats, state):
+        self.stdout.write(self.style.SUCCESS(
+            f"Re-issued {stats.done} certificates in {stats.elapsed:.1f}s "
+            f"({stats.rate:.1f} certs/sec)."
+        ))
+
+        if stats.failed:
+            self.stdout.write(self.style.ERROR(f"{len(stats.failed)} failed:"))
+            for cert_id, error in stats.failed[:20]:
+                self.stdout.write(f"  #{cert_id}: {error.strip().splitlines()[-1]}")
+            if len(stats.failed) > 20:
+                self.stdout.write(f"  ... and {len(stats.failed) - 20} more")
+
+        self.stdout.write(
+            f"Checkpoint: {state['done']} re-issued and {len(state['failed'])} failed "
+            f"across all runs."
+        )
@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from certificates.jobs import run_pending
+from certificates.models import CertificateJob
+
+
+class Command(BaseCommand):
+    help = "Render queued certificate PDFs. Polls the job table until stopped."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help="Drain the queue once and exit."
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=2.0,
+            help="Seconds to wait between polls when the queue is empty."
+        )
+        parser.add_argument(
+            '--max-jobs',
+            type=int,
+            help="Stop after processing this many jobs."
+        )
+
+    def report(self, counts):
+        backlog = CertificateJob.objects.filter(status__in=['queued', 'running']).count()
+        self.stdout.write(
+            f"done={counts['done']} retrying={counts['queued']} "
+            f"failed={counts['failed']} backlog={backlog}"
+        )
+
+    def handle(self, *args, **options):
+        max_jobs = options['max_jobs']
+
+        if options['once']:
+            self.report(run_pending(max_jobs))
+            return
+
+        self.stdout.write("Certificate worker started. Press Ctrl+C to stop.")
+        processed = 0
+
+        try:
+            while max_jobs is None or processed < max_jobs:
+                remaining = None if max_jobs is None else max_jobs - processed
+                counts = run_pending(remaining)
+                handled = sum(counts.values())
+                processed += handled
+
+                if handled:
+                    self.report(counts)
+                else:
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            self.stdout.write("Certificate worker stopped.")
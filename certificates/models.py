@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from courses.models import Course
 
 
@@ -29,3 +30,49 @@ class Certificate(models.Model):
 
     def __str__(self):
         return f"{self.user.username} - {self.course.title}"
+
+    @property
+    def status(self):
+        if self.certificate_file:
+            return 'ready'
+        job = getattr(self, 'job', None)
+        if job is not None and job.status == 'failed':
+            return 'failed'
+        return 'generating'
+
+
+class CertificateJob(models.Model):
+    """
+    Queue row for rendering a certificate PDF off the request path.
+    Workers claim rows with a conditional UPDATE, so no broker is needed.
+    """
+
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    certificate = models.OneToOneField(
+        Certificate,
+        on_delete=models.CASCADE,
+        related_name='job'
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='certjob_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.certificate} ({self.status})"
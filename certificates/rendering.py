@@ -0,0 +1,276 @@
+"""
+Certificate rendering engine.
+
+xhtml2pdf is slow because every call re-parses the HTML/CSS, re-decodes
+the background image and re-lays out the whole page. Only three strings
+differ between certificates, so the layout is compiled once per process:
+
+1. The template is rendered with sentinel values in place of the
+   per-student fields and converted to PDF once.
+2. The text runs containing sentinels are located (position, font, size,
+   colour) and removed from the page, leaving a static background layer.
+3. Each certificate is that background plus a small reportlab overlay
+   that stamps the real values at the recorded positions.
+
+Fields are centred on the position of their sentinel run, matching the
+text-align: center layout of the certificate templates.
+"""
+
+import functools
+import os
+from dataclasses import dataclass
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.files.base import ContentFile
+from django.template.loader import render_to_string
+from django.utils.timezone import now
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import ContentStream
+from reportlab.lib.colors import Color
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from xhtml2pdf import pisa
+
+
+DEFAULT_TEMPLATE = "certificates/certificate_v2.html"
+
+SENTINELS = {
+    'student_name': 'QQSTUDENTNAMEQQ',
+    'course_title': 'QQCOURSETITLEQQ',
+    'issue_date': 'QQISSUEDATEQQ',
+}
+
+# Side margin kept free when a long value has to be shrunk to fit
+PAGE_MARGIN = 40
+
+
+class LayoutError(Exception):
+    pass
+
+
+# ----------------------------
+# ASSETS AND FONTS
+# ----------------------------
+
+@functools.lru_cache(maxsize=None)
+def resolve_asset(uri, rel=None):
+    """
+    xhtml2pdf link_callback: map STATIC_URL/MEDIA_URL references to files
+    on disk so the renderer never goes through HTTP.
+    """
+    if uri.startswith(settings.STATIC_URL):
+        path = finders.find(uri[len(settings.STATIC_URL):])
+        if path:
+            return path
+    if uri.startswith(settings.MEDIA_URL):
+        path = os.path.join(settings.MEDIA_ROOT, uri[len(settings.MEDIA_URL):])
+        if os.path.exists(path):
+            return path
+    return uri
+
+
+@functools.lru_cache(maxsize=None)
+def reportlab_font(base_font):
+    """
+    Map a PDF BaseFont name to a registered reportlab font, registering
+    TrueType fonts from CERTIFICATE_FONTS the first time they are used.
+    """
+    name = base_font.lstrip('/')
+    # Embedded subsets are prefixed with a tag such as ABCDEF+
+    if len(name) > 7 and name[6] == '+':
+        name = name[7:]
+
+    if name in pdfmetrics.standardFonts:
+        return name
+
+    font_files = getattr(settings, 'CERTIFICATE_FONTS', {})
+    if name in font_files:
+        pdfmetrics.registerFont(TTFont(name, font_files[name]))
+        return name
+
+    return 'Helvetica-Bold' if 'Bold' in name else 'Helvetica'
+
+
+def render_html_pdf(html):
+    result = BytesIO()
+    status = pisa.CreatePDF(
+        html,
+        dest=result,
+        link_callback=resolve_asset,
+        path=str(settings.BASE_DIR / 'templates'),
+    )
+    if status.err:
+        return None
+    return result.getvalue()
+
+
+# ----------------------------
+# COMPILED LAYOUT
+# ----------------------------
+
+@dataclass
+class StampField:
+    text: str          # text run with the sentinel still in it
+    center_x: float
+    baseline_y: float
+    font: str
+    size: float
+    color: tuple
+
+
+class CertificateLayout:
+
+    def __init__(self, template_name=DEFAULT_TEMPLATE):
+        self.template_name = template_name
+
+        html = render_to_string(template_name, {
+            **SENTINELS,
+            "STATIC_URL": settings.STATIC_URL,
+        })
+        pdf = render_html_pdf(html)
+        if pdf is None:
+            raise LayoutError(f"Could not render {template_name}.")
+
+        reader = PdfReader(BytesIO(pdf))
+        page = reader.pages[0]
+
+        self.width = float(page.mediabox.width)
+        self.height = float(page.mediabox.height)
+        self.fields = self._find_fields(page)
+
+        missing = [
+            key for key, sentinel in SENTINELS.items()
+            if not any(sentinel in field.text for field in self.fields)
+        ]
+        if missing:
+            raise LayoutError(f"{template_name} has no placeholder for {', '.join(missing)}.")
+
+        self._strip_fields(reader, page)
+
+        background = PdfWriter()
+        background.add_page(page)
+        buffer = BytesIO()
+        background.write(buffer)
+        self.background = buffer.getvalue()
+
+    def _find_fields(self, page):
+        fields = []
+        state = {'color': (0, 0, 0)}
+
+        def before(operator, operands, cm, tm):
+            if operator == b'rg':
+                state['color'] = tuple(float(v) for v in operands)
+            elif operator == b'g':
+                state['color'] = (float(operands[0]),) * 3
+
+        def visit(text, cm, tm, font_dict, font_size):
+            text = text.rstrip('\n')
+            if not any(sentinel in text for sentinel in SENTINELS.values()):
+                return
+            font = reportlab_font(str(font_dict.get('/BaseFont', 'Helvetica')))
+            size = float(font_size) * tm[0] * cm[0]
+            x = cm[4] + tm[4] * cm[0]
+            y = cm[5] + tm[5] * cm[3]
+            width = pdfmetrics.stringWidth(text, font, size)
+            fields.append(StampField(text, x + width / 2, y, font, size, state['color']))
+
+        page.extract_text(visitor_text=visit, visitor_operand_before=before)
+        return fields
+
+    def _strip_fields(self, reader, page):
+        content = ContentStream(page.get_contents(), reader)
+        kept = []
+
+        for operands, operator in content.operations:
+            if operator in (b'Tj', b'TJ', b"'", b'"'):
+                shown = operands[-1]
+                parts = shown if operator == b'TJ' else [shown]
+                text = ''.join(str(part) for part in parts if isinstance(part, str))
+                if any(sentinel in text for sentinel in SENTINELS.values()):
+                    continue
+            kept.append((operands, operator))
+
+        content.operations = kept
+        page.replace_contents(content)
+
+    def _overlay(self, values):
+        buffer = BytesIO()
+        overlay = canvas.Canvas(buffer, pagesize=(self.width, self.height))
+
+        for field in self.fields:
+            text = field.text
+            for key, sentinel in SENTINELS.items():
+                text = text.replace(sentinel, values[key])
+
+            size = field.size
+            width = pdfmetrics.stringWidth(text, field.font, size)
+            max_width = self.width - 2 * PAGE_MARGIN
+            if width > max_width:
+                size = size * max_width / width
+                width = max_width
+
+            overlay.setFillColor(Color(*field.color))
+            overlay.setFont(field.font, size)
+            overlay.drawString(field.center_x - width / 2, field.baseline_y, text)
+
+        overlay.save()
+        return buffer.getvalue()
+
+    def render(self, student_name, course_title, issue_date):
+        overlay = PdfReader(BytesIO(self._overlay({
+            'student_name': student_name,
+            'course_title': course_title,
+            'issue_date': issue_date,
+        }))).pages[0]
+
+        writer = PdfWriter(clone_from=BytesIO(self.background))
+        writer.pages[0].merge_page(overlay)
+
+        result = BytesIO()
+        writer.write(result)
+        return result.getvalue()
+
+
+@functools.lru_cache(maxsize=None)
+def get_layout(template_name=DEFAULT_TEMPLATE):
+    return CertificateLayout(template_name)
+
+
+def clear_layout_cache():
+    get_layout.cache_clear()
+    resolve_asset.cache_clear()
+
+
+# ----------------------------
+# PUBLIC API
+# ----------------------------
+
+def certificate_fields(user, course, issue_date=None):
+    return {
+        'student_name': user.get_full_name() or user.username,
+        'course_title': course.title,
+        'issue_date': (issue_date or now()).strftime("%B %d, %Y"),
+    }
+
+
+def render_certificate(user, course, issue_date=None, template_name=DEFAULT_TEMPLATE):
+    pdf = get_layout(template_name).render(**certificate_fields(user, course, issue_date))
+    return ContentFile(pdf, name=f"certificate_{user.id}_{course.id}.pdf")
+
+
+def render_batch(items, template_name=DEFAULT_TEMPLATE):
+    """
+    Render many certificates against one compiled layout.
+
+    `items` yields (user, course) or (user, course, issue_date) tuples;
+    ContentFile objects are yielded in the same order.
+    """
+    layout = get_layout(template_name)
+    for item in items:
+        user, course, *rest = item
+        issue_date = rest[0] if rest else None
+        pdf = layout.render(**certificate_fields(user, course, issue_date))
+        yield ContentFile(pdf, name=f"certificate_{user.id}_{course.id}.pdf")
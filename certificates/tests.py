@@ -1,3 +1,222 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from pypdf import PdfReader
+
+from accounts.models import User
+from courses.models import Category, Course
+from enrollments.models import Enrollment
+from quizzes.models import Question, Quiz
+from .jobs import claim_next_job, enqueue_certificate, run_pending
+from .models import Certificate, CertificateJob
+from .rendering import SENTINELS, get_layout, render_batch
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def fake_pdf(user, course):
+    return ContentFile(b"%PDF-1.4", name=f"certificate_{user.id}_{course.id}.pdf")
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class CertificateQueueTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        instructor = User.objects.create_user(
+            username="teacher", password="pass12345",
+            role='instructor', is_approved=True
+        )
+        cls.student = User.objects.create_user(
+            username="student", password="pass12345", role='student'
+        )
+        cls.course = Course.objects.create(
+            instructor=instructor,
+            title="Course",
+            description="Description",
+            category=Category.objects.create(name="Programming"),
+            status='published',
+            is_approved=True
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @mock.patch('certificates.jobs.generate_certificate_pdf', side_effect=fake_pdf)
+    def test_worker_renders_queued_certificate(self, generate):
+        cert = enqueue_certificate(self.student, self.course)
+        self.assertEqual(cert.status, 'generating')
+
+        counts = run_pending()
+
+        cert.refresh_from_db()
+        self.assertEqual(counts['done'], 1)
+        self.assertEqual(cert.status, 'ready')
+        self.assertEqual(cert.job.status, 'done')
+        generate.assert_called_once()
+
+    @mock.patch('certificates.jobs.generate_certificate_pdf', return_value=None)
+    def test_failures_retry_with_backoff_then_fail(self, generate):
+        cert = enqueue_certificate(self.student, self.course)
+
+        with self.assertLogs('certificates.jobs', 'WARNING'):
+            run_pending()
+        job = CertificateJob.objects.get(certificate=cert)
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIsNone(claim_next_job())
+
+        for _ in range(2):
+            CertificateJob.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            with self.assertLogs('certificates.jobs', 'WARNING'):
+                run_pending()
+
+        job.refresh_from_db()
+        cert.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 3))
+        self.assertEqual(cert.status, 'failed')
+        self.assertIn("PDF rendering", job.last_error)
+
+    def test_stale_running_job_is_reclaimed(self):
+        cert = enqueue_certificate(self.student, self.course)
+        CertificateJob.objects.filter(certificate=cert).update(
+            status='running',
+            locked_at=timezone.now() - timedelta(hours=1)
+        )
+
+        job = claim_next_job()
+
+        self.assertEqual(job.certificate_id, cert.id)
+        self.assertEqual(job.status, 'running')
+
+    @mock.patch('certificates.jobs.generate_certificate_pdf', side_effect=fake_pdf)
+    def test_quiz_pass_queues_instead_of_rendering(self, generate):
+        quiz = Quiz.objects.create(course=self.course, title="Final", pass_mark=50)
+        question = Question.objects.create(
+            quiz=quiz, text="2 + 2?", option1="3", option2="4",
+            option3="5", option4="6", correct_option=2
+        )
+        Enrollment.objects.create(student=self.student, course=self.course)
+        self.client.force_login(self.student)
+
+        response = self.client.post(
+            reverse('quiz_detail', args=[quiz.id]),
+            {str(question.id): '2'}
+        )
+
+        self.assertContains(response, "generating")
+        generate.assert_not_called()
+        self.assertEqual(CertificateJob.objects.get().status, 'queued')
+
+        certificates = self.client.get(reverse('student_certificates'))
+        self.assertContains(certificates, "Generating")
+
+
+class CertificateRenderingTests(TestCase):
+
+    def test_layout_finds_every_field(self):
+        layout = get_layout()
+
+        stamped = ' '.join(field.text for field in layout.fields)
+        for sentinel in SENTINELS.values():
+            self.assertIn(sentinel, stamped)
+
+    def test_batch_stamps_student_fields(self):
+        course = Course(id=7, title="Data Science 101")
+        users = [
+            User(id=1, username="asha", first_name="Asha", last_name="Verma"),
+            User(id=2, username="ravi"),
+        ]
+
+        files = list(render_batch((user, course) for user in users))
+
+        self.assertEqual([f.name for f in files], ["certificate_1_7.pdf", "certificate_2_7.pdf"])
+        text = PdfReader(BytesIO(files[0].read())).pages[0].extract_text()
+        self.assertIn("Asha Verma", text)
+        self.assertIn('"Data Science 101"', text)
+        self.assertNotIn("QQ", text)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ReissueCommandTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        instructor = User.objects.create_user(
+            username="teacher", password="pass12345", role='instructor'
+        )
+        course = Course.objects.create(
+            instructor=instructor, title="Course", description="Description"
+        )
+        for i in range(5):
+            student = User.objects.create_user(
+                username=f"student{i}", password="pass12345", role='student'
+            )
+            Certificate.objects.create(user=student, course=course)
+
+    def reissue(self, *args):
+        checkpoint = os.path.join(MEDIA_ROOT, 'checkpoint.json')
+        call_command(
+            'reissue_certificates', '--workers=2', '--chunk-size=2',
+            f'--checkpoint={checkpoint}', *args, stdout=StringIO()
+        )
+        with open(checkpoint) as fh:
+            return json.load(fh)
+
+    def test_reissues_all_and_resumes_from_checkpoint(self):
+        state = self.reissue('--restart')
+
+        self.assertEqual(state['done'], 5)
+        self.assertEqual(state['last_id'], Certificate.objects.latest('id').id)
+        for cert in Certificate.objects.all():
+            self.assertEqual(cert.status, 'ready')
+            self.assertTrue(os.path.exists(cert.certificate_file.path))
+
+        self.assertTrue(state['complete'])
+
+        # A finished run is not resumed: the next one re-issues everything
+        state = self.reissue()
+        self.assertEqual(state['done'], 5)
+
+    def write_checkpoint(self, **state):
+        os.makedirs(MEDIA_ROOT, exist_ok=True)
+        with open(os.path.join(MEDIA_ROOT, 'checkpoint.json'), 'w') as fh:
+            json.dump({
+                'template': "certificates/certificate_v2.html",
+                'last_id': Certificate.objects.latest('id').id,
+                'done': 4,
+                'failed': [],
+                'complete': False,
+                **state
+            }, fh)
+
+    def test_resume_retries_failed_certificates(self):
+        first = Certificate.objects.earliest('id')
+        self.write_checkpoint(failed=[first.id])
+
+        state = self.reissue()
+
+        self.assertEqual(state['done'], 5)
+        self.assertEqual(state['failed'], [])
+        first.refresh_from_db()
+        self.assertTrue(os.path.exists(first.certificate_file.path))
+
+    def test_checkpoint_for_another_template_is_not_resumed(self):
+        self.write_checkpoint(template="certificates/certificate.html")
+
+        state = self.reissue()
+
+        self.assertEqual(state['template'], "certificates/certificate_v2.html")
+        self.assertEqual(state['done'], 5)
@@ -1,32 +1,41 @@
 from django.template.loader import render_to_string
 from django.core.files.base import ContentFile
-from xhtml2pdf import pisa
-from io import BytesIO
-from django.utils.timezone import now
-
-
-from django.utils.timezone import now
 from django.conf import settings
 
-from SmartLearn import settings
+from .rendering import (
+    DEFAULT_TEMPLATE,
+    LayoutError,
+    certificate_fields,
+    render_certificate,
+    render_html_pdf,
+)
+
 
 def generate_certificate_pdf(user, course):
+    try:
+        return render_certificate(user, course)
+    except LayoutError:
+        # Template without stampable placeholders: render it in full
+        return render_certificate_html(user, course)
+
+
+def render_certificate_html(user, course, template_name=DEFAULT_TEMPLATE):
+    """
+    Full xhtml2pdf render of the certificate template for one student.
+    Much slower than the compiled layout; kept as the fallback path.
+    """
     html = render_to_string(
-        "certificates/certificate_v2.html",
+        template_name,
         {
-            "student_name": user.get_full_name() or user.username,
-            "course_title": course.title,
-            "issue_date": now().strftime("%B %d, %Y"),
+            **certificate_fields(user, course),
             "STATIC_URL": settings.STATIC_URL
         }
-        )
-
+    )
 
-    result = BytesIO()
-    pisa_status = pisa.CreatePDF(html, dest=result)
+    pdf = render_html_pdf(html)
 
-    if pisa_status.err:
+    if pdf is None:
         return None
 
     file_name = f"certificate_{user.id}_{course.id}.pdf"
-    return ContentFile(result.getvalue(), name=file_name)
+    return ContentFile(pdf, name=file_name)
@@ -0,0 +1,177 @@
+"""
+Instructor analytics.
+
+Every figure is computed by a grouped aggregate query across all of an
+instructor's courses at once, so building the report costs four queries
+whether they teach one course or a hundred. The report is a plain dict
+of lists and numbers, cached per instructor for ANALYTICS_CACHE_TTL
+seconds.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, F, IntegerField, Q, Sum
+from django.db.models.functions import Least
+from django.utils import timezone
+
+from courses.models import Course, Lesson
+from quizzes.models import Quiz, QuizResult
+
+
+DEFAULT_TTL = 300
+
+HISTOGRAM_BUCKETS = 10
+
+
+def cache_key(instructor_id):
+    return f"analytics:instructor:{instructor_id}"
+
+
+# ----------------------------
+# AGGREGATE QUERIES
+# ----------------------------
+
+def _course_rows(instructor):
+    finished = Q(
+        enrollment__total_lessons__gt=0,
+        enrollment__completed_lessons__gte=F('enrollment__total_lessons')
+    )
+    return list(
+        Course.objects
+        .filter(instructor=instructor)
+        .values('id', 'title', 'status')
+        .annotate(
+            enrollments=Count('enrollment'),
+            finished=Count('enrollment', filter=finished),
+        )
+        .order_by('-enrollments', 'title')
+    )
+
+
+def _funnel_rows(instructor):
+    return list(
+        Lesson.objects
+        .filter(course__instructor=instructor)
+        .values('course_id', 'order', 'title')
+        .annotate(
+            completed=Count('lessonprogress', filter=Q(lessonprogress__completed=True))
+        )
+        .order_by('course_id', 'order')
+    )
+
+
+def _quiz_rows(instructor):
+    return list(
+        Quiz.objects
+        .filter(course__instructor=instructor)
+        .values('id', 'title', 'course_id', 'pass_mark')
+        .annotate(
+            students=Count('results'),
+            passed=Count('results', filter=Q(results__passed=True)),
+            attempts=Sum('results__attempts'),
+            average=Avg('results__score'),
+        )
+        .order_by('course_id')
+    )
+
+
+def _histogram_rows(instructor):
+    # Scores are 0-100; 100 shares the top bucket with 90-99
+    bucket = Least(
+        F('score') * HISTOGRAM_BUCKETS / 100,
+        HISTOGRAM_BUCKETS - 1,
+        output_field=IntegerField()
+    )
+    return list(
+        QuizResult.objects
+        .filter(quiz__course__instructor=instructor)
+        .annotate(bucket=bucket)
+        .values('quiz_id', 'bucket')
+        .annotate(students=Count('id'))
+    )
+
+
+# ----------------------------
+# REPORT
+# ----------------------------
+
+def _percent(part, whole):
+    return round(part * 100 / whole) if whole else 0
+
+
+def build_report(instructor):
+    courses = _course_rows(instructor)
+    by_id = {}
+
+    for course in courses:
+        course['completion_rate'] = _percent(course['finished'], course['enrollments'])
+        course['funnel'] = []
+        course['quiz'] = None
+        by_id[course['id']] = course
+
+    for step in _funnel_rows(instructor):
+        course = by_id[step['course_id']]
+        funnel = course['funnel']
+        previous = funnel[-1]['completed'] if funnel else course['enrollments']
+
+        step['percent'] = _percent(step['completed'], course['enrollments'])
+        step['drop_off'] = max(previous - step['completed'], 0)
+        funnel.append(step)
+
+    histograms = {}
+    for row in _histogram_rows(instructor):
+        bars = histograms.setdefault(row['quiz_id'], [0] * HISTOGRAM_BUCKETS)
+        bars[row['bucket']] = row['students']
+
+    for quiz in _quiz_rows(instructor):
+        bars = histograms.get(quiz['id'], [0] * HISTOGRAM_BUCKETS)
+        tallest = max(bars) or 1
+        width = 100 // HISTOGRAM_BUCKETS
+
+        quiz['pass_rate'] = _percent(quiz['passed'], quiz['students'])
+        quiz['attempts'] = quiz['attempts'] or 0
+        quiz['average'] = round(quiz['average'] or 0)
+        quiz['histogram'] = [
+            {
+                'label': f"{i * width}-{i * width + width - 1}" if i < HISTOGRAM_BUCKETS - 1
+                         else f"{i * width}-100",
+                'students': count,
+                'height': _percent(count, tallest),
+            }
+            for i, count in enumerate(bars)
+        ]
+        by_id[quiz['course_id']]['quiz'] = quiz
+
+    enrollments = sum(course['enrollments'] for course in courses)
+    finished = sum(course['finished'] for course in courses)
+
+    return {
+        'courses': courses,
+        'totals': {
+            'courses': len(courses),
+            'enrollments': enrollments,
+            'finished': finished,
+            'completion_rate': _percent(finished, enrollments),
+        },
+        'generated_at': timezone.now(),
+    }
+
+
+def instructor_report(instructor):
+    """
+    Cached report for one instructor. Figures can be up to
+    ANALYTICS_CACHE_TTL seconds old.
+    """
+    key = cache_key(instructor.id)
+    report = cache.get(key)
+
+    if report is None:
+        report = build_report(instructor)
+        ttl = getattr(settings, 'ANALYTICS_CACHE_TTL', DEFAULT_TTL)
+        cache.set(key, report, ttl)
+
+    return report
+
+
+def clear_report(instructor_id):
+    cache.delete(cache_key(instructor_id))
@@ -0,0 +1,27 @@
+"""
+Cached site totals for the admin dashboard.
+
+The three counts are cached together for COUNTS_TTL seconds and
+invalidated by signals when a user, course or enrollment is created or
+deleted. Bulk loads bypass signals; they call COUNTS.invalidate()
+themselves or wait out the TTL.
+"""
+
+from SmartLearn.cache import Namespace
+
+from accounts.models import User
+from courses.models import Course
+from enrollments.models import Enrollment
+
+
+COUNTS_TTL = 300
+
+COUNTS = Namespace('dashboard', 'counts', timeout=COUNTS_TTL)
+
+
+def site_counts():
+    return COUNTS.get_or_set('site', lambda: {
+        'users': User.objects.count(),
+        'courses': Course.objects.count(),
+        'enrollments': Enrollment.objects.count(),
+    })
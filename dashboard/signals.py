@@ -0,0 +1,26 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import User
+from courses.models import Course
+from enrollments.models import Enrollment
+from .caching import COUNTS
+
+
+# ----------------------------
+# SITE COUNTS CACHE
+# ----------------------------
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Enrollment)
+def row_added(sender, created=False, **kwargs):
+    if created:
+        COUNTS.invalidate()
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Enrollment)
+def row_removed(sender, **kwargs):
+    COUNTS.invalidate()
@@ -1,3 +1,121 @@
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from accounts.models import User
+from courses.models import Course, Lesson
+from enrollments.models import Enrollment, LessonProgress
+from quizzes.models import Quiz, QuizResult
+from . import analytics
+
+
+class InstructorAnalyticsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create_user(
+            username="teacher", password="pass12345",
+            role='instructor', is_approved=True
+        )
+        cls.courses = []
+        for c in range(3):
+            course = Course.objects.create(
+                instructor=cls.instructor, title=f"Course {c}", description="Description"
+            )
+            lessons = Lesson.objects.bulk_create([
+                Lesson(course=course, title=f"Lesson {i}", order=i) for i in range(1, 4)
+            ])
+            quiz = Quiz.objects.create(course=course, title="Final", pass_mark=50)
+
+            for s, score in enumerate([20, 55, 100, 100]):
+                student = User.objects.create_user(
+                    username=f"student{c}-{s}", password="pass12345", role='student'
+                )
+                enrollment = Enrollment.objects.create(
+                    student=student, course=course,
+                    total_lessons=3, completed_lessons=s
+                )
+                LessonProgress.objects.bulk_create([
+                    LessonProgress(enrollment=enrollment, lesson=lesson, completed=True)
+                    for lesson in lessons[:enrollment.completed_lessons]
+                ])
+                QuizResult.objects.create(
+                    quiz=quiz, user=student, score=score, passed=score >= 50
+                )
+            cls.courses.append(course)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_report_aggregates_every_course(self):
+        report = analytics.build_report(self.instructor)
+
+        self.assertEqual(report['totals']['enrollments'], 12)
+        self.assertEqual(report['totals']['finished'], 3)
+
+        course = report['courses'][0]
+        self.assertEqual([step['completed'] for step in course['funnel']], [3, 2, 1])
+        self.assertEqual([step['drop_off'] for step in course['funnel']], [1, 1, 1])
+
+        quiz = course['quiz']
+        self.assertEqual((quiz['students'], quiz['passed'], quiz['pass_rate']), (4, 3, 75))
+        self.assertEqual(
+            [bar['students'] for bar in quiz['histogram']],
+            [0, 0, 1, 0, 0, 1, 0, 0, 0, 2]
+        )
+
+    def test_page_is_constant_queries_and_cached(self):
+        self.client.force_login(self.instructor)
+        url = reverse('instructor_analytics')
+
+        # session + user + four aggregates
+        with self.assertNumQueries(6):
+            response = self.client.get(url)
+        self.assertContains(response, "Course 2")
+
+        with self.assertNumQueries(2):
+            self.client.get(url)
+
+
+class StudentQuizzesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create_user(
+            username="teacher", password="pass12345",
+            role='instructor', is_approved=True
+        )
+        cls.student = User.objects.create_user(
+            username="student", password="pass12345", role='student'
+        )
+
+    def enroll_in(self, count):
+        courses = Course.objects.bulk_create([
+            Course(instructor=self.instructor, title=f"Course {i}", description="Description")
+            for i in range(count)
+        ])
+        quizzes = Quiz.objects.bulk_create([
+            Quiz(course=course, title=f"Quiz {course.title}") for course in courses
+        ])
+        Enrollment.objects.bulk_create([
+            Enrollment(student=self.student, course=course) for course in courses
+        ])
+        # Half of the quizzes already taken
+        QuizResult.objects.bulk_create([
+            QuizResult(quiz=quiz, user=self.student, score=80, passed=True)
+            for quiz in quizzes[::2]
+        ])
+
+    def test_query_budget_is_constant(self):
+        self.client.force_login(self.student)
+        url = reverse('student_quizzes')
+
+        # 1, then 10, then 200 enrollments in total
+        for count in (1, 9, 190):
+            self.enroll_in(count)
+            # session + user + quizzes
+            with self.assertNumQueries(3):
+                response = self.client.get(url)
+
+        self.assertEqual(len(response.context['available_quizzes']), 99)
+        self.assertEqual(len(response.context['completed_quizzes']), 101)
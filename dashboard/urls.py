@@ -31,5 +31,7 @@ urlpatterns = [
     path('admin/', views.admin_dashboard, name='admin_dashboard'),
     path('admin/approve-instructors/', views.approve_instructors, name='approve_instructors'),
     path('admin/approve-courses/', views.approve_courses, name='approve_courses'),
+    path('admin/profiles/', views.admin_profiles, name='admin_profiles'),
+    path('admin/profiles/<slug:name>/<slug:stamp>.<str:fmt>', views.admin_profile_download, name='admin_profile_download'),
 
 ]
@@ -2,13 +2,21 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.core.exceptions import PermissionDenied
 from django.contrib import messages
-from django.db.models import Count
-from quizzes.models import Quiz, QuizResult
+from django.db import transaction
+from django.db.models import Count, F, FilteredRelation, Q
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from quizzes.models import Quiz
 from courses.models import Course, Lesson
 from enrollments.models import Enrollment
 from accounts.models import User
 from certificates.models import Certificate
 from accounts.forms import ProfileUpdateForm
+from SmartLearn import profiling
+from SmartLearn.cache import stats as cache_stats
+from SmartLearn.querybudget import query_budget
+from . import analytics
+from .caching import site_counts
 
 
 # ----------------------------
@@ -31,6 +39,7 @@ def student_required(user):
 # MAIN DASHBOARD REDIRECT
 # ----------------------------
 
+@query_budget(2)
 @login_required(login_url='/accounts/login/')
 def main_dashboard(request):
     if request.user.role == 'student':
@@ -47,12 +56,16 @@ def main_dashboard(request):
 # STUDENT DASHBOARD
 # ----------------------------
 
+@query_budget(4)
 @login_required(login_url='/accounts/login/')
 def student_dashboard(request):
     if request.user.role != 'student':
         raise PermissionDenied("Students only.")
 
-    enrollments = Enrollment.objects.filter(student=request.user)
+    # Progress comes from the stored counters, no per-enrollment queries
+    enrollments = Enrollment.objects.filter(
+        student=request.user
+    ).select_related('course', 'course__category')
 
     completed_courses = 0
     for e in enrollments:
@@ -74,6 +87,7 @@ def student_dashboard(request):
 # STUDENT: PROFILE
 # ----------------------------
 
+@query_budget(2)
 @login_required(login_url='/accounts/login/')
 def student_profile(request):
     if request.user.role != 'student':
@@ -82,6 +96,7 @@ def student_profile(request):
     return render(request, 'dashboard/student_profile.html')
 
 
+@query_budget(4)
 @login_required(login_url='/accounts/login/')
 def edit_profile(request):
     if request.user.role != 'student':
@@ -111,12 +126,15 @@ def edit_profile(request):
 # STUDENT: COURSES
 # ----------------------------
 
+@query_budget(3)
 @login_required(login_url='/accounts/login/')
 def student_courses(request):
     if request.user.role != 'student':
         raise PermissionDenied("Students only.")
 
-    enrollments = Enrollment.objects.filter(student=request.user)
+    enrollments = Enrollment.objects.filter(
+        student=request.user
+    ).select_related('course')
 
     return render(request, 'dashboard/student_courses.html', {
         'enrollments': enrollments
@@ -127,18 +145,16 @@ def student_courses(request):
 # STUDENT: NOTES
 # ----------------------------
 
+@query_budget(3)
 @login_required(login_url='/accounts/login/')
 def student_notes(request):
     if request.user.role != 'student':
         raise PermissionDenied("Students only.")
 
-    enrollments = Enrollment.objects.filter(student=request.user)
-    courses = [e.course for e in enrollments]
-
     lessons = Lesson.objects.filter(
-        course__in=courses,
+        course__enrollment__student=request.user,
         pdf_notes__isnull=False
-    ).exclude(pdf_notes='')
+    ).exclude(pdf_notes='').select_related('course')
 
     return render(request, 'dashboard/student_notes.html', {
         'lessons': lessons
@@ -149,15 +165,16 @@ def student_notes(request):
 # STUDENT: CERTIFICATES
 # ----------------------------
 
+@query_budget(3)
 @login_required(login_url='/accounts/login/')
 def student_certificates(request):
     if request.user.role != 'student':
         raise PermissionDenied("Students only.")
 
+    # Includes certificates still being rendered by the worker
     certificates = Certificate.objects.filter(
-        user=request.user,
-        certificate_file__isnull=False
-    )
+        user=request.user
+    ).select_related('course', 'job')
 
     return render(request, 'dashboard/student_certificates.html', {
         'certificates': certificates
@@ -168,37 +185,42 @@ def student_certificates(request):
 # STUDENT: QUIZZES / ASSIGNMENTS
 # ----------------------------
 
+@query_budget(3)
 @login_required(login_url='/accounts/login/')
 def student_quizzes(request):
     if request.user.role != 'student':
         raise PermissionDenied("Students only.")
 
-    # Courses student is enrolled in
-    enrollments = Enrollment.objects.filter(student=request.user)
+    # One query: enrolled course -> quiz, left-joined to this student's
+    # best result (at most one row per quiz, QuizResult is unique)
+    quizzes = (
+        Quiz.objects
+        .filter(course__enrollment__student=request.user)
+        .select_related('course')
+        .annotate(
+            my_result=FilteredRelation('results', condition=Q(results__user=request.user))
+        )
+        .annotate(
+            score=F('my_result__score'),
+            passed=F('my_result__passed'),
+            attempt_count=F('my_result__attempts'),
+        )
+        .order_by('course__title', 'id')
+    )
 
     available_quizzes = []
     completed_quizzes = []
 
-    for enrollment in enrollments:
-        course = enrollment.course
-
-        # Check if course has a quiz
-        if hasattr(course, 'quiz'):
-            quiz = course.quiz
-
-            result = QuizResult.objects.filter(
-                quiz=quiz,
-                user=request.user
-            ).first()
-
-            if result:
-                completed_quizzes.append({
-                    'quiz': quiz,
-                    'score': result.score,
-                    'passed': result.passed
-                })
-            else:
-                available_quizzes.append(quiz)
+    for quiz in quizzes:
+        if quiz.score is None:
+            available_quizzes.append(quiz)
+        else:
+            completed_quizzes.append({
+                'quiz': quiz,
+                'score': quiz.score,
+                'passed': quiz.passed,
+                'attempts': quiz.attempt_count
+            })
 
     return render(request, 'dashboard/student_quizzes.html', {
         'available_quizzes': available_quizzes,
@@ -206,6 +228,7 @@ def student_quizzes(request):
     })
 
 
+@query_budget(2)
 @login_required(login_url='/accounts/login/')
 def student_assignments(request):
     if request.user.role != 'student':
@@ -218,12 +241,13 @@ def student_assignments(request):
 # INSTRUCTOR DASHBOARD
 # ----------------------------
 
+@query_budget(4)
 @login_required(login_url='/accounts/login/')
 def instructor_dashboard(request):
     if request.user.role != 'instructor':
         raise PermissionDenied("Instructors only.")
 
-    courses = Course.objects.filter(instructor=request.user)
+    courses = Course.objects.filter(instructor=request.user).select_related('quiz')
 
     return render(request, 'dashboard/instructor.html', {
         'courses': courses
@@ -234,6 +258,7 @@ def instructor_dashboard(request):
 # INSTRUCTOR: MY COURSES
 # ----------------------------
 
+@query_budget(3)
 @login_required(login_url='/accounts/login/')
 def instructor_my_courses(request):
     if request.user.role != 'instructor':
@@ -250,6 +275,7 @@ def instructor_my_courses(request):
 # INSTRUCTOR: STUDENTS (DROPDOWN + COUNTS)
 # ----------------------------
 
+@query_budget(5)
 @login_required
 def instructor_students(request):
     if request.user.role != 'instructor':
@@ -278,6 +304,7 @@ def instructor_students(request):
 # INSTRUCTOR: ADD LESSONS
 # ----------------------------
 
+@query_budget(11)
 @login_required(login_url='/accounts/login/')
 def instructor_add_lessons(request, course_id):
     if request.user.role != 'instructor':
@@ -292,13 +319,15 @@ def instructor_add_lessons(request, course_id):
     lessons = Lesson.objects.filter(course=course).order_by('order')
 
     if request.method == 'POST':
-        Lesson.objects.create(
-            course=course,
-            title=request.POST.get('title'),
-            youtube_url=request.POST.get('youtube_url'),
-            pdf_notes=request.FILES.get('pdf_notes'),
-            order=request.POST.get('order')
-        )
+        # Lesson signals update the course's enrollments in this transaction
+        with transaction.atomic():
+            Lesson.objects.create(
+                course=course,
+                title=request.POST.get('title'),
+                youtube_url=request.POST.get('youtube_url'),
+                pdf_notes=request.FILES.get('pdf_notes'),
+                order=request.POST.get('order')
+            )
 
         messages.success(request, "Lesson added successfully.")
         return redirect('instructor_add_lessons', course_id=course.id)
@@ -313,6 +342,7 @@ def instructor_add_lessons(request, course_id):
 # INSTRUCTOR: PROFILE
 # ----------------------------
 
+@query_budget(2)
 @login_required(login_url='/accounts/login/')
 def instructor_profile(request):
     if request.user.role != 'instructor':
@@ -321,6 +351,7 @@ def instructor_profile(request):
     return render(request, 'dashboard/instructor_profile.html')
 
 
+@query_budget(3)
 @login_required(login_url='/accounts/login/')
 def instructor_edit_profile(request):
     if request.user.role != 'instructor':
@@ -349,6 +380,7 @@ def instructor_edit_profile(request):
 # INSTRUCTOR: QUIZZES (PLACEHOLDER)
 # ----------------------------
 
+@query_budget(2)
 @login_required(login_url='/accounts/login/')
 def instructor_quizzes(request):
     if request.user.role != 'instructor':
@@ -358,41 +390,90 @@ def instructor_quizzes(request):
 
 
 # ----------------------------
-# INSTRUCTOR: ANALYTICS (PLACEHOLDER)
+# INSTRUCTOR: ANALYTICS
 # ----------------------------
 
+@query_budget(6)
 @login_required(login_url='/accounts/login/')
 def instructor_analytics(request):
     if request.user.role != 'instructor':
         raise PermissionDenied("Instructors only.")
 
-    return render(request, 'dashboard/instructor_analytics.html')
+    report = analytics.instructor_report(request.user)
+
+    return render(request, 'dashboard/instructor_analytics.html', report)
 
 
 # ----------------------------
 # ADMIN DASHBOARD
 # ----------------------------
 
+@query_budget(5)
 @login_required(login_url='/accounts/login/')
 def admin_dashboard(request):
     if request.user.role != 'admin':
         raise PermissionDenied("Admins only.")
 
-    users_count = User.objects.count()
-    courses_count = Course.objects.count()
-    enrollments_count = Enrollment.objects.count()
+    counts = site_counts()
 
     return render(request, 'dashboard/admin.html', {
-        'users': users_count,
-        'courses': courses_count,
-        'enrollments': enrollments_count
+        'users': counts['users'],
+        'courses': counts['courses'],
+        'enrollments': counts['enrollments'],
+        'cache_stats': cache_stats(),
+        'profiling_enabled': getattr(settings, 'PROFILING_ENABLED', False),
+    })
+
+
+# ----------------------------
+# ADMIN: REQUEST PROFILES
+# ----------------------------
+
+@query_budget(2)
+@login_required(login_url='/accounts/login/')
+def admin_profiles(request):
+    if request.user.role != 'admin':
+        raise PermissionDenied("Admins only.")
+
+    return render(request, 'dashboard/admin_profiles.html', {
+        'profiles': profiling.list_profiles(),
+        'profiling_enabled': getattr(settings, 'PROFILING_ENABLED', False),
+        'query_param': profiling.QUERY_PARAM,
     })
 
 
+@query_budget(2)
+@login_required(login_url='/accounts/login/')
+def admin_profile_download(request, name, stamp, fmt):
+    if request.user.role != 'admin':
+        raise PermissionDenied("Admins only.")
+
+    if fmt not in ('folded', 'svg'):
+        raise Http404("Unknown format.")
+
+    profile_id = f"{name}/{stamp}"
+    try:
+        stacks = profiling.load_stacks(profile_id)
+    except FileNotFoundError:
+        raise Http404("Profile not found.")
+
+    if fmt == 'svg':
+        content = profiling.flamegraph_svg(stacks, title=profile_id)
+        content_type = 'image/svg+xml'
+    else:
+        content = profiling.collapsed(stacks)
+        content_type = 'text/plain; charset=utf-8'
+
+    response = HttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{name}-{stamp}.{fmt}"'
+    return response
+
+
 # ----------------------------
 # ADMIN: APPROVE INSTRUCTORS
 # ----------------------------
 
+@query_budget(4)
 @user_passes_test(admin_required, login_url='/accounts/login/')
 def approve_instructors(request):
     pending = User.objects.filter(
@@ -417,6 +498,7 @@ def approve_instructors(request):
 # ADMIN: APPROVE COURSES
 # ----------------------------
 
+@query_budget(6)
 @user_passes_test(admin_required, login_url='/accounts/login/')
 def approve_courses(request):
     pending = Course.objects.filter(is_approved=False)
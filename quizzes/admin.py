@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Quiz, Question, QuizResult
+from .models import Quiz, Question, QuizAttempt, QuizResult
 
 
 @admin.register(Quiz)
@@ -18,6 +18,14 @@ class QuestionAdmin(admin.ModelAdmin):
 
 @admin.register(QuizResult)
 class QuizResultAdmin(admin.ModelAdmin):
-    list_display = ('user', 'quiz', 'score', 'passed', 'attempted_at')
+    list_display = ('user', 'quiz', 'score', 'passed', 'attempts', 'attempted_at')
     list_filter = ('passed', 'quiz')
     search_fields = ('user__username', 'quiz__title')
+
+
+@admin.register(QuizAttempt)
+class QuizAttemptAdmin(admin.ModelAdmin):
+    list_display = ('user', 'quiz', 'score', 'correct', 'total', 'passed', 'attempted_at')
+    list_filter = ('passed', 'quiz')
+    search_fields = ('user__username', 'quiz__title')
+    readonly_fields = ('answers', 'question_ids', 'key_version')
@@ -0,0 +1,62 @@
+from django.db import transaction
+
+from .grading import pack_question_ids, pack_selections
+from .models import QuizAttempt, QuizResult
+
+
+# ----------------------------
+# RECORD ATTEMPT
+# ----------------------------
+
+def record_attempt(quiz, user, answer_key, data):
+    """
+    Grade a submission, append it to the attempt log and fold it into the
+    student's best result.
+
+    The attempt is a single INSERT (answers packed into one row). The
+    QuizResult projection is created on the first attempt and afterwards
+    only rewritten when the score improves; `passed` sticks once earned.
+    Returns (attempt, result).
+    """
+    selections, correct = answer_key.grade(data)
+    total = len(answer_key)
+
+    score = int((correct / total) * 100) if total > 0 else 0
+    passed = score >= quiz.pass_mark
+
+    with transaction.atomic():
+        attempt = QuizAttempt.objects.create(
+            quiz=quiz,
+            user=user,
+            score=score,
+            correct=correct,
+            total=total,
+            passed=passed,
+            answers=pack_selections(selections),
+            question_ids=pack_question_ids(answer_key.question_ids),
+            key_version=quiz.key_version,
+        )
+
+        result, created = (
+            QuizResult.objects
+            .select_for_update()
+            .get_or_create(
+                quiz=quiz,
+                user=user,
+                defaults={'score': score, 'passed': passed}
+            )
+        )
+
+        if not created:
+            result.attempts += 1
+            fields = ['attempts']
+            if score > result.score:
+                result.score = score
+                result.attempted_at = attempt.attempted_at
+                fields += ['score', 'attempted_at']
+            if passed and not result.passed:
+                result.passed = True
+                fields.append('passed')
+            result.save(update_fields=fields)
+
+    return attempt, result
@@ -0,0 +1,26 @@
+"""
+Cached course queries.
+
+The catalogue and search pages are cached per (query, cursor) and the
+category list as a whole, each in its own namespace. Signals invalidate
+the catalogue when any course or category changes and the category list
+when a category does.
+"""
+
+import hashlib
+
+from SmartLearn.cache import Namespace
+
+from .models import Category
+
+
+CATALOGUE = Namespace('courses', 'catalogue', timeout=300)
+CATEGORIES = Namespace('courses', 'categories', timeout=3600)
+
+
+def catalogue_key(query, cursor):
+    return hashlib.md5(f"{query}\0{cursor or ''}".encode()).hexdigest()
+
+
+def categories():
+    return CATEGORIES.get_or_set('all', lambda: list(Category.objects.all()))
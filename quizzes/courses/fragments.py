@@ -0,0 +1,35 @@
+"""
+Cached course page fragments.
+
+The public parts of the course detail page and the catalogue cards are
+wrapped in {% cache %} blocks keyed on the course ID and
+Course.content_version. Signals give the course a new version whenever
+it, its category or its lessons change, so a stale fragment is never
+looked up again and simply expires; nothing has to be deleted.
+
+Versions are microsecond timestamps rather than a counter: a Course
+instance loaded before a lesson edit would otherwise save its old
+counter back and land on a version that is already cached.
+"""
+
+import time
+
+from django.conf import settings
+
+from .models import Course
+
+
+DEFAULT_TTL = 3600
+
+
+def fragment_ttl():
+    return getattr(settings, 'COURSE_FRAGMENT_CACHE_TTL', DEFAULT_TTL)
+
+
+def new_version():
+    return time.time_ns() // 1000
+
+
+def bump_content_version(**filters):
+    """Invalidate the fragments of every course matching filters."""
+    Course.objects.filter(**filters).update(content_version=new_version())
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from courses import thumbnails
+from courses.caching import CATALOGUE
+from courses.models import Course
+
+
+class Command(BaseCommand):
+    help = (
+        "Write resized WebP/JPEG derivatives for course thumbnails that "
+        "do not have them yet, e.g. images uploaded before derivatives existed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help="Rebuild every thumbnail's derivatives, not only missing ones."
+        )
+
+    def handle(self, *args, **options):
+        courses = Course.objects.exclude(thumbnail='').exclude(thumbnail__isnull=True)
+
+        built = 0
+        for course in courses.iterator():
+            if options['force'] or thumbnails.is_stale(course):
+                record = thumbnails.build(course, invalidate=False)
+                built += 1
+                self.stdout.write(f"{course.thumbnail.name}: {record.get('widths') or 'not an image'}")
+
+        if built:
+            # Cached catalogue pages still point at the originals
+            CATALOGUE.invalidate()
+
+        self.stdout.write(self.style.SUCCESS(f"Built derivatives for {built} thumbnails."))
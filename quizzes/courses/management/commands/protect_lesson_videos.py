@@ -0,0 +1,48 @@
+import os
+import shutil
+
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+
+from courses import transcoding
+from courses.models import Lesson
+from courses.storage import protected_storage
+
+
+class Command(BaseCommand):
+    help = (
+        "Move lesson videos, and HLS renditions, made before they had "
+        "their own storage from MEDIA_ROOT to PROTECTED_MEDIA_ROOT."
+    )
+
+    def handle(self, *args, **options):
+        public = FileSystemStorage()
+        protected = protected_storage()
+        lessons = Lesson.objects.exclude(video_file='').exclude(video_file__isnull=True)
+
+        moved = 0
+        for name in lessons.values_list('video_file', flat=True).iterator():
+            if protected.exists(name) or not public.exists(name):
+                continue
+            target = protected.path(name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.move(public.path(name), target)
+            moved += 1
+            self.stdout.write(name)
+
+        # Rendition directories are named after their source, so they
+        # move as a whole
+        renditions = 0
+        if public.exists(transcoding.HLS_DIR):
+            for lesson_dir in public.listdir(transcoding.HLS_DIR)[0]:
+                for source_dir in public.listdir(f"{transcoding.HLS_DIR}/{lesson_dir}")[0]:
+                    name = f"{transcoding.HLS_DIR}/{lesson_dir}/{source_dir}"
+                    if protected.exists(name):
+                        continue
+                    os.makedirs(os.path.dirname(protected.path(name)), exist_ok=True)
+                    shutil.move(public.path(name), protected.path(name))
+                    renditions += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Moved {moved} videos and {renditions} sets of renditions out of MEDIA_ROOT."
+        ))
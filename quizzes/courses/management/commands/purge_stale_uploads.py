@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from courses import uploads
+
+
+class Command(BaseCommand):
+    help = "Cancel resumable lesson uploads that have received no chunk for a while."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=float,
+            help="Idle time before an upload is stale. Defaults to RESUMABLE_UPLOAD_EXPIRY (a day)."
+        )
+
+    def handle(self, *args, **options):
+        older_than = timedelta(hours=options['hours']) if options['hours'] else None
+        purged = uploads.purge_stale(older_than)
+
+        self.stdout.write(self.style.SUCCESS(f"Removed {purged} stale uploads."))
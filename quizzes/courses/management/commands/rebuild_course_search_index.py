@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from courses.search import get_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for published courses."
+
+    def handle(self, *args, **options):
+        indexed = get_backend().rebuild()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {indexed} published courses."
+        ))
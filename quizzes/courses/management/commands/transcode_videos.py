@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+
+from courses import transcoding
+from courses.models import Lesson
+
+
+class Command(BaseCommand):
+    help = (
+        "Transcode queued lesson videos to adaptive HLS renditions with ffmpeg. "
+        "Runs until stopped; run one per site, e.g. under systemd or supervisor."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help="ffmpeg processes to run at once. Defaults to VIDEO_TRANSCODE_WORKERS."
+        )
+        parser.add_argument(
+            '--poll',
+            type=float,
+            default=5,
+            help="Seconds between checks of the queue."
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help="Exit once the queue is empty."
+        )
+        parser.add_argument(
+            '--queue-existing',
+            action='store_true',
+            help="First queue videos uploaded before transcoding existed."
+        )
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help="First queue failed jobs again."
+        )
+
+    def handle(self, *args, **options):
+        if options['queue_existing']:
+            queued = 0
+            for lesson in Lesson.objects.exclude(video_file='').exclude(video_file__isnull=True).iterator():
+                if transcoding.is_stale(lesson):
+                    transcoding.queue(lesson)
+                    queued += 1
+            self.stdout.write(f"Queued {queued} videos.")
+
+        if options['retry_failed']:
+            self.stdout.write(f"Queued {transcoding.retry_failed()} failed jobs again.")
+
+        finished = 0
+        jobs = transcoding.run_worker(options['workers'], poll=options['poll'], once=options['once'])
+        for lesson, status in jobs:
+            finished += 1
+            if status == transcoding.FAILED:
+                self.stderr.write(f"Lesson {lesson.pk}: failed: {lesson.hls_error}")
+            elif status == transcoding.READY:
+                self.stdout.write(f"Lesson {lesson.pk}: {', '.join(f'{h}p' for h in lesson.hls_renditions)}")
+            else:
+                self.stdout.write(f"Lesson {lesson.pk}: video replaced while transcoding")
+
+        self.stdout.write(self.style.SUCCESS(f"Finished {finished} jobs."))
@@ -0,0 +1,42 @@
+# Generated by Django 6.0.1 on 2026-10-18 06:10
+
+from django.db import migrations
+
+
+FTS_TABLE = 'courses_course_fts'
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+        f"USING fts5(title, description, category, "
+        f"prefix='2 3', tokenize='unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        f"INSERT INTO {FTS_TABLE} (rowid, title, description, category) "
+        f"SELECT c.id, c.title, c.description, COALESCE(cat.name, '') "
+        f"FROM courses_course c "
+        f"LEFT JOIN courses_category cat ON cat.id = c.category_id "
+        f"WHERE c.status = 'published'"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_lesson_video_file'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 06:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0008_course_catalogue_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='content_version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 06:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0009_course_content_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='thumbnail_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
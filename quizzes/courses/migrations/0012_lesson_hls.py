@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-18 06:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0011_lessonupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='hls_error',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='hls_renditions',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='hls_source',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='hls_status',
+            field=models.CharField(blank=True, choices=[('', 'None'), ('queued', 'Queued'), ('running', 'Transcoding'), ('ready', 'Ready'), ('failed', 'Failed')], db_index=True, default='', editable=False, max_length=10),
+        ),
+    ]
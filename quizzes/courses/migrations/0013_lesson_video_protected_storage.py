@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-18 07:13
+
+import courses.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0012_lesson_hls'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='lesson',
+            name='video_file',
+            field=models.FileField(blank=True, null=True, storage=courses.storage.protected_storage, upload_to='lesson_videos/'),
+        ),
+    ]
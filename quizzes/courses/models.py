@@ -1,7 +1,11 @@
+import uuid
+
 from django.db import models
 from accounts.models import User
 from django.utils.text import slugify
 
+from .storage import protected_storage
+
 
 class Category(models.Model):
     name = models.CharField(max_length=100)
@@ -25,6 +29,9 @@ class Course(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField()
     thumbnail = models.ImageField(upload_to='thumbnails/', blank=True, null=True)
+    # Resized copies of the thumbnail, written by courses.thumbnails:
+    # {'source': name, 'widths': [px, ...]}
+    thumbnail_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True)
     status = models.CharField(
         max_length=20,
@@ -34,6 +41,19 @@ class Course(models.Model):
     is_approved = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Replaced by courses.signals whenever the course, its category or
+    # its lessons change; keys the cached page fragments
+    content_version = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the published catalogue
+            models.Index(
+                fields=['status', '-created_at', '-id'],
+                name='course_catalogue_idx'
+            ),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -47,6 +67,7 @@ class Lesson(models.Model):
     # ✅ NEW: direct video upload
     video_file = models.FileField(
         upload_to='lesson_videos/',
+        storage=protected_storage,
         blank=True,
         null=True
     )
@@ -57,6 +78,28 @@ class Lesson(models.Model):
         null=True
     )
 
+    # Adaptive HLS renditions of video_file, made in the background by
+    # the transcode_videos command (see courses.transcoding)
+    HLS_STATUS_CHOICES = [
+        ('', 'None'),
+        ('queued', 'Queued'),
+        ('running', 'Transcoding'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+    hls_status = models.CharField(
+        max_length=10,
+        choices=HLS_STATUS_CHOICES,
+        blank=True,
+        default='',
+        db_index=True,
+        editable=False
+    )
+    # The video_file name the renditions are (being) made from
+    hls_source = models.CharField(max_length=100, blank=True, default='', editable=False)
+    hls_renditions = models.JSONField(default=list, blank=True, editable=False)
+    hls_error = models.TextField(blank=True, default='', editable=False)
+
     order = models.PositiveIntegerField()
 
     class Meta:
@@ -85,3 +128,27 @@ class Lesson(models.Model):
                 return f"https://www.youtube.com/embed/{video_id}"
 
         return None
+
+
+class LessonUpload(models.Model):
+    """
+    A resumable upload in progress (see courses.uploads). The bytes
+    received so far live in a part file named after the ID; the row
+    records where the next chunk must start.
+    """
+    FIELD_CHOICES = [('video_file', 'Video'), ('pdf_notes', 'Notes')]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE)
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    field = models.CharField(max_length=20, choices=FIELD_CHOICES)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    # Optional hex SHA-256 of the whole file, checked on finalize
+    sha256 = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
@@ -0,0 +1,111 @@
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+
+from .search import search_courses
+
+
+CATALOGUE_PAGE_SIZE = 12
+
+
+# ----------------------------
+# CURSOR ENCODING
+# ----------------------------
+
+def _encode(value):
+    return base64.urlsafe_b64encode(value.encode()).decode().rstrip('=')
+
+
+def _decode(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    return base64.urlsafe_b64decode(padded.encode()).decode()
+
+
+def encode_cursor(course):
+    return _encode(f"k|{course.created_at.isoformat()}|{course.id}")
+
+
+def encode_offset_cursor(offset):
+    return _encode(f"o|{offset}")
+
+
+def decode_cursor(cursor):
+    """
+    Returns ('k', (created_at, id)) for catalogue cursors,
+    ('o', offset) for search cursors, or None if the cursor is invalid.
+    """
+    if not cursor:
+        return None
+    try:
+        kind, _, rest = _decode(cursor).partition('|')
+        if kind == 'k':
+            created_at, _, pk = rest.rpartition('|')
+            return kind, (datetime.fromisoformat(created_at), int(pk))
+        if kind == 'o':
+            return kind, max(int(rest), 0)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        pass
+    return None
+
+
+# ----------------------------
+# PAGES
+# ----------------------------
+
+class CursorPage:
+
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def catalogue_page(queryset, cursor=None, page_size=CATALOGUE_PAGE_SIZE):
+    """
+    Keyset page ordered newest first by (created_at, id). Each page is
+    one indexed range scan of page_size + 1 rows, however deep it is.
+    """
+    queryset = queryset.order_by('-created_at', '-id')
+
+    decoded = decode_cursor(cursor)
+    if decoded and decoded[0] == 'k':
+        created_at, pk = decoded[1]
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) |
+            Q(created_at=created_at, id__lt=pk)
+        )
+
+    rows = list(queryset[:page_size + 1])
+    items = rows[:page_size]
+    next_cursor = encode_cursor(items[-1]) if len(rows) > page_size else None
+
+    return CursorPage(items, next_cursor)
+
+
+def search_page(query, cursor=None, page_size=CATALOGUE_PAGE_SIZE):
+    """
+    Search results stay in relevance order, so their cursor carries the
+    position in the ranking; the index only hands back page_size + 1 IDs.
+    """
+    decoded = decode_cursor(cursor)
+    offset = decoded[1] if decoded and decoded[0] == 'o' else 0
+
+    rows = search_courses(query)[offset:offset + page_size + 1]
+    items = rows[:page_size]
+    next_cursor = (
+        encode_offset_cursor(offset + page_size)
+        if len(rows) > page_size else None
+    )
+
+    return CursorPage(items, next_cursor)
@@ -0,0 +1,83 @@
+from enrollments import gating
+from enrollments.models import LessonProgress
+
+
+# ----------------------------
+# COURSE PROGRESS SNAPSHOT
+# ----------------------------
+
+class CourseProgress:
+    """
+    Lessons of a course plus one enrollment's completion state.
+
+    Loads the ordered lessons and the completed lesson IDs in two
+    queries, then answers completed / locked / progress questions
+    in memory so views never query per lesson. Locks come from the
+    enrollment's stored unlocked order (see enrollments.gating).
+    """
+
+    def __init__(self, course, enrollment=None):
+        self.course = course
+        self.enrollment = enrollment
+        self.lessons = list(course.lesson_set.order_by('order'))
+
+        if enrollment is not None:
+            self.completed_ids = set(
+                LessonProgress.objects.filter(
+                    enrollment=enrollment,
+                    completed=True
+                ).values_list('lesson_id', flat=True)
+            )
+        else:
+            self.completed_ids = set()
+
+        if enrollment is not None and enrollment.unlocked_order is not None:
+            unlocked = enrollment.unlocked_order
+        else:
+            # Not enrolled, or not computed yet: derive it from what is
+            # already loaded rather than querying again
+            unlocked = gating.first_incomplete_order(
+                [lesson.order for lesson in self.lessons],
+                {lesson.order for lesson in self.lessons if lesson.id in self.completed_ids}
+            )
+
+        previous = None
+        for lesson in self.lessons:
+            lesson.completed = lesson.id in self.completed_ids
+            lesson.locked = lesson.order > unlocked
+            lesson.previous_lesson = previous
+            previous = lesson
+
+        self._by_id = {lesson.id: lesson for lesson in self.lessons}
+
+    @property
+    def total_lessons(self):
+        return len(self.lessons)
+
+    @property
+    def completed_lessons(self):
+        return sum(1 for lesson in self.lessons if lesson.completed)
+
+    @property
+    def progress_percent(self):
+        if not self.total_lessons:
+            return 0
+        return int((self.completed_lessons / self.total_lessons) * 100)
+
+    @property
+    def completed_all(self):
+        return self.total_lessons > 0 and self.completed_lessons == self.total_lessons
+
+    def get(self, lesson_id):
+        return self._by_id.get(lesson_id)
+
+    def previous_lesson(self, lesson):
+        entry = self.get(lesson.id)
+        return entry.previous_lesson if entry else None
+
+    def is_locked(self, lesson):
+        entry = self.get(lesson.id)
+        return bool(entry and entry.locked)
+
+    def first_unlocked(self):
+        return next((lesson for lesson in self.lessons if not lesson.locked), None)
@@ -0,0 +1,248 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .models import Course
+
+
+# ----------------------------
+# QUERY PARSING
+# ----------------------------
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(query):
+    return TOKEN_RE.findall((query or '').lower())
+
+
+# ----------------------------
+# BACKENDS
+# ----------------------------
+
+class QFilterBackend:
+    """
+    The original icontains search. Used when no full-text index exists
+    for the current database and as the baseline in the benchmark.
+    """
+
+    def index(self, course):
+        pass
+
+    def remove(self, course_id):
+        pass
+
+    def rebuild(self):
+        return 0
+
+    def _queryset(self, query):
+        return Course.objects.filter(status='published').filter(
+            Q(title__icontains=query) |
+            Q(description__icontains=query) |
+            Q(category__name__icontains=query)
+        )
+
+    def count(self, query):
+        return self._queryset(query).count()
+
+    def search_ids(self, query, limit, offset=0):
+        ids = self._queryset(query).order_by('-created_at', '-id').values_list('id', flat=True)
+        return list(ids[offset:offset + limit])
+
+
+class SQLiteFTSBackend:
+    """
+    SQLite FTS5 inverted index over published courses.
+
+    The row ID of the virtual table is the course ID, so indexing is an
+    upsert and removal a single DELETE. Results are ranked with bm25,
+    weighting title over category over description.
+    """
+
+    table = 'courses_course_fts'
+    weights = (10.0, 1.0, 5.0)  # title, description, category
+
+    def _match(self, query):
+        terms = tokenize(query)
+        if not terms:
+            return None
+        # Every term must match; the last one as a prefix for type-ahead
+        quoted = [f'"{term}"' for term in terms]
+        quoted[-1] += '*'
+        return ' '.join(quoted)
+
+    def index(self, course):
+        if course.status != 'published':
+            self.remove(course.id)
+            return
+
+        category = course.category.name if course.category_id else ''
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [course.id])
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, title, description, category) '
+                f'VALUES (%s, %s, %s, %s)',
+                [course.id, course.title, course.description, category]
+            )
+
+    def remove(self, course_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [course_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, title, description, category) '
+                f'SELECT c.id, c.title, c.description, COALESCE(cat.name, \'\') '
+                f'FROM courses_course c '
+                f'LEFT JOIN courses_category cat ON cat.id = c.category_id '
+                f"WHERE c.status = 'published'"
+            )
+            return cursor.rowcount
+
+    def count(self, query):
+        match = self._match(query)
+        if match is None:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {self.table} WHERE {self.table} MATCH %s',
+                [match]
+            )
+            return cursor.fetchone()[0]
+
+    def search_ids(self, query, limit, offset=0):
+        match = self._match(query)
+        if match is None:
+            return []
+        weights = ', '.join(str(w) for w in self.weights)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s '
+                f'ORDER BY bm25({self.table}, {weights}), rowid DESC '
+                f'LIMIT %s OFFSET %s',
+                [match, limit, offset]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend:
+    """
+    PostgreSQL tsvector search, computed by the database so there is
+    nothing to keep in sync from Python.
+    """
+
+    config = 'english'
+
+    def index(self, course):
+        pass
+
+    def remove(self, course_id):
+        pass
+
+    def rebuild(self):
+        return 0
+
+    def _queryset(self, query):
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        terms = tokenize(query)
+        if not terms:
+            return Course.objects.none()
+
+        vector = (
+            SearchVector('title', weight='A', config=self.config) +
+            SearchVector('category__name', weight='B', config=self.config) +
+            SearchVector('description', weight='C', config=self.config)
+        )
+        raw = ' & '.join(terms[:-1] + [terms[-1] + ':*'])
+        search_query = SearchQuery(raw, search_type='raw', config=self.config)
+
+        return (
+            Course.objects
+            .filter(status='published')
+            .annotate(search=vector, rank=SearchRank(vector, search_query))
+            .filter(search=search_query)
+        )
+
+    def count(self, query):
+        return self._queryset(query).count()
+
+    def search_ids(self, query, limit, offset=0):
+        ids = self._queryset(query).order_by('-rank', '-id').values_list('id', flat=True)
+        return list(ids[offset:offset + limit])
+
+
+DEFAULT_BACKENDS = {
+    'sqlite': 'courses.search.SQLiteFTSBackend',
+    'postgresql': 'courses.search.PostgresSearchBackend',
+}
+
+_backend = None
+
+
+def get_backend():
+    """
+    COURSE_SEARCH_BACKEND picks a backend by dotted path; otherwise it
+    follows the database vendor, falling back to the icontains search.
+    """
+    global _backend
+    if _backend is None:
+        path = getattr(settings, 'COURSE_SEARCH_BACKEND', None) or DEFAULT_BACKENDS.get(
+            connection.vendor,
+            'courses.search.QFilterBackend'
+        )
+        _backend = import_string(path)()
+    return _backend
+
+
+# ----------------------------
+# RESULTS
+# ----------------------------
+
+class SearchResults:
+    """
+    Lazy, sliceable ranked results that work with Django's Paginator:
+    count() is one query and each page fetches only its own courses.
+    """
+
+    def __init__(self, query, backend=None):
+        self.query = query
+        self.backend = backend or get_backend()
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.backend.count(self.query)
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start = key.start or 0
+            stop = key.stop if key.stop is not None else self.count()
+            return self._fetch(start, max(stop - start, 0))
+        return self._fetch(key, 1)[0]
+
+    def _fetch(self, offset, limit):
+        ids = self.backend.search_ids(self.query, limit, offset)
+        courses = Course.objects.select_related('instructor', 'category').in_bulk(ids)
+        return [courses[pk] for pk in ids if pk in courses]
+
+
+def search_courses(query):
+    return SearchResults(query)
+
+
+def suggest_titles(query, limit=8):
+    results = SearchResults(query)
+    return [
+        {'id': course.id, 'title': course.title}
+        for course in results[:limit]
+    ]
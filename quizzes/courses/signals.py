@@ -0,0 +1,165 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import thumbnails, transcoding, uploads
+from .caching import CATALOGUE, CATEGORIES
+from .fragments import bump_content_version, new_version
+from .models import Category, Course, Lesson, LessonUpload
+from .search import get_backend
+from enrollments import counters, gating, seeding
+
+
+# ----------------------------
+# SEARCH INDEX SYNC
+# ----------------------------
+
+@receiver(post_save, sender=Course)
+def index_course(sender, instance, raw=False, **kwargs):
+    if not raw:
+        get_backend().index(instance)
+
+
+@receiver(post_delete, sender=Course)
+def unindex_course(sender, instance, **kwargs):
+    get_backend().remove(instance.id)
+
+
+@receiver(post_save, sender=Category)
+def reindex_category(sender, instance, created=False, raw=False, **kwargs):
+    if created or raw:
+        return
+    backend = get_backend()
+    for course in instance.course_set.filter(status='published'):
+        backend.index(course)
+
+
+@receiver(pre_delete, sender=Category)
+def remember_category_courses(sender, instance, **kwargs):
+    # By post_delete SET_NULL has cleared course.category without signals
+    instance._published_course_ids = list(
+        instance.course_set.filter(status='published').values_list('id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Category)
+def reindex_category_courses(sender, instance, **kwargs):
+    backend = get_backend()
+    ids = getattr(instance, '_published_course_ids', [])
+    for course in Course.objects.filter(id__in=ids):
+        backend.index(course)
+
+
+# ----------------------------
+# FRAGMENT CACHE VERSION
+# ----------------------------
+
+@receiver(pre_save, sender=Course)
+def course_changed(sender, instance, raw=False, **kwargs):
+    # Set on the instance so the save itself writes it; no extra query
+    if not raw:
+        instance.content_version = new_version()
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def lesson_changed(sender, instance, raw=False, origin=None, **kwargs):
+    # Lessons cascading from a course delete have no page left to refresh
+    if raw or isinstance(origin, Course):
+        return
+    bump_content_version(pk=instance.course_id)
+
+
+@receiver(post_save, sender=Category)
+def category_changed(sender, instance, created=False, raw=False, **kwargs):
+    if not (created or raw):
+        bump_content_version(category=instance)
+
+
+# ----------------------------
+# ENROLLMENT PROGRESS
+# ----------------------------
+# Covers the admin and the ORM as well as the instructor views
+
+@receiver(post_save, sender=Lesson)
+def add_lesson_progress(sender, instance, created=False, raw=False, **kwargs):
+    if created and not raw:
+        counters.lesson_added(instance)
+        seeding.backfill_lesson(instance)
+
+
+@receiver(pre_delete, sender=Lesson)
+def remove_lesson_progress(sender, instance, origin=None, **kwargs):
+    # Enrollments cascading from a course delete go with it
+    if not isinstance(origin, Course):
+        counters.lesson_removed(instance)
+
+
+# ----------------------------
+# SEQUENTIAL UNLOCK
+# ----------------------------
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def recompute_unlocked_orders(sender, instance, raw=False, origin=None, update_fields=None, **kwargs):
+    if raw or isinstance(origin, Course):
+        return
+    # Saves that leave the order alone cannot move a lock
+    if update_fields is not None and 'order' not in update_fields:
+        return
+    gating.course_changed(instance.course_id)
+
+
+# ----------------------------
+# CATALOGUE AND CATEGORY CACHES
+# ----------------------------
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_catalogue(sender, **kwargs):
+    CATALOGUE.invalidate()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_categories(sender, **kwargs):
+    # Search results match on category names too
+    CATALOGUE.invalidate()
+    CATEGORIES.invalidate()
+
+
+# ----------------------------
+# THUMBNAIL DERIVATIVES
+# ----------------------------
+
+@receiver(post_save, sender=Course)
+def build_thumbnail_derivatives(sender, instance, raw=False, **kwargs):
+    if not raw and thumbnails.is_stale(instance):
+        thumbnails.build(instance)
+
+
+# ----------------------------
+# RESUMABLE UPLOADS
+# ----------------------------
+
+@receiver(post_delete, sender=LessonUpload)
+def remove_upload_part(sender, instance, **kwargs):
+    # Also runs for uploads cascading from a deleted lesson
+    uploads.part_path(instance).unlink(missing_ok=True)
+
+
+# ----------------------------
+# HLS TRANSCODING
+# ----------------------------
+
+@receiver(post_save, sender=Lesson)
+def queue_transcode(sender, instance, raw=False, **kwargs):
+    if not raw and transcoding.is_stale(instance):
+        transcoding.queue(instance)
+
+
+@receiver(post_delete, sender=Lesson)
+def delete_renditions(sender, instance, **kwargs):
+    # A running job deletes its own output when it finds the lesson gone
+    if instance.hls_source and instance.hls_status != transcoding.RUNNING:
+        transcoding.delete_output(instance.pk, instance.hls_source)
+
@@ -0,0 +1,39 @@
+"""
+Storage for lesson media that may only be reached through access-checked
+views: lesson videos and their HLS renditions.
+
+Files live under PROTECTED_MEDIA_ROOT, outside MEDIA_ROOT, and have no
+URL. Neither the dev server's /media/ route nor a web server publishing
+MEDIA_ROOT can hand them out; streaming.serve() reads them, or passes
+their path to the web server when MEDIA_OFFLOAD is set.
+"""
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils.functional import cached_property
+
+
+class ProtectedMediaStorage(FileSystemStorage):
+
+    @cached_property
+    def base_location(self):
+        return self._value_or_setting(self._location, settings.PROTECTED_MEDIA_ROOT)
+
+    @cached_property
+    def base_url(self):
+        # url() raises instead of linking past the access check
+        return None
+
+    def _clear_cached_properties(self, setting, **kwargs):
+        super()._clear_cached_properties(setting, **kwargs)
+        if setting == 'PROTECTED_MEDIA_ROOT':
+            self.__dict__.pop('base_location', None)
+            self.__dict__.pop('location', None)
+
+
+_protected = ProtectedMediaStorage()
+
+
+def protected_storage():
+    # A callable, so migrations record a reference rather than a path
+    return _protected
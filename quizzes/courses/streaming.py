@@ -0,0 +1,144 @@
+"""
+Protected media streaming.
+
+serve() answers a request for a stored file the caller has already
+authorized. It sends the file in CHUNK_SIZE pieces and supports byte
+ranges (206 Partial Content, 416 when unsatisfiable), so video players
+can seek without downloading everything before the seek point. ETag
+and Last-Modified come from the file's size and modification time, and
+If-None-Match / If-Modified-Since / If-Range are honoured.
+
+With MEDIA_OFFLOAD set, the app only checks access and hands the path to
+the web server, which then does all of the above itself:
+
+    'x-sendfile'        X-Sendfile: <absolute path>   (Apache, lighttpd)
+    'x-accel-redirect'  X-Accel-Redirect: MEDIA_ACCEL_PREFIX + <name>
+                        (nginx, with an `internal` location for the
+                        prefix aliased to PROTECTED_MEDIA_ROOT)
+"""
+
+import mimetypes
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+
+CHUNK_SIZE = 64 * 1024
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single-range Range header, or None to
+    send the whole file (no header, or a form we do not serve, such as
+    several ranges). Raises RangeNotSatisfiable for ranges past the end.
+    """
+    match = _RANGE.match(header.strip()) if header else None
+    if not match:
+        return None
+    first, last = match.groups()
+
+    if not first:
+        if not last:
+            return None
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def _chunks(file, start, length):
+    try:
+        file.seek(start)
+        remaining = length
+        while remaining > 0:
+            data = file.read(min(CHUNK_SIZE, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+    finally:
+        file.close()
+
+
+def _if_range_matches(request, etag, last_modified):
+    """A Range applies unless If-Range names another version of the file."""
+    validator = request.headers.get('If-Range')
+    if not validator:
+        return True
+    if validator.startswith(('"', 'W/')):
+        return validator == etag
+    return parse_http_date_safe(validator) == last_modified
+
+
+# ----------------------------
+# RESPONSES
+# ----------------------------
+
+def serve(request, storage, name, content_type=None):
+    content_type = content_type or mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+    offload = getattr(settings, 'MEDIA_OFFLOAD', None)
+    if offload == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = storage.path(name)
+        return response
+    if offload == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = getattr(settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/') + quote(name)
+        return response
+
+    size = storage.size(name)
+    last_modified = int(storage.get_modified_time(name).timestamp())
+    etag = f'"{last_modified:x}-{size:x}"'
+
+    conditional = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if conditional is not None:
+        return conditional
+
+    byte_range = None
+    if _if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1 if size else 0
+
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+    else:
+        response = StreamingHttpResponse(
+            _chunks(storage.open(name, 'rb'), start, length),
+            content_type=content_type
+        )
+
+    if byte_range:
+        response.status_code = 206
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = length
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # Access-checked content: browsers may keep it, shared caches may not
+    response['Cache-Control'] = 'private, max-age=3600'
+    return response
@@ -0,0 +1,41 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+from courses import thumbnails
+
+register = template.Library()
+
+CARD_SIZES = "(max-width: 768px) 100vw, 33vw"
+
+
+@register.simple_tag
+def course_thumbnail(course, sizes=CARD_SIZES, **attrs):
+    """
+    <img> for a course thumbnail. With derivatives it is wrapped in a
+    <picture> offering WebP and JPEG srcsets, so the browser downloads
+    only the smallest copy that fills `sizes`; without them it points
+    at the original. Extra keyword arguments become <img> attributes.
+
+        {% course_thumbnail course class="card-img-top" %}
+    """
+    if not course.thumbnail:
+        return ''
+
+    attrs.setdefault('alt', course.title)
+    attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+
+    widths = thumbnails.ready_widths(course)
+    if not widths:
+        return format_html('<img src="{}"{}>', course.thumbnail.url, flatatt(attrs))
+
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}"{}>'
+        '</picture>',
+        thumbnails.srcset(course, 'webp'), sizes,
+        thumbnails.thumbnail_url(course), thumbnails.srcset(course, 'jpeg'), sizes,
+        flatatt(attrs)
+    )
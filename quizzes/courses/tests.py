@@ -1,3 +1,770 @@
-from django.test import TestCase
+import base64
+import hashlib
+import json
+import os
+import posixpath
+import shutil
+import subprocess
+import tempfile
+from unittest import skipUnless
+from io import BytesIO, StringIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.conf import settings
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+from PIL import Image
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.views.static import serve as static_serve
+
+from accounts.models import User
+from SmartLearn.testing import QueryBudgetMixin
+from enrollments import seeding
+from enrollments.models import Enrollment, LessonProgress
+from .models import Category, Course, Lesson, LessonUpload
+from .progress import CourseProgress
+from .search import search_courses
+from . import transcoding
+from .storage import protected_storage
+from .thumbnails import derivative_name
+from .views import lesson_player
+
+
+# Session, user, enrollment, progress row, lessons, completed IDs, quiz
+LESSON_PLAYER_QUERY_BUDGET = lesson_player.query_budget
+
+
+def make_course(instructor, lesson_count, title="Course"):
+    category, _ = Category.objects.get_or_create(name="Programming")
+    course = Course.objects.create(
+        instructor=instructor,
+        title=title,
+        description="Description",
+        category=category,
+        status='published',
+        is_approved=True
+    )
+    Lesson.objects.bulk_create([
+        Lesson(course=course, title=f"Lesson {i}", order=i)
+        for i in range(1, lesson_count + 1)
+    ])
+    return course
+
+
+def create_people(cls):
+    """An approved instructor ("teacher") and a student, as class attributes."""
+    cls.instructor = User.objects.create_user(
+        username="teacher", password="pass12345",
+        role='instructor', is_approved=True
+    )
+    cls.student = User.objects.create_user(
+        username="student", password="pass12345", role='student'
+    )
+
+
+def create_video_course(cls, title="Video"):
+    create_people(cls)
+    cls.course = Course.objects.create(
+        instructor=cls.instructor, title=title, description="Description",
+        status='published', is_approved=True
+    )
+
+
+def make_video_lesson(course, order=1, content=b"video"):
+    return Lesson.objects.create(
+        course=course, title=f"Lesson {order}", order=order,
+        video_file=SimpleUploadedFile(f"lesson{order}.mp4", content, content_type='video/mp4')
+    )
+
+
+class TempMediaMixin:
+    """Give each test empty media, protected media and upload directories."""
+
+    def setUp(self):
+        super().setUp()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        override = override_settings(
+            MEDIA_ROOT=os.path.join(self.media, 'public'),
+            PROTECTED_MEDIA_ROOT=os.path.join(self.media, 'protected'),
+            RESUMABLE_UPLOAD_DIR=os.path.join(self.media, 'uploads')
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def media_path(self, name):
+        return os.path.join(self.media, 'public', name)
+
+    def protected_path(self, name):
+        return os.path.join(self.media, 'protected', name)
+
+
+class CourseProgressTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create_user(
+            username="teacher", password="pass12345",
+            role='instructor', is_approved=True
+        )
+        cls.student = User.objects.create_user(
+            username="student", password="pass12345", role='student'
+        )
+
+    def test_snapshot_computes_completed_and_locked(self):
+        course = make_course(self.instructor, 4)
+        enrollment = Enrollment.objects.create(student=self.student, course=course)
+        lessons = list(course.lesson_set.order_by('order'))
+        LessonProgress.objects.create(enrollment=enrollment, lesson=lessons[0], completed=True)
+        LessonProgress.objects.create(enrollment=enrollment, lesson=lessons[1], completed=True)
+
+        with self.assertNumQueries(2):
+            progress = CourseProgress(course, enrollment)
+
+        self.assertEqual(
+            [(l.completed, l.locked) for l in progress.lessons],
+            [(True, False), (True, False), (False, False), (False, True)]
+        )
+        self.assertEqual(progress.progress_percent, 50)
+        self.assertFalse(progress.completed_all)
+
+    def test_snapshot_without_enrollment(self):
+        course = make_course(self.instructor, 2)
+
+        progress = CourseProgress(course)
+
+        self.assertEqual(progress.progress_percent, 0)
+        self.assertTrue(progress.lessons[1].locked)
+
+    def lesson_player_queries(self, lesson_count):
+        course = make_course(self.instructor, lesson_count, title=f"Course {lesson_count}")
+        enrollment = Enrollment.objects.create(student=self.student, course=course)
+        lessons = list(course.lesson_set.order_by('order'))
+        LessonProgress.objects.bulk_create([
+            LessonProgress(enrollment=enrollment, lesson=lesson, completed=True)
+            for lesson in lessons[:-1]
+        ])
+
+        self.client.force_login(self.student)
+        url = reverse('lesson_player', args=[course.id, lessons[-1].id])
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_lesson_player_query_count_is_constant(self):
+        small = self.lesson_player_queries(3)
+        large = self.lesson_player_queries(60)
+
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, LESSON_PLAYER_QUERY_BUDGET)
+
+    def test_lesson_player_redirects_to_previous_when_locked(self):
+        course = make_course(self.instructor, 3)
+        Enrollment.objects.create(student=self.student, course=course)
+        lessons = list(course.lesson_set.order_by('order'))
+
+        self.client.force_login(self.student)
+        response = self.client.get(
+            reverse('lesson_player', args=[course.id, lessons[2].id])
+        )
+
+        self.assertRedirects(
+            response,
+            reverse('lesson_player', args=[course.id, lessons[1].id]),
+            fetch_redirect_response=False
+        )
+
+
+class CourseFragmentCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create_user(
+            username="teacher", password="pass12345",
+            role='instructor', is_approved=True
+        )
+        cls.student = User.objects.create_user(
+            username="student", password="pass12345", role='student'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.course = make_course(self.instructor, 3)
+        self.client.force_login(self.student)
+        self.url = reverse('course_detail', args=[self.course.id])
+
+    def test_lessons_are_not_queried_on_a_cache_hit(self):
+        self.client.get(self.url)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+
+        self.assertContains(response, "Lesson 3")
+        self.assertFalse(any('courses_lesson' in q['sql'] for q in ctx.captured_queries))
+
+    def test_lesson_and_course_edits_refresh_the_fragment(self):
+        self.client.get(self.url)
+        version = Course.objects.get(pk=self.course.pk).content_version
+
+        Lesson.objects.create(course=self.course, title="Bonus lesson", order=4)
+        self.assertContains(self.client.get(self.url), "Bonus lesson")
+
+        self.course.refresh_from_db()
+        self.course.description = "Rewritten description"
+        self.course.save()
+        self.assertContains(self.client.get(self.url), "Rewritten description")
+
+        self.assertGreater(Course.objects.get(pk=self.course.pk).content_version, version)
+
+    def test_catalogue_cards_follow_the_version(self):
+        self.client.get(reverse('courses_list'))
+
+        self.course.title = "Renamed course"
+        self.course.save()
+
+        self.assertContains(self.client.get(reverse('courses_list')), "Renamed course")
+
+
+class CourseSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create_user(
+            username="teacher", password="pass12345",
+            role='instructor', is_approved=True
+        )
+        cls.category = Category.objects.create(name="Programming")
+
+    def create(self, title, description="Description", status='published'):
+        return Course.objects.create(
+            instructor=self.instructor,
+            title=title,
+            description=description,
+            category=self.category,
+            status=status,
+            is_approved=True
+        )
+
+    def titles(self, query):
+        return [course.title for course in search_courses(query)[:20]]
+
+    def test_index_follows_save_and_delete(self):
+        course = self.create("Django Basics")
+        self.assertEqual(self.titles("django"), ["Django Basics"])
+
+        course.status = 'draft'
+        course.save()
+        self.assertEqual(self.titles("django"), [])
+
+        course.status = 'published'
+        course.title = "Flask Basics"
+        course.save()
+        self.assertEqual(self.titles("flask"), ["Flask Basics"])
+
+        course.delete()
+        self.assertEqual(self.titles("flask"), [])
+
+    def test_title_match_ranks_above_description(self):
+        self.create("Cooking", description="Also covers python scripting")
+        self.create("Python for Beginners")
+
+        self.assertEqual(self.titles("python"), ["Python for Beginners", "Cooking"])
+
+    def test_prefix_and_category_match(self):
+        self.create("Machine Learning")
+
+        self.assertEqual(self.titles("machine lea"), ["Machine Learning"])
+        self.assertEqual(self.titles("program"), ["Machine Learning"])
+        self.assertEqual(self.titles("!!"), [])
+
+    def test_category_rename_and_delete_reach_the_index(self):
+        self.create("Machine Learning")
+
+        self.category.name = "Data Science"
+        self.category.save()
+        self.assertEqual(self.titles("science"), ["Machine Learning"])
+        self.assertEqual(self.titles("program"), [])
+
+        self.category.delete()
+        self.assertEqual(self.titles("science"), [])
+        self.assertEqual(self.titles("machine"), ["Machine Learning"])
+
+    def test_home_searches_with_the_navbar_query(self):
+        self.create("Haskell Fundamentals")
+        self.create("Gardening")
+
+        response = self.client.get(reverse('home'), {'q': 'haskell'})
+
+        self.assertEqual([course.title for course in response.context['courses']], ["Haskell Fundamentals"])
+        self.assertContains(response, "Results for")
+
+    def test_courses_list_paginates_results(self):
+        for i in range(15):
+            self.create(f"Rust Course {i}")
+
+        first = self.client.get(reverse('courses_list'), {'q': 'rust'})
+        cursor = first.context['page'].next_cursor
+        second = self.client.get(reverse('courses_list'), {'q': 'rust', 'cursor': cursor})
+
+        self.assertEqual(len(first.context['courses']), 12)
+        self.assertEqual(len(second.context['courses']), 3)
+        self.assertFalse(second.context['page'].has_next)
+
+    def test_suggest_endpoint(self):
+        course = self.create("Kubernetes in Practice")
+
+        response = self.client.get(reverse('course_search_suggest'), {'q': 'kube'})
+
+        self.assertEqual(
+            response.json()['results'],
+            [{'id': course.id, 'title': "Kubernetes in Practice"}]
+        )
+
+
+class CataloguePaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        instructor = User.objects.create_user(
+            username="teacher", password="pass12345",
+            role='instructor', is_approved=True
+        )
+        Course.objects.bulk_create([
+            Course(
+                instructor=instructor, title=f"Course {i}",
+                description="Description", status='published', is_approved=True
+            )
+            for i in range(30)
+        ])
+        # Shared timestamps exercise the id tie-breaker
+        Course.objects.update(created_at=Course.objects.first().created_at)
+
+    def setUp(self):
+        # Pages are cached; each test measures its own requests
+        cache.clear()
+
+    def walk(self, url, **params):
+        ids, cursor = [], None
+        while True:
+            if cursor:
+                params['cursor'] = cursor
+            data = self.client.get(url, params).json()
+            ids.extend(course['id'] for course in data['results'])
+            cursor = data['next_cursor']
+            if not cursor:
+                return ids
+
+    def test_feed_walks_catalogue_without_gaps_or_repeats(self):
+        ids = self.walk(reverse('courses_feed'))
+
+        expected = list(
+            Course.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_page_query_count_is_independent_of_depth(self):
+        url = reverse('courses_feed')
+        first = self.client.get(url).json()
+
+        with self.assertNumQueries(1):
+            self.client.get(url, {'cursor': first['next_cursor']})
+
+    def test_home_shows_one_page_and_links_the_next(self):
+        response = self.client.get(reverse('home'))
+        page = response.context['page']
+
+        self.assertEqual(len(response.context['courses']), 12)
+        self.assertContains(response, f"{reverse('courses_list')}?cursor={page.next_cursor}")
+
+    def test_invalid_cursor_returns_first_page(self):
+        response = self.client.get(reverse('courses_list'), {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(len(response.context['courses']), 12)
+
+
+
+def image_upload(name, size=(1000, 500), fmt='PNG'):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'teal').save(buffer, fmt)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type=f'image/{fmt.lower()}')
+
+
+class ThumbnailDerivativeTests(TempMediaMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_people(cls)
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def create(self, thumbnail):
+        return Course.objects.create(
+            instructor=self.instructor, title="Pictures", description="Description",
+            thumbnail=thumbnail, status='published', is_approved=True
+        )
+
+    def exists(self, name):
+        return os.path.exists(self.media_path(name))
+
+    def test_upload_writes_resized_webp_and_jpeg(self):
+        course = self.create(image_upload('shot.png'))
+
+        record = Course.objects.get(pk=course.pk).thumbnail_derivatives
+        self.assertEqual(record['widths'], [320, 640, 960])
+
+        name = derivative_name(course.thumbnail.name, 640, 'webp')
+        with Image.open(self.media_path(name)) as image:
+            self.assertEqual((image.format, image.size), ('WEBP', (640, 320)))
+        self.assertTrue(self.exists(derivative_name(course.thumbnail.name, 320, 'jpeg')))
+
+    def test_tag_and_feed_serve_derivatives(self):
+        course = self.create(image_upload('shot.png'))
+
+        html = Template(
+            '{% load thumbnails %}{% course_thumbnail course class="card-img-top" %}'
+        ).render(Context({'course': course}))
+        self.assertIn('<source type="image/webp" srcset="/media/thumbnails/derived/', html)
+        self.assertIn('-960w.webp 960w', html)
+        self.assertIn('class="card-img-top"', html)
+
+        result = self.client.get(reverse('courses_feed')).json()['results'][0]
+        self.assertTrue(result['thumbnail'].endswith('-640w.jpg'))
+
+    def test_backfill_refreshes_cached_catalogue(self):
+        course = self.create(image_upload('shot.png'))
+        Course.objects.filter(pk=course.pk).update(thumbnail_derivatives={})
+        cache.clear()
+        feed = reverse('courses_feed')
+        self.assertEqual(self.client.get(feed).json()['results'][0]['thumbnail'], course.thumbnail.url)
+
+        call_command('build_course_thumbnails', stdout=StringIO())
+
+        self.assertTrue(self.client.get(feed).json()['results'][0]['thumbnail'].endswith('-640w.jpg'))
+
+    def test_replacing_thumbnail_removes_old_derivatives(self):
+        course = self.create(image_upload('first.png'))
+        old = derivative_name(course.thumbnail.name, 320, 'webp')
+
+        course.thumbnail = image_upload('second.jpg', size=(300, 200), fmt='JPEG')
+        course.save()
+
+        self.assertFalse(self.exists(old))
+        self.assertEqual(course.thumbnail_derivatives['widths'], [300])
+
+    def test_undecodable_upload_falls_back_to_original(self):
+        upload = SimpleUploadedFile('broken.png', b'not an image', content_type='image/png')
+        with self.assertLogs('courses.thumbnails', 'WARNING'):
+            course = self.create(upload)
+
+        html = Template('{% load thumbnails %}{% course_thumbnail course %}').render(
+            Context({'course': course})
+        )
+        self.assertIn(f'src="{course.thumbnail.url}"', html)
+        self.assertNotIn('<picture>', html)
+
+
+class LessonVideoStreamingTests(TempMediaMixin, TestCase):
+
+    VIDEO = bytes(range(256)) * 1024
+
+    @classmethod
+    def setUpTestData(cls):
+        create_video_course(cls)
+        cls.outsider = User.objects.create_user(
+            username="outsider", password="pass12345", role='student'
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.first, self.second = [
+            make_video_lesson(self.course, order, self.VIDEO) for order in (1, 2)
+        ]
+        seeding.enroll(self.student, self.course)
+        self.client.force_login(self.student)
+        self.url = reverse('lesson_video', args=[self.course.id, self.first.id])
+
+    def test_full_and_ranged_reads(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertEqual(b''.join(response.streaming_content), self.VIDEO)
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=1000-1999')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 1000-1999/{len(self.VIDEO)}')
+        self.assertEqual(b''.join(response.streaming_content), self.VIDEO[1000:2000])
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-10')
+        self.assertEqual(b''.join(response.streaming_content), self.VIDEO[-10:])
+
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.VIDEO)}-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_conditional_requests(self):
+        etag = self.client.head(self.url)['ETag']
+
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # A stale If-Range gets the whole current file instead of a slice
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+
+    def test_access_requires_unlocked_enrollment(self):
+        locked = reverse('lesson_video', args=[self.course.id, self.second.id])
+        self.assertEqual(self.client.get(locked).status_code, 403)
+
+        self.client.force_login(self.outsider)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+        self.client.force_login(self.instructor)
+        self.assertEqual(self.client.get(locked).status_code, 200)
+
+    def test_videos_are_unreachable_through_public_media(self):
+        name = self.first.video_file.name
+        self.assertTrue(os.path.exists(self.protected_path(name)))
+        self.assertFalse(os.path.exists(self.media_path(name)))
+        with self.assertRaises(ValueError):
+            self.first.video_file.url
+
+        self.client.logout()
+        with override_settings(DEBUG=True):
+            # The dev server's media route, as SmartLearn.urls mounts it
+            with self.assertRaises(Http404):
+                static_serve(RequestFactory().get('/'), name, document_root=settings.MEDIA_ROOT)
+            self.assertEqual(self.client.get(f'{settings.MEDIA_URL}{name}').status_code, 404)
+
+    def test_command_moves_videos_out_of_public_media(self):
+        name = self.first.video_file.name
+        os.makedirs(os.path.dirname(self.media_path(name)))
+        os.replace(self.protected_path(name), self.media_path(name))
+
+        call_command('protect_lesson_videos', stdout=StringIO())
+
+        self.assertFalse(os.path.exists(self.media_path(name)))
+        self.assertEqual(b''.join(self.client.get(self.url).streaming_content), self.VIDEO)
+
+    @override_settings(MEDIA_OFFLOAD='x-accel-redirect', MEDIA_ACCEL_PREFIX='/protected-media/')
+    def test_offload_hands_the_file_to_the_web_server(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.first.video_file.name}')
+        self.assertEqual(response.content, b'')
+
+
+class ResumableUploadTests(QueryBudgetMixin, TempMediaMixin, TestCase):
+
+    DATA = os.urandom(300 * 1024)
+
+    @classmethod
+    def setUpTestData(cls):
+        create_video_course(cls, title="Uploads")
+        cls.other = User.objects.create_user(
+            username="other", password="pass12345",
+            role='instructor', is_approved=True
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.lesson = Lesson.objects.create(course=self.course, title="Lesson", order=1)
+        self.client.force_login(self.instructor)
+
+    def start(self, **extra):
+        data = {'field': 'video_file', 'filename': 'lecture.mp4', 'size': len(self.DATA), **extra}
+        return self.client.post(
+            reverse('lesson_upload_create', args=[self.course.id, self.lesson.id]),
+            json.dumps(data),
+            content_type='application/json'
+        )
+
+    def patch(self, url, offset, chunk, checksum=None):
+        headers = {'Upload-Offset': str(offset)}
+        if checksum:
+            headers['Upload-Checksum'] = 'sha256 ' + base64.b64encode(checksum).decode()
+        return self.client.patch(
+            url, chunk, content_type='application/offset+octet-stream', headers=headers
+        )
+
+    def test_chunks_resume_and_finalize(self):
+        response = self.start(sha256=hashlib.sha256(self.DATA).hexdigest())
+        self.assertEqual(response.status_code, 201)
+        url = response['Location']
+        half = len(self.DATA) // 2
+
+        first = self.DATA[:half]
+        response = self.patch(url, 0, first, hashlib.sha256(first).digest())
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(response['Upload-Offset'], str(half))
+
+        # A client coming back after an interruption asks where to go on
+        response = self.client.head(url)
+        self.assertEqual(response['Upload-Offset'], str(half))
+        self.assertEqual(response['Upload-Length'], str(len(self.DATA)))
+
+        response = self.patch(url, half, self.DATA[half:])
+        self.assertEqual(response.status_code, 204)
+
+        response = self.client.post(url + 'finalize/')
+        self.assertEqual(response.status_code, 200)
+        self.lesson.refresh_from_db()
+        with self.lesson.video_file.open('rb') as stored:
+            self.assertEqual(stored.read(), self.DATA)
+        self.assertFalse(LessonUpload.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(self.media, 'uploads')), [])
+
+    def test_finalize_stays_within_budget(self):
+        url = self.start()['Location']
+        self.patch(url, 0, self.DATA)
+
+        # Attaching a video also queues it for transcoding
+        response = self.assertWithinBudget(url + 'finalize/', method='post')
+
+        self.assertEqual(response.status_code, 200)
+        self.lesson.refresh_from_db()
+        self.assertEqual(self.lesson.hls_status, transcoding.QUEUED)
+
+    def test_bad_chunks_do_not_advance_the_offset(self):
+        url = self.start()['Location']
+        chunk = self.DATA[:1000]
+
+        self.assertEqual(self.patch(url, 500, chunk).status_code, 409)
+
+        response = self.patch(url, 0, chunk, hashlib.sha256(b'other').digest())
+        self.assertEqual(response.status_code, 460)
+        self.assertEqual(response['Upload-Offset'], '0')
+
+        self.assertEqual(self.client.post(url + 'finalize/').status_code, 409)
+
+    def test_whole_file_checksum_mismatch_discards_the_upload(self):
+        url = self.start(sha256='0' * 64)['Location']
+        self.patch(url, 0, self.DATA)
+
+        self.assertEqual(self.client.post(url + 'finalize/').status_code, 460)
+        self.assertFalse(LessonUpload.objects.exists())
+        self.lesson.refresh_from_db()
+        self.assertFalse(self.lesson.video_file)
+
+    def test_only_the_instructor_can_upload(self):
+        url = self.start()['Location']
+
+        self.client.force_login(self.other)
+        self.assertEqual(self.start().status_code, 403)
+        self.assertEqual(self.client.head(url).status_code, 404)
+
+
+class HlsTranscodingTests(TempMediaMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_video_course(cls)
+
+    def setUp(self):
+        super().setUp()
+        self.lesson = make_video_lesson(self.course)
+        seeding.enroll(self.student, self.course)
+
+    def make_ready(self):
+        directory = transcoding.hls_dir(self.lesson.id, self.lesson.hls_source)
+        protected_storage().save(posixpath.join(directory, 'master.m3u8'), ContentFile(b"#EXTM3U\n"))
+        Lesson.objects.filter(pk=self.lesson.pk).update(hls_status='ready', hls_renditions=[360])
+        return directory
+
+    def test_new_videos_are_queued_and_claimed_once(self):
+        self.assertEqual(self.lesson.hls_status, 'queued')
+        self.assertEqual(self.lesson.hls_source, self.lesson.video_file.name)
+
+        self.assertEqual([lesson.id for lesson in transcoding.claim(2)], [self.lesson.id])
+        self.assertEqual(transcoding.claim(2), [])
+        self.assertEqual(Lesson.objects.get(pk=self.lesson.pk).hls_status, 'running')
+
+    @override_settings(FFPROBE_BINARY='/nonexistent/ffprobe')
+    def test_results_are_only_recorded_for_the_current_video(self):
+        stale = Lesson.objects.get(pk=self.lesson.pk)
+        self.lesson.video_file = SimpleUploadedFile("other.mp4", b"other", content_type='video/mp4')
+        self.lesson.save()
+        job, = transcoding.claim(1)
+
+        # A full save of a copy loaded earlier puts the first video back
+        stale.title = "Renamed"
+        stale.save()
+
+        self.assertIsNone(transcoding.transcode(job))
+        lesson = Lesson.objects.get(pk=self.lesson.pk)
+        self.assertEqual((lesson.hls_status, lesson.hls_source), ('queued', stale.video_file.name))
+        self.assertEqual([lesson.id for lesson in transcoding.claim(1)], [self.lesson.id])
+
+    @override_settings(FFPROBE_BINARY='/nonexistent/ffprobe')
+    def test_failures_are_recorded_unless_the_video_changed(self):
+        job, = transcoding.claim(1)
+        self.assertEqual(transcoding.transcode(job), 'failed')
+        self.assertIn("not installed", Lesson.objects.get(pk=self.lesson.pk).hls_error)
+
+        transcoding.retry_failed()
+        job, = transcoding.claim(1)
+        self.lesson.video_file = SimpleUploadedFile("other.mp4", b"other", content_type='video/mp4')
+        self.lesson.save()
+
+        # The job's result belongs to the old video; the new one waits
+        self.assertIsNone(transcoding.transcode(job))
+        self.assertEqual(Lesson.objects.get(pk=self.lesson.pk).hls_status, 'queued')
+
+    def test_player_prefers_the_manifest_once_ready(self):
+        self.client.force_login(self.student)
+        player = reverse('lesson_player', args=[self.course.id, self.lesson.id])
+        master = reverse('lesson_hls', args=[self.course.id, self.lesson.id, 'master.m3u8'])
+
+        self.assertNotContains(self.client.get(player), 'data-hls')
+        self.assertEqual(self.client.get(master).status_code, 404)
+
+        directory = self.make_ready()
+        self.assertContains(self.client.get(player), f'data-hls="{master}"')
+        self.assertFalse(os.path.exists(self.media_path(directory)))
+        response = self.client.get(master)
+        self.assertEqual(response['Content-Type'], 'application/vnd.apple.mpegurl')
+        self.assertEqual(b''.join(response.streaming_content), b"#EXTM3U\n")
+
+        other = reverse('lesson_hls', args=[self.course.id, self.lesson.id, '../lesson.mp4'])
+        self.assertEqual(self.client.get(other).status_code, 404)
+
+    def test_replacing_the_video_deletes_old_renditions(self):
+        directory = self.make_ready()
+        self.lesson.refresh_from_db()
+
+        self.lesson.video_file = SimpleUploadedFile("other.mp4", b"other", content_type='video/mp4')
+        self.lesson.save()
+
+        self.assertFalse(os.path.exists(self.protected_path(directory)))
+        self.assertEqual(self.lesson.hls_status, 'queued')
+
+    @skipUnless(shutil.which('ffmpeg') and shutil.which('ffprobe'), "needs ffmpeg")
+    def test_transcodes_renditions_and_poster(self):
+        source = self.media_path('source.mp4')
+        subprocess.run([
+            'ffmpeg', '-loglevel', 'error', '-f', 'lavfi', '-i', 'testsrc=duration=8:size=960x540:rate=25',
+            '-f', 'lavfi', '-i', 'sine=duration=8', '-shortest', '-pix_fmt', 'yuv420p', source,
+        ], check=True)
+        with open(source, 'rb') as video:
+            self.lesson.video_file = SimpleUploadedFile("source.mp4", video.read(), content_type='video/mp4')
+        self.lesson.save()
+
+        job, = transcoding.claim(1)
+        self.assertEqual(transcoding.transcode(job), 'ready')
+
+        job.refresh_from_db()
+        self.assertEqual(job.hls_renditions, [360, 540])
+        directory = self.protected_path(transcoding.hls_dir(job.id, job.hls_source))
+        for name in ('master.m3u8', 'poster.jpg', '360p/index.m3u8', '540p/index.m3u8'):
+            self.assertTrue(os.path.exists(os.path.join(directory, name)), name)
 
-# Create your tests here.
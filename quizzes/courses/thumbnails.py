@@ -0,0 +1,199 @@
+"""
+Course thumbnail derivatives.
+
+Instructors upload thumbnails at whatever size they have, often
+full-resolution screenshots. When a course is saved with a new
+thumbnail, build() writes resized WebP and JPEG copies at each of
+COURSE_THUMBNAIL_WIDTHS (never wider than the original) next to it under
+derived/, and records what it made in Course.thumbnail_derivatives.
+Pages render them with the {% course_thumbnail %} tag, which emits a
+<picture> with srcsets so browsers fetch the smallest copy that fits.
+
+Derivative names are built from the source name, so rendering a srcset
+needs no file system access. Until a thumbnail has derivatives (or if
+it could not be decoded) the original is served as before.
+"""
+
+import hashlib
+import logging
+import math
+import posixpath
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+from PIL.ExifTags import Base as ExifTags
+
+from .caching import CATALOGUE
+from .fragments import new_version
+from .models import Course
+
+
+logger = logging.getLogger(__name__)
+
+ORIENTATION = ExifTags.Orientation
+
+DEFAULT_WIDTHS = (320, 640, 960, 1280)
+
+# Card images are about this wide; used where only one URL can be given
+CARD_WIDTH = 640
+
+# (format, extension, save options)
+FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def thumbnail_widths():
+    return tuple(getattr(settings, 'COURSE_THUMBNAIL_WIDTHS', DEFAULT_WIDTHS))
+
+
+def derivative_name(source, width, fmt):
+    """thumbnails/a.png -> thumbnails/derived/a-<hash>-640w.webp"""
+    directory, filename = posixpath.split(source)
+    stem = posixpath.splitext(filename)[0]
+    digest = hashlib.sha1(source.encode()).hexdigest()[:8]
+    extension = FORMATS[fmt][1]
+    return posixpath.join(directory, 'derived', f"{stem}-{digest}-{width}w.{extension}")
+
+
+# ----------------------------
+# LOOKUP
+# ----------------------------
+
+def ready_widths(course):
+    """Widths with derivatives for the course's current thumbnail, or []."""
+    record = course.thumbnail_derivatives or {}
+    if not course.thumbnail or record.get('source') != course.thumbnail.name:
+        return []
+    return record.get('widths', [])
+
+
+def srcset(course, fmt):
+    storage = course.thumbnail.storage
+    source = course.thumbnail.name
+    return ', '.join(
+        f"{storage.url(derivative_name(source, width, fmt))} {width}w"
+        for width in ready_widths(course)
+    )
+
+
+def thumbnail_url(course, width=CARD_WIDTH, fmt='jpeg'):
+    """
+    URL of the smallest derivative at least `width` wide (else the
+    largest), or of the original when there are none.
+    """
+    if not course.thumbnail:
+        return None
+    widths = ready_widths(course)
+    if not widths:
+        return course.thumbnail.url
+    chosen = next((w for w in widths if w >= width), widths[-1])
+    return course.thumbnail.storage.url(derivative_name(course.thumbnail.name, chosen, fmt))
+
+
+# ----------------------------
+# GENERATION
+# ----------------------------
+
+def is_stale(course):
+    record = course.thumbnail_derivatives or {}
+    return (course.thumbnail.name or '') != record.get('source', '')
+
+
+def build(course, invalidate=True):
+    """
+    Write derivatives for the course's current thumbnail, delete those
+    of the thumbnail it replaced, and store the new record. A source
+    that cannot be decoded is recorded with no widths so it is not
+    retried on every save. Returns the record.
+
+    The record is written with update(), which sends no signal, so the
+    cached catalogue pages are invalidated here; pass invalidate=False
+    to do it once after building many.
+    """
+    old = course.thumbnail_derivatives or {}
+    record = {}
+
+    if course.thumbnail:
+        try:
+            record = _render(course.thumbnail)
+        except (OSError, ValueError, Image.DecompressionBombError) as exc:
+            logger.warning("Could not build derivatives of %s: %s", course.thumbnail.name, exc)
+            record = {'source': course.thumbnail.name, 'widths': []}
+
+    if old.get('source') and old.get('source') != record.get('source'):
+        _delete(course.thumbnail.storage, old)
+
+    # The cached card and detail fragments embed the srcset
+    version = new_version()
+    Course.objects.filter(pk=course.pk).update(
+        thumbnail_derivatives=record,
+        content_version=version
+    )
+    course.thumbnail_derivatives = record
+    course.content_version = version
+    if invalidate:
+        CATALOGUE.invalidate()
+    return record
+
+
+def _render(field):
+    storage = field.storage
+    with storage.open(field.name, 'rb') as source:
+        image = Image.open(source)
+        _draft(image)
+        # Applies and drops the EXIF orientation; nothing else of the
+        # source's metadata is written to the copies
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    width, height = image.size
+    widths = [w for w in thumbnail_widths() if w < width] or [width]
+
+    for target in widths:
+        resized = image.resize(
+            (target, max(round(height * target / width), 1)),
+            Image.Resampling.LANCZOS,
+            reducing_gap=3.0
+        )
+        for fmt, (pil_format, _, options) in FORMATS.items():
+            copy = resized
+            if pil_format == 'JPEG' and has_alpha:
+                copy = Image.new('RGB', resized.size, 'white')
+                copy.paste(resized, mask=resized.getchannel('A'))
+            buffer = BytesIO()
+            copy.save(buffer, pil_format, **options)
+
+            name = derivative_name(field.name, target, fmt)
+            storage.delete(name)
+            storage.save(name, ContentFile(buffer.getvalue()))
+
+    return {'source': field.name, 'widths': widths}
+
+
+def _draft(image):
+    """
+    Let JPEG decoding downscale by a power of two while staying at least
+    as wide as the largest derivative; much faster than decoding a
+    camera-sized original in full.
+    """
+    if image.format != 'JPEG':
+        return
+    width, height = image.size
+    # Orientations 5-8 are rotated by 90 degrees
+    final_width = height if image.getexif().get(ORIENTATION, 1) >= 5 else width
+    scale = max(thumbnail_widths()) / final_width
+    if scale < 1:
+        image.draft('RGB', (math.ceil(width * scale), math.ceil(height * scale)))
+
+
+def _delete(storage, record):
+    for width in record.get('widths', []):
+        for fmt in FORMATS:
+            storage.delete(derivative_name(record['source'], width, fmt))
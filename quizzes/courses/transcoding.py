@@ -0,0 +1,421 @@
+"""
+Background HLS transcoding of lesson videos.
+
+Lesson videos are played back as whatever the instructor uploaded,
+often a high-bitrate camera or screen recording that stalls on a slow
+connection. When a lesson is saved with a new video_file, queue() marks
+it 'queued'. The transcode_videos command claims queued lessons and
+runs up to VIDEO_TRANSCODE_WORKERS ffmpeg processes at a time. Each job
+writes, under hls_dir():
+
+- H.264/AAC renditions at the RENDITIONS heights up to the source's own
+  (<height>p/index.m3u8 and its segments),
+- master.m3u8, listing the renditions for adaptive playback, and
+- poster.jpg, a frame from early in the video,
+
+in the protected storage the videos themselves use (courses.storage),
+so they are only ever served by the access-checked lesson_hls view, and
+records the heights in Lesson.hls_renditions. The player uses the
+master playlist once the lesson is 'ready' and the original file until
+then, or for good if the job failed (hls_error keeps ffmpeg's message).
+
+The job state lives on the Lesson, so the queue survives restarts. The
+worker only writes the hls_* fields, with updates conditional on the
+video_file it transcoded: a video replaced while its job runs is queued
+again, and the finished job's output is thrown away instead of
+recorded.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import posixpath
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import suppress
+
+from django.conf import settings
+from django.core.files import File
+from django.db import connection
+
+from .models import Lesson
+from .storage import protected_storage
+
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, READY, FAILED = 'queued', 'running', 'ready', 'failed'
+
+# (height, video bitrate, audio bitrate)
+RENDITIONS = (
+    (360, 800, 96),
+    (540, 1600, 128),
+    (720, 2800, 128),
+    (1080, 5000, 160),
+)
+
+SEGMENT_SECONDS = 6
+
+POSTER_HEIGHT = 720
+
+DEFAULT_WORKERS = 2
+
+# Per ffmpeg run; a job that takes longer is marked failed
+DEFAULT_TIMEOUT = 2 * 60 * 60
+
+ERROR_LENGTH = 2000
+
+HLS_DIR = 'lesson_hls'
+
+MASTER = 'master.m3u8'
+
+POSTER = 'poster.jpg'
+
+# Names the lesson_hls view will serve from a job's directory
+HLS_FILE = re.compile(r'^(?:master\.m3u8|poster\.jpg|\d+p/(?:index\.m3u8|segment_\d+\.ts))$')
+
+CONTENT_TYPES = {
+    '.m3u8': 'application/vnd.apple.mpegurl',
+    '.ts': 'video/mp2t',
+    '.jpg': 'image/jpeg',
+}
+
+
+class TranscodeError(Exception):
+    pass
+
+
+def workers():
+    return getattr(settings, 'VIDEO_TRANSCODE_WORKERS', DEFAULT_WORKERS)
+
+
+def hls_dir(lesson_id, source):
+    """lesson_hls/<lesson id>/<hash of the source name>"""
+    digest = hashlib.sha1(source.encode()).hexdigest()[:8]
+    return posixpath.join(HLS_DIR, str(lesson_id), digest)
+
+
+# ----------------------------
+# LOOKUP
+# ----------------------------
+
+def is_ready(lesson):
+    """Whether the lesson's current video has renditions to play."""
+    return (
+        lesson.hls_status == READY
+        and bool(lesson.video_file)
+        and lesson.hls_source == lesson.video_file.name
+    )
+
+
+def content_type(name):
+    return CONTENT_TYPES[posixpath.splitext(name)[1]]
+
+
+# ----------------------------
+# QUEUE
+# ----------------------------
+
+def is_stale(lesson):
+    return (lesson.video_file.name or '') != lesson.hls_source
+
+
+def queue(lesson):
+    """
+    Queue the lesson's current video for transcoding, or clear the
+    record if it has none, and delete the renditions it replaces.
+    """
+    old_source, old_status = lesson.hls_source, lesson.hls_status
+    source = lesson.video_file.name or ''
+    status = QUEUED if source else ''
+
+    Lesson.objects.filter(pk=lesson.pk).update(
+        hls_status=status,
+        hls_source=source,
+        hls_renditions=[],
+        hls_error=''
+    )
+    lesson.hls_status = status
+    lesson.hls_source = source
+    lesson.hls_renditions = []
+    lesson.hls_error = ''
+
+    # A running job notices the change itself when it finishes
+    if old_source and old_status != RUNNING:
+        delete_output(lesson.pk, old_source)
+
+
+def claim(limit):
+    """Move up to `limit` queued lessons to 'running' and return them."""
+    claimed = []
+    for lesson in Lesson.objects.filter(hls_status=QUEUED).order_by('id')[:max(limit, 0)]:
+        # Another worker may have taken it, or the video changed since
+        if Lesson.objects.filter(
+            pk=lesson.pk,
+            video_file=lesson.hls_source,
+            hls_status=QUEUED,
+            hls_source=lesson.hls_source
+        ).update(hls_status=RUNNING):
+            lesson.hls_status = RUNNING
+            claimed.append(lesson)
+    return claimed
+
+
+def requeue_interrupted():
+    """Queue jobs left 'running' by a worker that stopped; returns how many."""
+    return Lesson.objects.filter(hls_status=RUNNING).update(hls_status=QUEUED)
+
+
+def retry_failed():
+    return Lesson.objects.filter(hls_status=FAILED).update(hls_status=QUEUED, hls_error='')
+
+
+# ----------------------------
+# WORKER
+# ----------------------------
+
+def run_worker(max_workers=None, poll=5, once=False):
+    """
+    Transcode queued lessons, at most `max_workers` at a time. Yields
+    (lesson, status) as jobs finish; with `once`, stops when the queue
+    is empty instead of polling it every `poll` seconds.
+
+    Run one worker per site: it starts by requeueing the jobs a
+    previous worker left running.
+    """
+    max_workers = max_workers or workers()
+    requeue_interrupted()
+    running = set()
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='transcode') as pool:
+        while True:
+            for lesson in claim(max_workers - len(running)):
+                running.add(pool.submit(_job, lesson))
+
+            if not running:
+                if once:
+                    return
+                time.sleep(poll)
+                continue
+
+            done, running = wait(running, timeout=poll, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def _job(lesson):
+    try:
+        return lesson, transcode(lesson)
+    except Exception:
+        logger.exception("Transcoding lesson %s failed", lesson.pk)
+        return lesson, _finish(lesson, FAILED, error="Unexpected error; see the worker log.")
+    finally:
+        # Each worker thread has its own database connection
+        connection.close()
+
+
+# ----------------------------
+# TRANSCODING
+# ----------------------------
+
+def transcode(lesson):
+    """
+    Run the claimed job for the lesson's hls_source and record the
+    result. Returns the final status, or None when the video was
+    replaced or the lesson deleted in the meantime.
+    """
+    workdir = tempfile.mkdtemp(prefix='hls-')
+    output = os.path.join(workdir, 'out')
+
+    try:
+        path = _local_path(lesson.video_file.storage, lesson.hls_source, workdir)
+        probe = _probe(path)
+        renditions = [r for r in RENDITIONS if r[0] <= probe['height']] or [RENDITIONS[0]]
+
+        os.makedirs(output)
+        _run(_hls_command(path, output, renditions, probe['audio']))
+        _run(_poster_command(path, output, probe))
+        _store(protected_storage(), output, hls_dir(lesson.pk, lesson.hls_source))
+    except TranscodeError as exc:
+        return _finish(lesson, FAILED, error=str(exc))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return _finish(lesson, READY, renditions=[height for height, _, _ in renditions])
+
+
+def _finish(lesson, status, renditions=(), error=''):
+    # Only while the lesson still has the video this job transcoded
+    updated = Lesson.objects.filter(
+        pk=lesson.pk, video_file=lesson.hls_source, hls_source=lesson.hls_source
+    ).update(
+        hls_status=status,
+        hls_renditions=list(renditions),
+        hls_error=error[-ERROR_LENGTH:]
+    )
+    if not updated:
+        delete_output(lesson.pk, lesson.hls_source)
+        return None
+
+    lesson.hls_status = status
+    lesson.hls_renditions = list(renditions)
+    lesson.hls_error = error[-ERROR_LENGTH:]
+    return status
+
+
+def _local_path(storage, name, workdir):
+    """A path ffmpeg can read the source from."""
+    try:
+        return storage.path(name)
+    except NotImplementedError:
+        path = os.path.join(workdir, 'source' + posixpath.splitext(name)[1])
+        with storage.open(name, 'rb') as source, open(path, 'wb') as target:
+            shutil.copyfileobj(source, target)
+        return path
+
+
+def _run(command):
+    try:
+        return subprocess.run(
+            command,
+            capture_output=True,
+            check=True,
+            text=True,
+            errors='replace',
+            timeout=getattr(settings, 'VIDEO_TRANSCODE_TIMEOUT', DEFAULT_TIMEOUT)
+        )
+    except FileNotFoundError:
+        raise TranscodeError(f"{command[0]} is not installed.")
+    except subprocess.TimeoutExpired as exc:
+        raise TranscodeError(f"{command[0]} took longer than {exc.timeout} seconds.")
+    except subprocess.CalledProcessError as exc:
+        raise TranscodeError(exc.stderr.strip() or f"{command[0]} exited with {exc.returncode}.")
+
+
+def _probe(path):
+    result = _run([
+        getattr(settings, 'FFPROBE_BINARY', 'ffprobe'),
+        '-v', 'error',
+        '-print_format', 'json',
+        '-show_streams',
+        '-show_format',
+        path,
+    ])
+    try:
+        data = json.loads(result.stdout)
+        streams = data.get('streams', [])
+        video = next(s for s in streams if s.get('codec_type') == 'video')
+        width, height = int(video['width']), int(video['height'])
+    except (ValueError, KeyError, StopIteration):
+        raise TranscodeError("The file has no readable video stream.")
+
+    # Phones store portrait video as landscape plus a rotation, which
+    # ffmpeg applies while decoding
+    rotation = int(video.get('tags', {}).get('rotate', 0) or 0)
+    for side_data in video.get('side_data_list', []):
+        rotation = int(side_data.get('rotation', rotation) or 0)
+    if rotation % 180:
+        width, height = height, width
+
+    return {
+        'width': width,
+        'height': height,
+        'audio': any(s.get('codec_type') == 'audio' for s in streams),
+        'duration': float(data.get('format', {}).get('duration') or 0),
+    }
+
+
+def _hls_command(path, output, renditions, audio):
+    """One ffmpeg run: decode once, scale and encode every rendition."""
+    count = len(renditions)
+    filters = [f"[0:v]split={count}" + ''.join(f"[v{i}]" for i in range(count))]
+    filters += [f"[v{i}]scale=-2:{height}[v{i}out]" for i, (height, _, _) in enumerate(renditions)]
+
+    command = [
+        getattr(settings, 'FFMPEG_BINARY', 'ffmpeg'),
+        '-hide_banner', '-nostdin', '-loglevel', 'error', '-y',
+        '-i', path,
+        '-filter_complex', ';'.join(filters),
+    ]
+    stream_map = []
+    for i, (height, video_rate, audio_rate) in enumerate(renditions):
+        command += [
+            '-map', f"[v{i}out]",
+            f'-b:v:{i}', f'{video_rate}k',
+            f'-maxrate:v:{i}', f'{video_rate * 107 // 100}k',
+            f'-bufsize:v:{i}', f'{video_rate * 2}k',
+        ]
+        if audio:
+            command += ['-map', '0:a:0', f'-b:a:{i}', f'{audio_rate}k']
+        stream_map.append(f"v:{i},a:{i},name:{height}p" if audio else f"v:{i},name:{height}p")
+
+    command += [
+        '-c:v', 'libx264', '-preset', 'veryfast', '-profile:v', 'main', '-pix_fmt', 'yuv420p',
+        '-c:a', 'aac', '-ac', '2',
+        # Keyframes at every segment boundary, the same in every
+        # rendition, so players can switch between them at any segment
+        '-force_key_frames', f'expr:gte(t,n_forced*{SEGMENT_SECONDS})',
+        '-sc_threshold', '0',
+        '-f', 'hls',
+        '-hls_time', str(SEGMENT_SECONDS),
+        '-hls_playlist_type', 'vod',
+        '-hls_flags', 'independent_segments',
+        '-hls_segment_filename', os.path.join(output, '%v', 'segment_%04d.ts'),
+        '-master_pl_name', MASTER,
+        '-var_stream_map', ' '.join(stream_map),
+        os.path.join(output, '%v', 'index.m3u8'),
+    ]
+    return command
+
+
+def _poster_command(path, output, probe):
+    # A tenth of the way in skips fade-ins and title cards
+    position = min(probe['duration'] / 10, 30)
+    return [
+        getattr(settings, 'FFMPEG_BINARY', 'ffmpeg'),
+        '-hide_banner', '-nostdin', '-loglevel', 'error', '-y',
+        '-ss', f'{position:.2f}',
+        '-i', path,
+        '-frames:v', '1',
+        '-vf', f"scale=-2:{min(POSTER_HEIGHT, probe['height'])}",
+        '-q:v', '3',
+        os.path.join(output, POSTER),
+    ]
+
+
+# ----------------------------
+# STORAGE
+# ----------------------------
+
+def _store(storage, local_dir, name):
+    for root, _, files in os.walk(local_dir):
+        for filename in files:
+            path = os.path.join(root, filename)
+            relative = os.path.relpath(path, local_dir).replace(os.sep, '/')
+            target = posixpath.join(name, relative)
+            storage.delete(target)
+            with open(path, 'rb') as data:
+                storage.save(target, File(data))
+
+
+def delete_output(lesson_id, source):
+    _delete_tree(protected_storage(), hls_dir(lesson_id, source))
+
+
+def _delete_tree(storage, name):
+    try:
+        directories, files = storage.listdir(name)
+    except (FileNotFoundError, NotImplementedError):
+        return
+    for directory in directories:
+        _delete_tree(storage, posixpath.join(name, directory))
+    for filename in files:
+        storage.delete(posixpath.join(name, filename))
+    # Storages without directories have nothing left to remove
+    with suppress(OSError, NotImplementedError):
+        os.rmdir(storage.path(name))
@@ -0,0 +1,262 @@
+"""
+Resumable lesson uploads.
+
+Large lecture videos are sent in pieces instead of one multipart POST,
+modelled on the tus protocol:
+
+1. create() registers the file (name, size, optional SHA-256) and makes
+   an empty part file under RESUMABLE_UPLOAD_DIR.
+2. write_chunk() appends one request body at the offset the client
+   claims, copying it to disk CHUNK_SIZE bytes at a time. The offset
+   only advances once the chunk is on disk (and matches its
+   Upload-Checksum, if given), so after any interruption the client
+   asks for the offset and carries on from there.
+3. finalize() checks the whole-file SHA-256 if one was given, moves the
+   part file into the lesson's storage and points the lesson at it in
+   one UPDATE; the file it replaces is deleted after commit.
+
+Upload rows and part files left behind by abandoned uploads are removed
+by the purge_stale_uploads command.
+"""
+
+import base64
+import hashlib
+import os
+import re
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Lesson, LessonUpload
+
+
+CHUNK_SIZE = 1024 * 1024
+
+DEFAULT_MAX_SIZE = 20 * 1024 ** 3
+
+DEFAULT_EXPIRY = timedelta(days=1)
+
+FIELDS = dict(LessonUpload.FIELD_CHOICES)
+
+_SHA256_HEX = re.compile(r'^[0-9a-f]{64}$')
+
+
+class UploadError(Exception):
+    status = 400
+
+
+class OffsetMismatch(UploadError):
+    status = 409
+
+
+class ChecksumMismatch(UploadError):
+    # tus: "Checksum Mismatch"
+    status = 460
+
+
+class UploadTooLarge(UploadError):
+    status = 413
+
+
+class UploadIncomplete(UploadError):
+    status = 409
+
+
+def upload_dir():
+    return Path(getattr(settings, 'RESUMABLE_UPLOAD_DIR', settings.BASE_DIR / 'uploads'))
+
+
+def max_size():
+    return getattr(settings, 'RESUMABLE_UPLOAD_MAX_SIZE', DEFAULT_MAX_SIZE)
+
+
+def part_path(upload):
+    return upload_dir() / f"{upload.id}.part"
+
+
+# ----------------------------
+# CREATE
+# ----------------------------
+
+def create(lesson, user, field, filename, size, sha256=''):
+    if field not in FIELDS:
+        raise UploadError(f"field must be one of {', '.join(FIELDS)}.")
+    filename = os.path.basename(str(filename or '')).strip()
+    if not filename:
+        raise UploadError("filename is required.")
+    if not isinstance(size, int) or size <= 0:
+        raise UploadError("size must be a positive number of bytes.")
+    if size > max_size():
+        raise UploadTooLarge(f"Uploads are limited to {max_size()} bytes.")
+    sha256 = (sha256 or '').lower()
+    if sha256 and not _SHA256_HEX.match(sha256):
+        raise UploadError("sha256 must be 64 hex digits.")
+
+    upload = LessonUpload.objects.create(
+        lesson=lesson,
+        uploaded_by=user,
+        field=field,
+        filename=filename,
+        size=size,
+        sha256=sha256
+    )
+    upload_dir().mkdir(parents=True, exist_ok=True)
+    part_path(upload).touch()
+    return upload
+
+
+# ----------------------------
+# CHUNKS
+# ----------------------------
+
+def parse_checksum(header):
+    """'sha256 <base64 digest>' (tus Upload-Checksum) -> digest bytes."""
+    algorithm, _, value = (header or '').partition(' ')
+    if algorithm.lower() != 'sha256':
+        raise UploadError("Only sha256 chunk checksums are supported.")
+    try:
+        return base64.b64decode(value, validate=True)
+    except ValueError:
+        raise UploadError("Upload-Checksum is not valid base64.")
+
+
+def write_chunk(upload, offset, stream, checksum=None):
+    """
+    Write `stream` (a file-like request body) at `offset` and return the
+    new offset. `checksum` is the expected SHA-256 digest of the chunk.
+    """
+    if offset != upload.offset:
+        raise OffsetMismatch(f"Upload is at offset {upload.offset}, not {offset}.")
+
+    remaining = upload.size - offset
+    digest = hashlib.sha256()
+    written = 0
+
+    with open(part_path(upload), 'r+b') as part:
+        part.seek(offset)
+        while True:
+            data = stream.read(CHUNK_SIZE)
+            if not data:
+                break
+            if written + len(data) > remaining:
+                raise UploadTooLarge("Chunk runs past the declared upload size.")
+            part.write(data)
+            digest.update(data)
+            written += len(data)
+
+    if checksum is not None and digest.digest() != checksum:
+        # The bytes stay on disk past the offset and are overwritten
+        # by the retry
+        raise ChecksumMismatch("Chunk does not match its Upload-Checksum.")
+
+    # Conditional on the offset we started from: of two clients racing
+    # with the same chunk, only one moves the upload forward
+    advanced = LessonUpload.objects.filter(pk=upload.pk, offset=offset).update(
+        offset=offset + written,
+        updated_at=timezone.now()
+    )
+    if not advanced:
+        raise OffsetMismatch("Another request wrote to this upload at the same time.")
+
+    upload.offset = offset + written
+    return upload.offset
+
+
+# ----------------------------
+# FINALIZE
+# ----------------------------
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as part:
+        for data in iter(lambda: part.read(CHUNK_SIZE), b''):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def _store(upload, path):
+    """Move the part file into the lesson field's storage; returns its name."""
+    field = Lesson._meta.get_field(upload.field)
+    storage = field.storage
+    name = storage.get_available_name(
+        field.generate_filename(upload.lesson, upload.filename),
+        max_length=field.max_length
+    )
+
+    try:
+        target = storage.path(name)
+    except NotImplementedError:
+        target = None
+
+    if target is not None:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            # Same file system: a rename, however big the file
+            os.replace(path, target)
+            return name
+        except OSError:
+            pass
+
+    with open(path, 'rb') as part:
+        name = storage.save(name, File(part), max_length=field.max_length)
+    os.remove(path)
+    return name
+
+
+def finalize(upload):
+    """
+    Verify the complete upload and attach it to its lesson; returns the
+    lesson. A whole-file checksum mismatch discards the upload.
+    """
+    if upload.offset != upload.size:
+        raise UploadIncomplete(f"Upload has {upload.offset} of {upload.size} bytes.")
+
+    path = part_path(upload)
+    # Bytes written past the end by a failed chunk are not part of the file
+    os.truncate(path, upload.size)
+
+    # Reading a multi-gigabyte file back costs seconds; only pay it
+    # when the client asked for the check
+    if upload.sha256 and _file_sha256(path) != upload.sha256:
+        cancel(upload)
+        raise ChecksumMismatch("File does not match its sha256; start the upload again.")
+
+    storage = Lesson._meta.get_field(upload.field).storage
+    name = _store(upload, path)
+
+    try:
+        with transaction.atomic():
+            lesson = Lesson.objects.select_for_update().get(pk=upload.lesson_id)
+            old = getattr(lesson, upload.field).name
+            setattr(lesson, upload.field, name)
+            lesson.save(update_fields=[upload.field])
+            upload.delete()
+            if old and old != name:
+                transaction.on_commit(lambda: storage.delete(old))
+    except Exception:
+        storage.delete(name)
+        raise
+
+    return lesson
+
+
+# ----------------------------
+# CLEANUP
+# ----------------------------
+
+def cancel(upload):
+    # The part file goes with the row (courses.signals)
+    upload.delete()
+
+
+def purge_stale(older_than=None):
+    """Cancel uploads with no chunk received for `older_than`; returns how many."""
+    cutoff = timezone.now() - (older_than or getattr(settings, 'RESUMABLE_UPLOAD_EXPIRY', DEFAULT_EXPIRY))
+    stale = list(LessonUpload.objects.filter(updated_at__lt=cutoff))
+    for upload in stale:
+        cancel(upload)
+    return len(stale)
@@ -9,6 +9,8 @@ urlpatterns = [
 
     path('', views.home, name='home'),
     path('courses/', views.courses_list, name='courses_list'),
+    path('courses/feed/', views.courses_feed, name='courses_feed'),
+    path('courses/search/suggest/', views.course_search_suggest, name='course_search_suggest'),
 
     path('course/<int:pk>/', views.course_detail, name='course_detail'),
 
@@ -17,6 +19,9 @@ urlpatterns = [
 
     path('course/<int:course_id>/lesson/<int:lesson_id>/',views.lesson_player,name='lesson_player'),
 
+    path('course/<int:course_id>/lesson/<int:lesson_id>/video/', views.lesson_video, name='lesson_video'),
+    path('course/<int:course_id>/lesson/<int:lesson_id>/hls/<path:name>', views.lesson_hls, name='lesson_hls'),
+
     path('course/<int:course_id>/resume/',views.resume_course,name='resume_course'),
 
     # ----------------------------
@@ -31,6 +36,10 @@ urlpatterns = [
 
     path('instructor/course/<int:course_id>/lesson/<int:lesson_id>/delete/',views.instructor_delete_lesson,name='instructor_delete_lesson'),
 
+    path('instructor/course/<int:course_id>/lesson/<int:lesson_id>/uploads/', views.lesson_upload_create, name='lesson_upload_create'),
+    path('instructor/uploads/<uuid:upload_id>/', views.lesson_upload, name='lesson_upload'),
+    path('instructor/uploads/<uuid:upload_id>/finalize/', views.lesson_upload_finalize, name='lesson_upload_finalize'),
+
     # ----------------------------
     # INSTRUCTOR: DASHBOARD SECTIONS
     # ----------------------------
@@ -1,32 +1,60 @@
+import json
+import posixpath
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
-from django.db.models import Q
+from django.db import transaction
+from django.http import Http404, HttpResponse, JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import require_http_methods, require_POST
+from django.utils.text import Truncator
 from django.contrib import messages
-from .models import Course, Lesson, Category
+from .models import Course, Lesson, LessonUpload, Category
+from . import caching, streaming, thumbnails, transcoding, uploads
+from .fragments import fragment_ttl
+from .storage import protected_storage
+from .progress import CourseProgress
+from .pagination import catalogue_page, search_page
+from .search import suggest_titles
 from enrollments.models import Enrollment, LessonProgress
+from enrollments import counters, gating, seeding
 from quizzes.models import Quiz, QuizResult
 from certificates.models import Certificate
+from SmartLearn.querybudget import query_budget
+
 
 # ----------------------------
 # HOME + SEARCH
 # ----------------------------
 
-def home(request):
+def _catalogue(request):
+    """
+    One cursor page of the catalogue, or of search results when `q`
+    is given. Shared by the HTML pages and the infinite-scroll feed.
+    Pages are cached until a course or category changes.
+    """
     query = request.GET.get('q', '')
+    cursor = request.GET.get('cursor')
 
-    courses = Course.objects.filter(status='published')
+    def build():
+        if query:
+            return search_page(query, cursor)
+        courses = Course.objects.filter(status='published').select_related('instructor')
+        return catalogue_page(courses, cursor)
 
-    if query:
-        courses = courses.filter(
-            Q(title__icontains=query) |
-            Q(description__icontains=query) |
-            Q(category__name__icontains=query)
-        )
+    return query, caching.CATALOGUE.get_or_set(caching.catalogue_key(query, cursor), build)
+
+
+@query_budget(3)
+def home(request):
+    # The navbar search form submits to the current page
+    query, page = _catalogue(request)
 
     return render(request, 'courses/home.html', {
-        'courses': courses,
-        'query': query
+        'courses': page.items,
+        'query': query,
+        'page': page,
     })
 
 
@@ -34,21 +62,54 @@ def home(request):
 # COURSES LIST PAGE
 # ----------------------------
 
+@query_budget(4)
 def courses_list(request):
-    query = request.GET.get('q', '')
+    query, page = _catalogue(request)
 
-    courses = Course.objects.filter(status='published')
+    return render(request, 'courses/courses_list.html', {
+        'courses': page.items,
+        'query': query,
+        'page': page,
+        'fragment_ttl': fragment_ttl(),
+    })
 
-    if query:
-        courses = courses.filter(
-            Q(title__icontains=query) |
-            Q(description__icontains=query) |
-            Q(category__name__icontains=query)
-        )
 
-    return render(request, 'courses/courses_list.html', {
-        'courses': courses,
-        'query': query
+# ----------------------------
+# COURSES FEED (INFINITE SCROLL)
+# ----------------------------
+
+@query_budget(2)
+def courses_feed(request):
+    query, page = _catalogue(request)
+
+    return JsonResponse({
+        'query': query,
+        'next_cursor': page.next_cursor,
+        'results': [
+            {
+                'id': course.id,
+                'title': course.title,
+                'description': Truncator(course.description).chars(100),
+                'thumbnail': thumbnails.thumbnail_url(course),
+                'thumbnail_srcset': thumbnails.srcset(course, 'jpeg'),
+                'url': reverse('course_detail', args=[course.id]),
+            }
+            for course in page
+        ]
+    })
+
+
+# ----------------------------
+# SEARCH SUGGESTIONS (TYPE-AHEAD)
+# ----------------------------
+
+@query_budget(2)
+def course_search_suggest(request):
+    query = request.GET.get('q', '')
+
+    return JsonResponse({
+        'query': query,
+        'results': suggest_titles(query)
     })
 
 
@@ -56,9 +117,13 @@ def courses_list(request):
 # COURSE DETAIL
 # ----------------------------
 
+@query_budget(7)
 @login_required(login_url='/accounts/login/')
 def course_detail(request, pk):
-    course = get_object_or_404(Course, id=pk)
+    course = get_object_or_404(
+        Course.objects.select_related('instructor', 'category', 'quiz'),
+        id=pk
+    )
 
     enrolled = False
     completed_all = False
@@ -72,14 +137,11 @@ def course_detail(request, pk):
 
     if enrollment:
         enrolled = True
-
-        total_lessons = course.lesson_set.count()
-        completed_lessons = LessonProgress.objects.filter(
-            enrollment=enrollment,
-            completed=True
-        ).count()
-
-        completed_all = total_lessons > 0 and completed_lessons == total_lessons
+        # Counters are kept in sync, so no lesson queries for this
+        completed_all = (
+            enrollment.total_lessons > 0
+            and enrollment.completed_lessons >= enrollment.total_lessons
+        )
 
         if has_quiz:
             quiz_passed = QuizResult.objects.filter(
@@ -88,11 +150,11 @@ def course_detail(request, pk):
                 passed=True
             ).exists()
 
-    lessons = course.lesson_set.all()
-
     return render(request, "courses/course_detail.html", {
         "course": course,
-        "lessons": lessons,
+        # Lazy: only evaluated when the cached fragment is rebuilt
+        "lessons": course.lesson_set.order_by('order'),
+        "fragment_ttl": fragment_ttl(),
         "enrolled": enrolled,
         "completed_all": completed_all,
         "has_quiz": has_quiz,
@@ -106,9 +168,14 @@ def course_detail(request, pk):
 # LESSON PLAYER + PROGRESS
 # ----------------------------
 
+@query_budget(11)
 @login_required(login_url='/accounts/login/')
 def lesson_player(request, course_id, lesson_id):
-    lesson = get_object_or_404(Lesson, id=lesson_id, course_id=course_id)
+    lesson = get_object_or_404(
+        Lesson.objects.select_related('course'),
+        id=lesson_id,
+        course_id=course_id
+    )
     course = lesson.course
 
     enrollment = get_object_or_404(
@@ -123,90 +190,99 @@ def lesson_player(request, course_id, lesson_id):
         lesson=lesson
     )
 
-    # 🔒 CHECK PREVIOUS LESSON
-    previous_lesson = (
-        Lesson.objects
-        .filter(course=course, order__lt=lesson.order)
-        .order_by('-order')
-        .first()
-    )
-
-    if previous_lesson:
-        prev_completed = LessonProgress.objects.filter(
-            enrollment=enrollment,
-            lesson=previous_lesson,
-            completed=True
-        ).exists()
+    # Lessons + completed IDs in two queries, everything else in memory
+    progress = CourseProgress(course, enrollment)
 
-        if not prev_completed:
-            from django.contrib import messages
-            messages.warning(
-                request,
-                "Please complete the previous lesson first 🔒"
-            )
-            return redirect(
-                'lesson_player',
-                course.id,
-                previous_lesson.id
-            )
+    # 🔒 CHECK PREVIOUS LESSON (against the stored unlocked order)
+    if progress.is_locked(lesson):
+        messages.warning(
+            request,
+            "Please complete the previous lesson first 🔒"
+        )
+        # A lesson with nothing before it is only locked when the stored
+        # order lags a lesson change; send the student somewhere open
+        target = progress.previous_lesson(lesson) or progress.first_unlocked()
+        if target is None:
+            return redirect('course_detail', course.id)
+        return redirect(
+            'lesson_player',
+            course.id,
+            target.id
+        )
 
     # COURSE PROGRESS
-    total_lessons = course.lesson_set.count()
-    completed_lessons = LessonProgress.objects.filter(
-        enrollment=enrollment,
-        completed=True
-    ).count()
-
-    progress_percent = int((completed_lessons / total_lessons) * 100) if total_lessons else 0
+    progress_percent = progress.progress_percent
     course_completed = progress_percent == 100
 
-    # LESSON SIDEBAR DATA
-    lessons = course.lesson_set.order_by('order')
-    lesson_map = []
-
-    for l in lessons:
-        completed = LessonProgress.objects.filter(
-            enrollment=enrollment,
-            lesson=l,
-            completed=True
-        ).exists()
-
-        locked = False
-        if l.order > 1:
-            prev = Lesson.objects.filter(
-                course=course,
-                order=l.order - 1
-            ).first()
-
-            if prev:
-                locked = not LessonProgress.objects.filter(
-                    enrollment=enrollment,
-                    lesson=prev,
-                    completed=True
-                ).exists()
-
-        l.completed = completed
-        l.locked = locked
-        lesson_map.append(l)
-
     quiz = getattr(course, "quiz", None)
 
     return render(request, "courses/lesson_player.html", {
         "lesson": lesson,
         "course": course,
-        "lessons": lesson_map,
+        "lessons": progress.lessons,
         "lesson_progress": lesson_progress,
         "progress_percent": progress_percent,
         "course_completed": course_completed,
         "quiz": quiz,
+        "hls_ready": transcoding.is_ready(lesson),
     })
 
 
 
+# ----------------------------
+# LESSON VIDEO (PROTECTED STREAM)
+# ----------------------------
+
+def _watchable_lesson(request, course_id, lesson_id):
+    lesson = get_object_or_404(
+        Lesson.objects.select_related('course'),
+        id=lesson_id,
+        course_id=course_id
+    )
+    if not lesson.video_file:
+        raise Http404("This lesson has no video.")
+
+    # Instructors preview their own lessons; students need the lesson
+    # unlocked, exactly as the player does
+    user = request.user
+    if user.role != 'admin' and lesson.course.instructor_id != user.id:
+        enrollment = Enrollment.objects.filter(student=user, course=lesson.course).first()
+        if enrollment is None or gating.is_locked(enrollment, lesson):
+            raise PermissionDenied("Enroll and unlock this lesson to watch it.")
+
+    return lesson
+
+
+@query_budget(6)
+@login_required(login_url='/accounts/login/')
+@require_http_methods(['GET', 'HEAD'])
+def lesson_video(request, course_id, lesson_id):
+    lesson = _watchable_lesson(request, course_id, lesson_id)
+    return streaming.serve(request, lesson.video_file.storage, lesson.video_file.name)
+
+
+@query_budget(6)
+@login_required(login_url='/accounts/login/')
+@require_http_methods(['GET', 'HEAD'])
+def lesson_hls(request, course_id, lesson_id, name):
+    """Playlists, segments and poster of the lesson's HLS renditions."""
+    lesson = _watchable_lesson(request, course_id, lesson_id)
+    if not transcoding.is_ready(lesson) or not transcoding.HLS_FILE.match(name):
+        raise Http404("No such rendition.")
+
+    return streaming.serve(
+        request,
+        protected_storage(),
+        posixpath.join(transcoding.hls_dir(lesson.id, lesson.hls_source), name),
+        content_type=transcoding.content_type(name)
+    )
+
+
 # ----------------------------
 # RESUME COURSE
 # ----------------------------
 
+@query_budget(5)
 @login_required(login_url='/accounts/login/')
 def resume_course(request, course_id):
     enrollment = get_object_or_404(
@@ -256,6 +332,7 @@ def instructor_required(view_func):
 # CREATE COURSE
 # ----------------------------
 
+@query_budget(5)
 @instructor_required
 def create_course(request):
     if request.method == 'POST':
@@ -270,6 +347,7 @@ def create_course(request):
             title=title,
             description=description,
             category=category,
+            thumbnail=request.FILES.get('thumbnail'),
             status='draft',
             is_approved=False
         )
@@ -277,7 +355,7 @@ def create_course(request):
         messages.success(request, "Course created successfully. Waiting for admin approval.")
         return redirect('instructor_dashboard')
 
-    categories = Category.objects.all()
+    categories = caching.categories()
 
     return render(request, 'courses/create_course.html', {
         'categories': categories
@@ -296,10 +374,7 @@ def enroll_course(request, course_id):
     if request.user.role != 'student':
         raise PermissionDenied("Only students can enroll in courses.")
 
-    Enrollment.objects.get_or_create(
-        student=request.user,
-        course=course
-    )
+    seeding.enroll(request.user, course)
     messages.success(request, "You have successfully enrolled in this course.")
     return redirect('course_detail', pk=course.id)
 
@@ -309,6 +384,7 @@ def enroll_course(request, course_id):
 # INSTRUCTOR: ADD LESSONS
 # ----------------------------
 
+@query_budget(12)
 @login_required
 def instructor_add_lessons(request, course_id):
     course = get_object_or_404(Course, id=course_id)
@@ -322,15 +398,16 @@ def instructor_add_lessons(request, course_id):
     lessons = Lesson.objects.filter(course=course).order_by('order')
 
     if request.method == 'POST':
-        Lesson.objects.create(
-        course=course,
-        title=request.POST.get('title'),
-        youtube_url=request.POST.get('youtube_url') or None,
-        video_file=request.FILES.get('video_file'),
-        pdf_notes=request.FILES.get('pdf_notes'),
-        order=request.POST.get('order')
-    )
-
+        # Lesson signals update the course's enrollments in this transaction
+        with transaction.atomic():
+            Lesson.objects.create(
+                course=course,
+                title=request.POST.get('title'),
+                youtube_url=request.POST.get('youtube_url') or None,
+                video_file=request.FILES.get('video_file'),
+                pdf_notes=request.FILES.get('pdf_notes'),
+                order=request.POST.get('order')
+            )
 
         messages.success(request, "Lesson added successfully.")
         return redirect('instructor_add_lessons', course_id=course.id)
@@ -346,6 +423,7 @@ def instructor_add_lessons(request, course_id):
 # ----------------------------
 
 
+@query_budget(10)
 @login_required
 def instructor_edit_lesson(request, course_id, lesson_id):
     course = get_object_or_404(Course, id=course_id)
@@ -368,7 +446,10 @@ def instructor_edit_lesson(request, course_id, lesson_id):
         if request.FILES.get('pdf_notes'):
             lesson.pdf_notes = request.FILES.get('pdf_notes')
 
-        lesson.save()
+        with transaction.atomic():
+            # Only the edited fields: the transcoding worker writes hls_*
+            # while the form is open
+            lesson.save(update_fields=['title', 'youtube_url', 'order', 'video_file', 'pdf_notes'])
 
         messages.success(request, "Lesson updated successfully.")
         return redirect('instructor_add_lessons', course_id=course.id)
@@ -387,12 +468,13 @@ def instructor_edit_lesson(request, course_id, lesson_id):
 
 from django.contrib import messages
 
+@query_budget(13)
 @login_required
-def instructor_delete_lesson(request, lesson_id):
-    lesson = get_object_or_404(Lesson, id=lesson_id)
+def instructor_delete_lesson(request, course_id, lesson_id):
+    lesson = get_object_or_404(Lesson, id=lesson_id, course_id=course_id)
     course = lesson.course
 
-    if request.user != course.instructor:
+    if request.user.id != course.instructor_id:
         raise PermissionDenied("Not allowed.")
 
     if not course.is_approved:
@@ -405,10 +487,145 @@ def instructor_delete_lesson(request, lesson_id):
 
 
 
+# ----------------------------
+# INSTRUCTOR: RESUMABLE UPLOADS
+# ----------------------------
+# JSON/tus-style API for lesson videos and notes too large for one
+# POST: create an upload, PATCH chunks at its offset (HEAD tells a
+# resuming client where to carry on), then finalize to attach the file.
+
+def _upload_error(exc):
+    return JsonResponse({'error': str(exc)}, status=exc.status)
+
+
+def _upload_state(upload):
+    return {
+        'id': str(upload.id),
+        'url': reverse('lesson_upload', args=[upload.id]),
+        'field': upload.field,
+        'filename': upload.filename,
+        'offset': upload.offset,
+        'size': upload.size,
+    }
+
+
+@query_budget(4)
+@login_required
+@require_POST
+def lesson_upload_create(request, course_id, lesson_id):
+    lesson = get_object_or_404(
+        Lesson.objects.select_related('course'),
+        id=lesson_id,
+        course_id=course_id
+    )
+    if request.user.id != lesson.course.instructor_id:
+        raise PermissionDenied("Not allowed.")
+
+    if not lesson.course.is_approved:
+        raise PermissionDenied("Course not approved.")
+
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': "Expected a JSON body."}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({'error': "Expected a JSON object."}, status=400)
+
+    try:
+        upload = uploads.create(
+            lesson,
+            request.user,
+            field=data.get('field'),
+            filename=data.get('filename'),
+            size=data.get('size'),
+            sha256=data.get('sha256')
+        )
+    except uploads.UploadError as exc:
+        return _upload_error(exc)
+
+    response = JsonResponse(_upload_state(upload), status=201)
+    response['Location'] = reverse('lesson_upload', args=[upload.id])
+    return response
+
+
+@query_budget(4)
+@login_required
+@require_http_methods(['HEAD', 'PATCH', 'DELETE'])
+def lesson_upload(request, upload_id):
+    upload = get_object_or_404(
+        LessonUpload.objects.select_related('lesson'),
+        id=upload_id,
+        uploaded_by=request.user
+    )
+
+    if request.method == 'DELETE':
+        uploads.cancel(upload)
+        return HttpResponse(status=204)
+
+    if request.method == 'PATCH':
+        if request.content_type != 'application/offset+octet-stream':
+            return JsonResponse(
+                {'error': "Send chunks as application/offset+octet-stream."},
+                status=415
+            )
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            checksum = request.headers.get('Upload-Checksum')
+            # Read from the request stream, never request.body: a chunk
+            # goes to disk as it arrives instead of into memory
+            uploads.write_chunk(
+                upload,
+                offset,
+                request,
+                checksum=uploads.parse_checksum(checksum) if checksum else None
+            )
+        except ValueError:
+            return JsonResponse({'error': "Upload-Offset must be an integer."}, status=400)
+        except uploads.UploadError as exc:
+            response = _upload_error(exc)
+            response['Upload-Offset'] = upload.offset
+            return response
+        status = 204
+    else:
+        status = 200
+
+    response = HttpResponse(status=status)
+    response['Upload-Offset'] = upload.offset
+    response['Upload-Length'] = upload.size
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+# Session, user, upload + lesson, savepoint, locked lesson, lesson
+# update, content version, upload delete, release, and the transcode
+# queue for a video
+@query_budget(10)
+@login_required
+@require_POST
+def lesson_upload_finalize(request, upload_id):
+    upload = get_object_or_404(
+        LessonUpload.objects.select_related('lesson'),
+        id=upload_id,
+        uploaded_by=request.user
+    )
+
+    try:
+        lesson = uploads.finalize(upload)
+    except uploads.UploadError as exc:
+        return _upload_error(exc)
+
+    return JsonResponse({
+        'lesson': lesson.id,
+        'field': upload.field,
+        'name': getattr(lesson, upload.field).name,
+    })
+
+
 # ----------------------------
 # INSTRUCTOR: MY COURSES
 # ----------------------------
 
+@query_budget(3)
 @login_required
 def instructor_my_courses(request):
     if request.user.role != 'instructor':
@@ -425,6 +642,7 @@ def instructor_my_courses(request):
 # INSTRUCTOR: STUDENTS
 # ----------------------------
 
+@query_budget(4)
 @login_required
 def instructor_students(request):
     if request.user.role != 'instructor':
@@ -443,6 +661,7 @@ def instructor_students(request):
 # INSTRUCTOR: QUIZZES (STUB)
 # ----------------------------
 
+@query_budget(2)
 @login_required
 def instructor_quizzes(request):
     if request.user.role != 'instructor':
@@ -453,7 +672,10 @@ def instructor_quizzes(request):
 
 @login_required(login_url='/accounts/login/')
 def lesson_detail(request, lesson_id):
-    lesson = get_object_or_404(Lesson, id=lesson_id)
+    lesson = get_object_or_404(
+        Lesson.objects.select_related('course'),
+        id=lesson_id
+    )
     course = lesson.course
 
     enrollment = Enrollment.objects.get(
@@ -466,40 +688,24 @@ def lesson_detail(request, lesson_id):
         lesson=lesson
     )
 
-    total_lessons = course.lesson_set.count()
-    completed_lessons = LessonProgress.objects.filter(
-        enrollment=enrollment,
-        completed=True
-    ).count()
+    progress = CourseProgress(course, enrollment)
 
-    progress_percent = int((completed_lessons / total_lessons) * 100) if total_lessons else 0
+    progress_percent = progress.progress_percent
     course_completed = progress_percent == 100
 
-    lessons = course.lesson_set.all()
-    lesson_map = []
-
-    for l in lessons:
-        lp = LessonProgress.objects.filter(
-            enrollment=enrollment,
-            lesson=l,
-            completed=True
-        ).exists()
-
-        l.completed = lp
-        lesson_map.append(l)
-
     quiz = getattr(course, "quiz", None)
 
     return render(request, "courses/lesson_detail.html", {
         "lesson": lesson,
         "course": course,
-        "lessons": lesson_map,
+        "lessons": progress.lessons,
         "lesson_progress": lesson_progress,
         "progress_percent": progress_percent,
         "course_completed": course_completed,
         "quiz": quiz,
     })
 
+@query_budget(10)
 @login_required
 def mark_lesson_complete(request, lesson_id):
     lesson = get_object_or_404(Lesson, id=lesson_id)
@@ -507,7 +713,7 @@ def mark_lesson_complete(request, lesson_id):
     enrollment = get_object_or_404(
         Enrollment,
         student=request.user,
-        course=lesson.course
+        course_id=lesson.course_id
     )
 
     progress = get_object_or_404(
@@ -516,16 +722,9 @@ def mark_lesson_complete(request, lesson_id):
         lesson=lesson
     )
 
-    progress.completed = True
-    progress.save()
-
-    return redirect("lesson_player", lesson.course.id, lesson.id)
-
-
-def home(request):
-    courses = Course.objects.filter(status='published')[:8]
-
-    return render(request, 'courses/home.html', {
-        'courses': courses
-    })
+    # A locked lesson cannot be completed; the player redirects back
+    if not gating.is_locked(enrollment, lesson):
+        if counters.mark_progress_completed(progress):
+            gating.lesson_completed(progress, lesson.order)
 
+    return redirect("lesson_player", lesson.course_id, lesson.id)
@@ -0,0 +1,127 @@
+import operator
+import sys
+import threading
+from array import array
+
+from django.db.models import F
+
+from .models import Question, Quiz
+
+
+# ----------------------------
+# COMPILED ANSWER KEY
+# ----------------------------
+
+class AnswerKey:
+    """
+    A quiz's questions reduced to parallel arrays: question IDs and a
+    byte string of correct options (1-4). Grading compares the whole
+    submission against it in one pass, with no model instances.
+    """
+
+    __slots__ = ('question_ids', 'fields', 'answers')
+
+    def __init__(self, pairs):
+        self.question_ids = tuple(qid for qid, _ in pairs)
+        self.fields = tuple(str(qid) for qid in self.question_ids)
+        self.answers = bytes(option for _, option in pairs)
+
+    def __len__(self):
+        return len(self.answers)
+
+    def selections(self, data):
+        """
+        Submitted options as bytes aligned with the key; anything missing
+        or invalid becomes 0, which never matches.
+        """
+        get = data.get
+        selected = bytearray(len(self.fields))
+        for i, name in enumerate(self.fields):
+            value = get(name)
+            if value in ('1', '2', '3', '4'):
+                selected[i] = ord(value) - 48
+        return bytes(selected)
+
+    def grade(self, data):
+        """
+        Grades a submission (a dict-like such as request.POST keyed by
+        question ID). Returns (selections, number correct).
+        """
+        selections = self.selections(data)
+        return selections, sum(map(operator.eq, selections, self.answers))
+
+
+# ----------------------------
+# PACKED ATTEMPT STORAGE
+# ----------------------------
+
+def pack_selections(selections):
+    """
+    Packs selections (0-4 per question) two to a byte, high nibble
+    first. A 100-question attempt stores in 50 bytes.
+    """
+    if len(selections) % 2:
+        selections += b'\0'
+    return bytes(
+        selections[i] << 4 | selections[i + 1]
+        for i in range(0, len(selections), 2)
+    )
+
+
+def unpack_selections(packed, count):
+    selections = bytearray()
+    for byte in bytes(packed):
+        selections.append(byte >> 4)
+        selections.append(byte & 0x0F)
+    return bytes(selections[:count])
+
+
+def pack_question_ids(question_ids):
+    """Question IDs as little-endian uint32s."""
+    ids = array('I', question_ids)
+    if sys.byteorder == 'big':
+        ids.byteswap()
+    return ids.tobytes()
+
+
+def unpack_question_ids(packed):
+    ids = array('I')
+    ids.frombytes(bytes(packed))
+    if sys.byteorder == 'big':
+        ids.byteswap()
+    return tuple(ids)
+
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def get_answer_key(quiz):
+    """
+    Per-process cache keyed on (quiz id, key_version). Adding or editing
+    a question bumps Quiz.key_version, so every process reloads on its
+    next submission without any cross-process messaging.
+    """
+    cache_key = (quiz.id, quiz.key_version)
+    key = _cache.get(cache_key)
+
+    if key is None:
+        pairs = list(
+            Question.objects
+            .filter(quiz_id=quiz.id)
+            .order_by('id')
+            .values_list('id', 'correct_option')
+        )
+        key = AnswerKey(pairs)
+
+        with _lock:
+            # Drop keys compiled for older versions of this quiz
+            for stale in [k for k in _cache if k[0] == quiz.id]:
+                del _cache[stale]
+            _cache[cache_key] = key
+
+    return key
+
+
+def invalidate_answer_key(quiz_id):
+    Quiz.objects.filter(pk=quiz_id).update(key_version=F('key_version') + 1)
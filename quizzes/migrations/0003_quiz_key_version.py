@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 08:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0002_remove_question_correct_question_correct_option_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='key_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
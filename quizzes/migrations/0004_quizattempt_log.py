@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0003_quiz_key_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizresult',
+            name='attempts',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.CreateModel(
+            name='QuizAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveSmallIntegerField()),
+                ('correct', models.PositiveSmallIntegerField()),
+                ('total', models.PositiveSmallIntegerField()),
+                ('passed', models.BooleanField()),
+                ('answers', models.BinaryField()),
+                ('question_ids', models.BinaryField()),
+                ('key_version', models.PositiveIntegerField()),
+                ('attempted_at', models.DateTimeField(auto_now_add=True)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempts', to='quizzes.quiz')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_attempts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['quiz', 'user', '-attempted_at'], name='quizattempt_user_idx')],
+            },
+        ),
+    ]
@@ -14,6 +14,9 @@ class Quiz(models.Model):
     total_marks = models.IntegerField(default=100)
     is_active = models.BooleanField(default=True)
 
+    # Bumped whenever questions change; part of the answer key cache key
+    key_version = models.PositiveIntegerField(default=0)
+
     def __str__(self):
         return f"{self.title} ({self.course.title})"
 
@@ -46,7 +49,49 @@ class Question(models.Model):
         return self.text[:50]
 
 
+class QuizAttempt(models.Model):
+    """
+    Append-only log of every submission. Rows are never updated; the
+    student's best score lives in QuizResult.
+    """
+    quiz = models.ForeignKey(
+        Quiz,
+        on_delete=models.CASCADE,
+        related_name='attempts'
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='quiz_attempts'
+    )
+    score = models.PositiveSmallIntegerField()
+    correct = models.PositiveSmallIntegerField()
+    total = models.PositiveSmallIntegerField()
+    passed = models.BooleanField()
+
+    # Selected options packed two per byte, aligned with question_ids
+    # (see quizzes.grading.pack_selections / pack_question_ids)
+    answers = models.BinaryField()
+    question_ids = models.BinaryField()
+    key_version = models.PositiveIntegerField()
+
+    attempted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['quiz', 'user', '-attempted_at'], name='quizattempt_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.quiz.title} - {self.score}%"
+
+
 class QuizResult(models.Model):
+    """
+    Best attempt per student and quiz, kept up to date as attempts are
+    recorded so dashboards never read the attempt log.
+    """
+
     quiz = models.ForeignKey(
         Quiz,
         on_delete=models.CASCADE,
@@ -60,6 +105,7 @@ class QuizResult(models.Model):
     score = models.IntegerField()
     passed = models.BooleanField()
     attempted_at = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveIntegerField(default=1)
 
     class Meta:
         unique_together = ('quiz', 'user')
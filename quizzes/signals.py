@@ -0,0 +1,16 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .grading import invalidate_answer_key
+from .models import Question
+
+
+# ----------------------------
+# ANSWER KEY INVALIDATION
+# ----------------------------
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def question_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_answer_key(instance.quiz_id)
@@ -1,3 +1,110 @@
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from accounts.models import User
+from courses.models import Course
+from enrollments.models import Enrollment
+from .grading import (
+    AnswerKey, get_answer_key, pack_selections, unpack_question_ids,
+    unpack_selections,
+)
+from .models import Question, Quiz, QuizAttempt, QuizResult
+
+
+class AnswerKeyTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create_user(
+            username="teacher", password="pass12345",
+            role='instructor', is_approved=True
+        )
+        cls.student = User.objects.create_user(
+            username="student", password="pass12345", role='student'
+        )
+        cls.course = Course.objects.create(
+            instructor=cls.instructor, title="Course", description="Description"
+        )
+
+    def setUp(self):
+        self.quiz = Quiz.objects.create(course=self.course, title="Final", pass_mark=50)
+        self.questions = [
+            Question.objects.create(
+                quiz=self.quiz, text=f"Q{i}", option1="a", option2="b",
+                option3="c", option4="d", correct_option=i % 4 + 1
+            )
+            for i in range(4)
+        ]
+
+    def test_grade_counts_matches_and_ignores_bad_input(self):
+        key = AnswerKey([(1, 1), (2, 2), (3, 3), (4, 4)])
+
+        self.assertEqual(key.grade({'1': '1', '2': '2', '3': '4'}), (bytes([1, 2, 4, 0]), 2))
+        self.assertEqual(key.grade({'1': 'x', '2': '', '3': '33', '4': '4'}), (bytes([0, 0, 0, 4]), 1))
+
+    def test_key_is_cached_until_questions_change(self):
+        self.quiz.refresh_from_db()
+        get_answer_key(self.quiz)
+
+        with self.assertNumQueries(0):
+            key = get_answer_key(self.quiz)
+        self.assertEqual(len(key), 4)
+
+        self.client.force_login(self.instructor)
+        self.client.post(
+            reverse('instructor_manage_questions', args=[self.quiz.id]),
+            {
+                'text': "Q4", 'option1': "a", 'option2': "b",
+                'option3': "c", 'option4': "d", 'correct_option': "2",
+            }
+        )
+
+        self.quiz.refresh_from_db()
+        self.assertEqual(len(get_answer_key(self.quiz)), 5)
+
+    def test_submission_is_graded_from_the_key(self):
+        Enrollment.objects.create(student=self.student, course=self.course)
+        self.client.force_login(self.student)
+        answers = {str(q.id): str(q.correct_option) for q in self.questions[:3]}
+
+        response = self.client.post(reverse('quiz_detail', args=[self.quiz.id]), answers)
+
+        self.assertEqual(response.context['correct'], 3)
+        self.assertEqual(response.context['total'], 4)
+        self.assertEqual(response.context['percent'], 75)
+
+    def test_packed_selections_round_trip(self):
+        selections = bytes([1, 4, 0, 2, 3])
+
+        packed = pack_selections(selections)
+
+        self.assertEqual(len(packed), 3)
+        self.assertEqual(unpack_selections(packed, 5), selections)
+
+    def test_every_attempt_is_logged_and_best_result_kept(self):
+        Enrollment.objects.create(student=self.student, course=self.course)
+        self.client.force_login(self.student)
+        url = reverse('quiz_detail', args=[self.quiz.id])
+        right = {str(q.id): str(q.correct_option) for q in self.questions}
+
+        self.client.post(url, dict(list(right.items())[:3]))
+        self.client.post(url, right)
+        response = self.client.post(url, {})
+
+        self.assertEqual(response.context['percent'], 0)
+        self.assertEqual(
+            list(QuizAttempt.objects.order_by('id').values_list('score', flat=True)),
+            [75, 100, 0]
+        )
+        result = QuizResult.objects.get(quiz=self.quiz, user=self.student)
+        self.assertEqual((result.score, result.passed, result.attempts), (100, True, 3))
+
+        attempt = QuizAttempt.objects.order_by('id')[1]
+        self.assertEqual(
+            unpack_question_ids(attempt.question_ids),
+            tuple(q.id for q in self.questions)
+        )
+        self.assertEqual(
+            unpack_selections(attempt.answers, attempt.total),
+            bytes(q.correct_option for q in self.questions)
+        )
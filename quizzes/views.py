@@ -2,19 +2,23 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
 from django.contrib import messages
+from django.db.models import Count
 
 from courses.models import Course
 from enrollments.models import Enrollment, LessonProgress
-from certificates.models import Certificate
-from certificates.utils import generate_certificate_pdf
+from certificates.jobs import enqueue_certificate
+from SmartLearn.querybudget import query_budget
 
 from .models import Quiz, Question, QuizResult
+from .grading import get_answer_key
+from .attempts import record_attempt
 
 
 # =====================================================
 # STUDENT: TAKE QUIZ
 # =====================================================
 
+@query_budget(13)
 @login_required(login_url='/accounts/login/')
 def quiz_detail(request, quiz_id):
     quiz = get_object_or_404(Quiz, id=quiz_id)
@@ -45,46 +49,24 @@ def quiz_detail(request, quiz_id):
     # QUIZ SUBMISSION
     # ======================
     if request.method == 'POST':
-        correct = 0
-        total = questions.count()
-
-        for q in questions:
-            selected = request.POST.get(str(q.id))
-            if selected and int(selected) == q.correct_option:
-                correct += 1
-
-        percent = int((correct / total) * 100) if total > 0 else 0
-        passed = percent >= quiz.pass_mark
-
-        quiz_result, created = QuizResult.objects.get_or_create(
-    quiz=quiz,
-    user=request.user,
-    defaults={
-        'score': percent,
-        'passed': passed
-    }
-)
+        # One cached (question_id, correct_option) array per quiz version
+        answer_key = get_answer_key(quiz)
+        attempt, best = record_attempt(quiz, request.user, answer_key, request.POST)
 
+        correct = attempt.correct
+        total = attempt.total
+        percent = attempt.score
+        passed = attempt.passed
 
         certificate = None
 
-        # 🎓 CERTIFICATE GENERATION
+        # 🎓 CERTIFICATE GENERATION (rendered by run_certificate_worker)
         if passed:
-            cert, created = Certificate.objects.get_or_create(
+            certificate = enqueue_certificate(
                 user=request.user,
                 course=course
             )
 
-            if not cert.certificate_file:
-                pdf_file = generate_certificate_pdf(
-                    user=request.user,
-                    course=course
-                )
-
-                if pdf_file:
-                    cert.certificate_file.save(pdf_file.name, pdf_file)
-                    cert.save()
-
 
         return render(request, 'quizzes/result.html', {
             'quiz': quiz,
@@ -93,6 +75,7 @@ def quiz_detail(request, quiz_id):
             'percent': percent,
             'passed': passed,
             'pass_mark': quiz.pass_mark,
+            'best_result': best,
             'certificate': certificate
         })
 
@@ -110,12 +93,18 @@ def quiz_detail(request, quiz_id):
 # INSTRUCTOR: QUIZ LIST
 # =====================================================
 
+@query_budget(3)
 @login_required(login_url='/accounts/login/')
 def instructor_quizzes(request):
     if request.user.role != 'instructor':
         raise PermissionDenied("Instructors only.")
 
-    quizzes = Quiz.objects.filter(course__instructor=request.user)
+    quizzes = (
+        Quiz.objects
+        .filter(course__instructor=request.user)
+        .select_related('course')
+        .annotate(question_count=Count('questions'))
+    )
 
     return render(request, 'quizzes/instructor_quizzes.html', {
         'quizzes': quizzes
@@ -126,6 +115,7 @@ def instructor_quizzes(request):
 # INSTRUCTOR: CREATE QUIZ
 # =====================================================
 
+@query_budget(6)
 @login_required(login_url='/accounts/login/')
 def instructor_create_quiz(request, course_id):
     course = get_object_or_404(Course, id=course_id)
@@ -168,6 +158,7 @@ def instructor_create_quiz(request, course_id):
 # INSTRUCTOR: MANAGE QUESTIONS
 # =====================================================
 
+@query_budget(7)
 @login_required(login_url='/accounts/login/')
 def instructor_manage_questions(request, quiz_id):
     quiz = get_object_or_404(Quiz, id=quiz_id)
@@ -221,6 +212,7 @@ def instructor_manage_questions(request, quiz_id):
 # INSTRUCTOR: QUIZ RESULTS (PER STUDENT)
 # =====================================================
 
+@query_budget(5)
 @login_required(login_url='/accounts/login/')
 def instructor_quiz_results(request, quiz_id):
     quiz = get_object_or_404(Quiz, id=quiz_id)
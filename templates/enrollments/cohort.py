@@ -0,0 +1,245 @@
+"""
+Bulk cohort enrollment.
+
+Rows of (username, course ID) are read from a CSV or JSONL stream and
+processed BATCH_SIZE at a time: users, courses with their lesson counts
+and existing enrollments are resolved with one IN query each, then
+enrollments are inserted with bulk_create and their progress rows with
+a single INSERT ... SELECT joining the new enrollments to their
+course's lessons. A result is yielded for every input row as soon as
+its batch commits, so callers can stream the report while the rest of
+the file is still being read.
+"""
+
+import csv
+import json
+from itertools import islice
+
+from django.db import connection, transaction
+from django.db.models import Count, Min
+
+from accounts.models import User
+from courses.models import Course, Lesson
+from .models import Enrollment, LessonProgress
+
+
+BATCH_SIZE = 2000
+
+FORMATS = ('csv', 'jsonl')
+
+# Row outcomes
+ENROLLED = 'enrolled'
+ALREADY_ENROLLED = 'already_enrolled'
+DUPLICATE = 'duplicate'
+INVALID = 'invalid'
+UNKNOWN_USER = 'unknown_user'
+NOT_STUDENT = 'not_student'
+UNKNOWN_COURSE = 'unknown_course'
+
+REPORT_FIELDS = ('line', 'username', 'course_id', 'status', 'enrollment_id')
+
+
+# ----------------------------
+# PARSING
+# ----------------------------
+
+def parse_rows(lines, fmt):
+    """
+    Yield (line number, username, course ID) from an iterable of text
+    lines. CSV needs a header with username and course_id columns;
+    JSONL has one {"username": ..., "course_id": ...} object per line.
+    Unparseable rows come through with course ID None.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, (row.get('username') or '').strip(), _course_id(row.get('course_id'))
+    elif fmt == 'jsonl':
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            if not isinstance(row, dict):
+                yield number, '', None
+                continue
+            yield number, str(row.get('username') or '').strip(), _course_id(row.get('course_id'))
+    else:
+        raise ValueError(f"Unknown format {fmt!r}; expected one of {', '.join(FORMATS)}.")
+
+
+def _course_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# ----------------------------
+# ENROLLMENT
+# ----------------------------
+
+def enroll_rows(rows, batch_size=BATCH_SIZE):
+    """
+    Enroll every (line, username, course ID) row and yield one result
+    dict per row, in input order. Each batch runs in its own
+    transaction; a row repeated within the stream is reported once as
+    enrolled (or already enrolled) and afterwards as a duplicate.
+    """
+    rows = iter(rows)
+    seen = set()
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield from _enroll_batch(batch, seen)
+
+
+def _enroll_batch(batch, seen):
+    usernames = {username for _, username, _ in batch if username}
+    course_ids = {course_id for _, _, course_id in batch if course_id is not None}
+
+    users = {
+        username: (pk, role)
+        for pk, username, role in User.objects.filter(
+            username__in=usernames
+        ).values_list('id', 'username', 'role')
+    }
+    courses = {
+        pk: (lessons, first_order or 0)
+        for pk, lessons, first_order in Course.objects.filter(id__in=course_ids)
+        .annotate(lessons=Count('lesson'), first_order=Min('lesson__order'))
+        .values_list('id', 'lessons', 'first_order')
+    }
+
+    student_ids = {pk for pk, role in users.values() if role == 'student'}
+    existing = {
+        (student_id, course_id): pk
+        for pk, student_id, course_id in Enrollment.objects.filter(
+            student_id__in=student_ids,
+            course_id__in=courses
+        ).values_list('id', 'student_id', 'course_id')
+    }
+
+    results = []
+    pending = {}
+    for line, username, course_id in batch:
+        result = {
+            'line': line,
+            'username': username,
+            'course_id': course_id,
+            'status': None,
+            'enrollment_id': None,
+        }
+        results.append(result)
+
+        if not username or course_id is None:
+            result['status'] = INVALID
+            continue
+        if username not in users:
+            result['status'] = UNKNOWN_USER
+            continue
+        student_id, role = users[username]
+        if role != 'student':
+            result['status'] = NOT_STUDENT
+            continue
+        if course_id not in courses:
+            result['status'] = UNKNOWN_COURSE
+            continue
+
+        key = (student_id, course_id)
+        if key in seen:
+            result['status'] = DUPLICATE
+        elif key in existing:
+            result['status'] = ALREADY_ENROLLED
+            result['enrollment_id'] = existing[key]
+        else:
+            result['status'] = ENROLLED
+            pending[key] = result
+        seen.add(key)
+
+    if pending:
+        with transaction.atomic():
+            Enrollment.objects.bulk_create(
+                [
+                    Enrollment(
+                        student_id=student_id,
+                        course_id=course_id,
+                        total_lessons=courses[course_id][0],
+                        unlocked_order=courses[course_id][1]
+                    )
+                    for student_id, course_id in pending
+                ],
+                ignore_conflicts=True
+            )
+
+            # Read IDs back rather than rely on RETURNING: works on every
+            # backend and picks up rows a concurrent enroll beat us to
+            created = Enrollment.objects.filter(
+                student_id__in={student_id for student_id, _ in pending},
+                course_id__in={course_id for _, course_id in pending}
+            ).values_list('id', 'student_id', 'course_id')
+
+            enrollment_ids = []
+            for pk, student_id, course_id in created:
+                result = pending.get((student_id, course_id))
+                if result is not None:
+                    result['enrollment_id'] = pk
+                    enrollment_ids.append(pk)
+
+            _seed_progress(enrollment_ids)
+
+    return results
+
+
+def _seed_progress(enrollment_ids):
+    """
+    One progress row per (enrollment, lesson of its course), built by the
+    database. Building the rows as model instances for bulk_create costs
+    more than the insert itself at cohort sizes. Rows that already exist
+    are skipped.
+    """
+    if not enrollment_ids:
+        return
+
+    quote = connection.ops.quote_name
+    progress = quote(LessonProgress._meta.db_table)
+    enrollment = quote(Enrollment._meta.db_table)
+    lesson = quote(Lesson._meta.db_table)
+    placeholders = ', '.join(['%s'] * len(enrollment_ids))
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {progress} (enrollment_id, lesson_id, completed) "
+            f"SELECT e.id, l.id, %s FROM {enrollment} e "
+            f"INNER JOIN {lesson} l ON l.course_id = e.course_id "
+            f"WHERE e.id IN ({placeholders}) "
+            f"AND NOT EXISTS (SELECT 1 FROM {progress} p "
+            f"WHERE p.enrollment_id = e.id AND p.lesson_id = l.id)",
+            [False, *enrollment_ids]
+        )
+
+
+# ----------------------------
+# REPORT
+# ----------------------------
+
+class _Echo:
+    """File-like object whose write() hands the line back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+def report_lines(results, fmt):
+    """Render results as CSV (with a header) or JSONL, a line at a time."""
+    if fmt == 'csv':
+        writer = csv.writer(_Echo(), lineterminator='\n')
+        yield writer.writerow(REPORT_FIELDS)
+        for result in results:
+            yield writer.writerow([result[field] for field in REPORT_FIELDS])
+    else:
+        for result in results:
+            yield json.dumps(result) + '\n'
@@ -0,0 +1,103 @@
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from courses.models import Lesson
+from .models import Enrollment, LessonProgress
+
+
+# ----------------------------
+# INCREMENTAL UPDATES
+# ----------------------------
+
+def mark_progress_completed(progress):
+    """
+    Flip a LessonProgress row to completed and bump its enrollment's
+    counter in the same transaction. Returns True if the row changed.
+    """
+    with transaction.atomic():
+        changed = LessonProgress.objects.filter(
+            pk=progress.pk,
+            completed=False
+        ).update(completed=True)
+
+        if changed:
+            Enrollment.objects.filter(pk=progress.enrollment_id).update(
+                completed_lessons=F('completed_lessons') + 1
+            )
+
+    progress.completed = True
+    return bool(changed)
+
+
+def lesson_added(lesson):
+    Enrollment.objects.filter(course_id=lesson.course_id).update(
+        total_lessons=F('total_lessons') + 1
+    )
+
+
+def lesson_removed(lesson):
+    """
+    Must run before the lesson is deleted, while its progress rows
+    still exist: courses.signals calls it from pre_delete, inside the
+    delete's transaction.
+    """
+    completed_enrollments = LessonProgress.objects.filter(
+        lesson=lesson,
+        completed=True
+    ).values('enrollment_id')
+
+    Enrollment.objects.filter(
+        pk__in=completed_enrollments,
+        completed_lessons__gt=0
+    ).update(completed_lessons=F('completed_lessons') - 1)
+
+    Enrollment.objects.filter(
+        course_id=lesson.course_id,
+        total_lessons__gt=0
+    ).update(total_lessons=F('total_lessons') - 1)
+
+
+# ----------------------------
+# BULK REBUILD (DRIFT REPAIR)
+# ----------------------------
+
+def _count_subquery(queryset, group_by):
+    counts = (
+        queryset
+        .order_by()
+        .values(group_by)
+        .annotate(n=Count('pk'))
+        .values('n')
+    )
+    return Coalesce(
+        Subquery(counts, output_field=IntegerField()),
+        Value(0)
+    )
+
+
+def rebuild_counters(enrollments=None):
+    """
+    Recompute both counters from the source tables in a single UPDATE.
+    Returns the number of enrollments touched.
+    """
+    if enrollments is None:
+        enrollments = Enrollment.objects.all()
+
+    total = _count_subquery(
+        Lesson.objects.filter(course_id=OuterRef('course_id')),
+        'course_id'
+    )
+    completed = _count_subquery(
+        LessonProgress.objects.filter(
+            enrollment_id=OuterRef('pk'),
+            lesson__course_id=OuterRef('course_id'),
+            completed=True
+        ),
+        'enrollment_id'
+    )
+
+    return enrollments.update(
+        total_lessons=total,
+        completed_lessons=completed
+    )
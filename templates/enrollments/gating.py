@@ -0,0 +1,108 @@
+from django.db.models import Exists, IntegerField, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from courses.models import Lesson
+from .models import Enrollment, LessonProgress
+
+
+# ----------------------------
+# SEQUENTIAL UNLOCK
+# ----------------------------
+# Lessons unlock in order: a student may open every lesson up to and
+# including the first one they have not completed. That lesson's order
+# is stored on Enrollment.unlocked_order, so a lock check is a single
+# integer comparison. Once every lesson is completed it holds the
+# highest order and nothing is locked.
+#
+# The value is set when an enrollment is created, advanced in one
+# UPDATE when its frontier lesson is completed, and recomputed for the
+# whole course when lessons are added, removed or reordered (Lesson
+# signals in courses.signals, so the admin is covered too). NULL means
+# "not computed" (enrollments made outside enrollments.seeding and
+# enrollments.cohort); it is filled in on the first check.
+
+def _unlocked_order_expression(after=None):
+    """
+    First incomplete lesson of the enrollment's course (optionally
+    only lessons ordered after `after`), falling back to the course's
+    highest order, or 0 for a course without lessons.
+    """
+    lessons = Lesson.objects.filter(course_id=OuterRef('course_id'))
+    if after is not None:
+        lessons = lessons.filter(order__gt=after)
+
+    incomplete = lessons.exclude(
+        Exists(LessonProgress.objects.filter(
+            enrollment_id=OuterRef(OuterRef('pk')),
+            lesson_id=OuterRef('pk'),
+            completed=True
+        ))
+    ).order_by('order').values('order')[:1]
+
+    highest = (
+        Lesson.objects
+        .filter(course_id=OuterRef('course_id'))
+        .order_by()
+        .values('course_id')
+        .annotate(highest=Max('order'))
+        .values('highest')
+    )
+
+    return Coalesce(
+        Subquery(incomplete, output_field=IntegerField()),
+        Subquery(highest, output_field=IntegerField()),
+        Value(0)
+    )
+
+
+def unlocked_order(enrollment):
+    """The enrollment's unlocked order, computing and storing it if needed."""
+    if enrollment.unlocked_order is None:
+        compute(Enrollment.objects.filter(pk=enrollment.pk))
+        enrollment.refresh_from_db(fields=['unlocked_order'])
+    return enrollment.unlocked_order
+
+
+def is_locked(enrollment, lesson):
+    return lesson.order > unlocked_order(enrollment)
+
+
+def first_incomplete_order(orders, completed):
+    """
+    In-memory equivalent of the stored value, for callers that already
+    hold the course's lesson orders and the completed ones.
+    """
+    orders = sorted(orders)
+    for order in orders:
+        if order not in completed:
+            return order
+    return orders[-1] if orders else 0
+
+
+# ----------------------------
+# UPDATES
+# ----------------------------
+
+def compute(enrollments):
+    """Recompute unlocked_order for a queryset of enrollments in one UPDATE."""
+    return enrollments.update(unlocked_order=_unlocked_order_expression())
+
+
+def lesson_completed(progress, order):
+    """
+    Advance the enrollment past a lesson that was just completed. Only
+    completing the current frontier lesson moves it; the new value is
+    the next incomplete lesson, found in the same UPDATE.
+    """
+    Enrollment.objects.filter(
+        pk=progress.enrollment_id,
+        unlocked_order=order
+    ).update(unlocked_order=_unlocked_order_expression(after=order))
+
+
+def course_changed(course_id):
+    """
+    Recompute every enrollment in a course. courses.signals calls it
+    whenever a lesson is added, removed or reordered.
+    """
+    return compute(Enrollment.objects.filter(course_id=course_id))
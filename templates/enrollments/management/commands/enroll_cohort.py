@@ -0,0 +1,54 @@
+import sys
+import time
+from collections import Counter
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+
+from enrollments.cohort import BATCH_SIZE, FORMATS, enroll_rows, parse_rows, report_lines
+
+
+class Command(BaseCommand):
+    help = (
+        "Enroll a cohort from a CSV or JSONL file of usernames and course IDs. "
+        "Writes a per-row report to stdout."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, or - for stdin.")
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help="Input and report format. Defaults to the file extension."
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or path.rsplit('.', 1)[-1].lower()
+        if fmt not in FORMATS:
+            raise CommandError("Cannot tell the format from the file name; pass --format.")
+
+        try:
+            source = nullcontext(sys.stdin) if path == '-' else open(path, newline='', encoding='utf-8')
+        except OSError as exc:
+            raise CommandError(exc)
+
+        statuses = Counter()
+        start = time.perf_counter()
+
+        def counted(results):
+            for result in results:
+                statuses[result['status']] += 1
+                yield result
+
+        with source as lines:
+            results = counted(enroll_rows(parse_rows(lines, fmt), options['batch_size']))
+            for line in report_lines(results, fmt):
+                self.stdout.write(line, ending='')
+
+        elapsed = time.perf_counter() - start
+        summary = ', '.join(f"{count} {status}" for status, count in sorted(statuses.items()))
+        self.stderr.write(self.style.SUCCESS(
+            f"Processed {sum(statuses.values())} rows in {elapsed:.1f}s: {summary or 'nothing to do'}."
+        ))
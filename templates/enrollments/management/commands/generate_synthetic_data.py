@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from enrollments.synthetic import BATCH_SIZE, SCALES, Scale, bulk_load_pragmas, generate
+
+
+class Command(BaseCommand):
+    help = "Load a synthetic dataset (users, courses, enrollments, progress) for load testing."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            choices=SCALES,
+            default='1k',
+            help="Preset size, by number of students."
+        )
+        parser.add_argument('--students', type=int, help="Override the preset student count.")
+        parser.add_argument('--courses', type=int, help="Override the preset course count.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--prefix',
+            default='syn',
+            help="Username and slug prefix, to keep loads apart."
+        )
+        parser.add_argument(
+            '--journal-mode',
+            choices=['OFF', 'WAL', 'DELETE'],
+            default='OFF',
+            help="SQLite journal mode during the load."
+        )
+
+    def handle(self, *args, **options):
+        scale = SCALES[options['scale']]
+        overrides = {
+            key: options[key] for key in ('students', 'courses') if options[key] is not None
+        }
+        if any(value < 1 for value in overrides.values()):
+            raise CommandError("--students and --courses must be positive.")
+        scale = Scale(**{**scale.__dict__, **overrides})
+
+        if scale.enrollments_per_student > scale.courses:
+            raise CommandError("Need at least as many courses as enrollments per student.")
+
+        verbose = options['verbosity'] > 1
+        start = time.perf_counter()
+
+        with bulk_load_pragmas(options['journal_mode']):
+            counts = generate(
+                scale,
+                seed=options['seed'],
+                batch_size=options['batch_size'],
+                prefix=options['prefix'],
+                log=self.stdout.write if verbose else None,
+            )
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {counts['users']} users, {counts['courses']} courses, "
+            f"{counts['enrollments']} enrollments and {counts['progress']} progress rows "
+            f"in {elapsed:.1f}s ({counts['progress'] / elapsed:,.0f} progress rows/s)."
+        ))
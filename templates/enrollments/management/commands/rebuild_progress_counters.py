@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from enrollments import gating
+from enrollments.counters import rebuild_counters
+from enrollments.models import Enrollment
+
+
+class Command(BaseCommand):
+    help = "Recompute completed/total lesson counters and unlocked lesson order on every enrollment."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--course',
+            type=int,
+            help="Only rebuild enrollments of this course ID."
+        )
+
+    def handle(self, *args, **options):
+        enrollments = Enrollment.objects.all()
+
+        if options['course']:
+            enrollments = enrollments.filter(course_id=options['course'])
+
+        updated = rebuild_counters(enrollments)
+        gating.compute(enrollments)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt progress counters for {updated} enrollments."
+        ))
@@ -0,0 +1,51 @@
+# Generated by Django 6.0.1 on 2026-10-18 05:53
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Enrollment = apps.get_model('enrollments', 'Enrollment')
+    LessonProgress = apps.get_model('enrollments', 'LessonProgress')
+    Lesson = apps.get_model('courses', 'Lesson')
+
+    total = (
+        Lesson.objects.filter(course_id=OuterRef('course_id'))
+        .order_by().values('course_id').annotate(n=Count('pk')).values('n')
+    )
+    completed = (
+        LessonProgress.objects.filter(
+            enrollment_id=OuterRef('pk'),
+            lesson__course_id=OuterRef('course_id'),
+            completed=True
+        )
+        .order_by().values('enrollment_id').annotate(n=Count('pk')).values('n')
+    )
+
+    Enrollment.objects.update(
+        total_lessons=Coalesce(Subquery(total, output_field=IntegerField()), Value(0)),
+        completed_lessons=Coalesce(Subquery(completed, output_field=IntegerField()), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_lesson_video_file'),
+        ('enrollments', '0005_alter_enrollment_student'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enrollment',
+            name='completed_lessons',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='total_lessons',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 6.0.1 on 2026-10-18 06:29
+
+from django.db import migrations, models
+from django.db.models import Exists, IntegerField, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_unlocked_order(apps, schema_editor):
+    Enrollment = apps.get_model('enrollments', 'Enrollment')
+    LessonProgress = apps.get_model('enrollments', 'LessonProgress')
+    Lesson = apps.get_model('courses', 'Lesson')
+
+    incomplete = (
+        Lesson.objects.filter(course_id=OuterRef('course_id'))
+        .exclude(Exists(LessonProgress.objects.filter(
+            enrollment_id=OuterRef(OuterRef('pk')),
+            lesson_id=OuterRef('pk'),
+            completed=True
+        )))
+        .order_by('order').values('order')[:1]
+    )
+    highest = (
+        Lesson.objects.filter(course_id=OuterRef('course_id'))
+        .order_by().values('course_id').annotate(highest=Max('order')).values('highest')
+    )
+
+    Enrollment.objects.update(unlocked_order=Coalesce(
+        Subquery(incomplete, output_field=IntegerField()),
+        Subquery(highest, output_field=IntegerField()),
+        Value(0)
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_lesson_video_file'),
+        ('enrollments', '0006_enrollment_progress_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enrollment',
+            name='unlocked_order',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_unlocked_order, migrations.RunPython.noop),
+    ]
@@ -13,17 +13,22 @@ class Enrollment(models.Model):
 
     enrolled_at = models.DateTimeField(auto_now_add=True)
 
+    # Denormalized progress counters, kept in sync by enrollments.counters
+    completed_lessons = models.PositiveIntegerField(default=0)
+    total_lessons = models.PositiveIntegerField(default=0)
+
+    # Order of the first lesson not yet completed, maintained by
+    # enrollments.gating; NULL until first computed
+    unlocked_order = models.PositiveIntegerField(null=True, blank=True)
+
     class Meta:
         unique_together = ('student', 'course')
 
     def progress_percent(self):
-        total = Lesson.objects.filter(course=self.course).count()
-        completed = LessonProgress.objects.filter(
-            enrollment=self, completed=True
-        ).count()
-        if total == 0:
+        if self.total_lessons == 0:
             return 0
-        return int((completed / total) * 100)
+        completed = min(self.completed_lessons, self.total_lessons)
+        return int((completed / self.total_lessons) * 100)
 
     def __str__(self):
         return f"{self.student.username} - {self.course.title}"
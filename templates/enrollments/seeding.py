@@ -0,0 +1,95 @@
+from django.db import transaction
+
+from courses.models import Lesson
+from .models import Enrollment, LessonProgress
+
+
+BATCH_SIZE = 1000
+
+
+# ----------------------------
+# ENROLLMENT
+# ----------------------------
+
+def enroll(student, course):
+    """
+    Enroll a student and give them a progress row for every lesson.
+
+    Reads the lesson IDs and, for an existing enrollment, the lessons
+    that already have rows, then inserts the rest with one
+    bulk_create. Re-enrolling fills any gaps and never duplicates.
+    Returns (enrollment, created).
+    """
+    with transaction.atomic():
+        lessons = dict(
+            Lesson.objects.filter(course=course).values_list('id', 'order')
+        )
+
+        enrollment, created = Enrollment.objects.get_or_create(
+            student=student,
+            course=course,
+            defaults={
+                'total_lessons': len(lessons),
+                # Nothing completed yet: only the first lesson is open
+                'unlocked_order': min(lessons.values(), default=0),
+            }
+        )
+
+        if created:
+            existing = set()
+        else:
+            existing = set(
+                LessonProgress.objects.filter(
+                    enrollment=enrollment
+                ).values_list('lesson_id', flat=True)
+            )
+
+        missing = [
+            LessonProgress(enrollment=enrollment, lesson_id=lesson_id)
+            for lesson_id in lessons
+            if lesson_id not in existing
+        ]
+        if missing:
+            LessonProgress.objects.bulk_create(
+                missing,
+                batch_size=BATCH_SIZE,
+                ignore_conflicts=True
+            )
+
+    return enrollment, created
+
+
+# ----------------------------
+# NEW LESSON BACKFILL
+# ----------------------------
+
+def backfill_lesson(lesson):
+    """
+    Add a progress row for a new lesson to every enrollment in its
+    course. Enrollment IDs are streamed and inserted BATCH_SIZE at a
+    time, so large courses never load every enrollment at once.
+    Returns the number of rows offered for insert.
+    """
+    enrollment_ids = (
+        Enrollment.objects
+        .filter(course_id=lesson.course_id)
+        .order_by()
+        .values_list('id', flat=True)
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+
+    batch = []
+    offered = 0
+    for enrollment_id in enrollment_ids:
+        batch.append(LessonProgress(enrollment_id=enrollment_id, lesson=lesson))
+        if len(batch) == BATCH_SIZE:
+            offered += _insert(batch)
+            batch = []
+    if batch:
+        offered += _insert(batch)
+    return offered
+
+
+def _insert(batch):
+    LessonProgress.objects.bulk_create(batch, ignore_conflicts=True)
+    return len(batch)
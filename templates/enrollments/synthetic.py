@@ -0,0 +1,305 @@
+"""
+Synthetic SmartLearn datasets for load testing.
+
+generate() seeds instructors, published courses with lessons and a quiz
+each, students, enrollments with partial progress, and quiz results for
+students who finished a course. It is built for volume:
+
+- primary keys are assigned up front from the current maximum, so rows
+  reference each other without reading IDs back and bulk_create never
+  needs RETURNING;
+- the catalogue and users go through bulk_create; enrollments and
+  progress rows, the bulk of the volume, are plain tuples inserted with
+  executemany;
+- students are loaded one batch per transaction together with their
+  enrollments, progress and results, so memory stays flat at any scale;
+- on SQLite, bulk_load_pragmas() turns off journaling and fsync for the
+  duration of the load.
+
+The same seed on an empty database always produces the same data.
+"""
+
+import random
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from accounts.models import User
+from courses.models import Category, Course, Lesson
+from courses.caching import CATALOGUE, CATEGORIES
+from courses.search import get_backend
+from dashboard.caching import COUNTS
+from quizzes.models import Question, Quiz, QuizResult
+from .models import Enrollment, LessonProgress
+
+
+BATCH_SIZE = 5000
+
+PASSWORD = "synthetic12345"
+
+WORDS = (
+    "python django web data science machine learning design marketing "
+    "finance excel photography music guitar piano writing business "
+    "cloud security network linux docker kubernetes react javascript "
+    "statistics algebra calculus physics chemistry biology history"
+).split()
+
+
+@dataclass(frozen=True)
+class Scale:
+    students: int
+    courses: int
+    lessons_per_course: int = 10
+    questions_per_quiz: int = 5
+    enrollments_per_student: int = 3
+
+    @property
+    def instructors(self):
+        return max(1, self.courses // 25)
+
+
+SCALES = {
+    '1k': Scale(students=1_000, courses=50),
+    '100k': Scale(students=100_000, courses=1_000),
+    '1m': Scale(students=1_000_000, courses=5_000),
+}
+
+
+# ----------------------------
+# SQLITE BULK LOAD
+# ----------------------------
+
+@contextmanager
+def bulk_load_pragmas(journal_mode='OFF'):
+    """
+    Relax SQLite durability while loading: no rollback journal (or WAL)
+    and no fsync. A crash mid-load can corrupt the database, which is
+    acceptable for throwaway synthetic data. Settings are restored on
+    exit. Does nothing on other databases or inside a transaction, where
+    SQLite refuses to change them.
+    """
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        yield
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA journal_mode")
+        old_journal = cursor.fetchone()[0]
+        cursor.execute("PRAGMA synchronous")
+        old_synchronous = cursor.fetchone()[0]
+
+        cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA cache_size=-262144")  # 256 MB
+
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA journal_mode={old_journal}")
+            cursor.execute(f"PRAGMA synchronous={old_synchronous}")
+
+
+# ----------------------------
+# GENERATOR
+# ----------------------------
+
+class _Ids:
+    """Hands out primary keys above the current maximum of each model."""
+
+    def __init__(self):
+        self.next = {}
+
+    def take(self, model, count):
+        if model not in self.next:
+            self.next[model] = (model.objects.aggregate(m=Max('pk'))['m'] or 0) + 1
+        first = self.next[model]
+        self.next[model] = first + count
+        return range(first, first + count)
+
+
+def _insert(model, objects, batch_size):
+    for start in range(0, len(objects), batch_size):
+        model.objects.bulk_create(objects[start:start + batch_size])
+
+
+ENROLLMENT_FIELDS = (
+    'id', 'student_id', 'course_id', 'enrolled_at',
+    'completed_lessons', 'total_lessons', 'unlocked_order',
+)
+PROGRESS_FIELDS = ('enrollment_id', 'lesson_id', 'completed')
+
+
+def _insert_rows(model, fields, rows, batch_size):
+    """
+    executemany() of plain tuples for the high-volume tables. bulk_create
+    spends most of its time preparing each value through its field; these
+    rows hold only ints, bools and a pre-adapted timestamp.
+    """
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(model._meta.get_field(name).column) for name in fields)
+    sql = (
+        f"INSERT INTO {quote(model._meta.db_table)} ({columns}) "
+        f"VALUES ({', '.join(['%s'] * len(fields))})"
+    )
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            cursor.executemany(sql, rows[start:start + batch_size])
+
+
+def generate(scale, seed=42, batch_size=BATCH_SIZE, prefix='syn', log=None):
+    """
+    Load one synthetic dataset and return row counts per model.
+    Usernames are "<prefix>-student<pk>", so repeated loads with
+    different seeds do not collide.
+    """
+    log = log or (lambda message: None)
+    rng = random.Random(seed)
+    ids = _Ids()
+    counts = dict.fromkeys(
+        ('users', 'courses', 'lessons', 'questions', 'enrollments', 'progress', 'results'), 0
+    )
+    # Hashing dominates user creation; one hash serves every account
+    password = make_password(PASSWORD)
+    total = scale.lessons_per_course
+
+    # Catalogue: small enough to build in one go
+    with transaction.atomic():
+        category_ids = list(ids.take(Category, 10))
+        _insert(Category, [
+            Category(id=pk, name=word.title(), slug=f"{prefix}-{word}-{pk}")
+            for pk, word in zip(category_ids, WORDS)
+        ], batch_size)
+
+        instructor_ids = list(ids.take(User, scale.instructors))
+        _insert(User, [
+            User(id=pk, username=f"{prefix}-instructor{pk}", password=password,
+                 role='instructor', is_approved=True)
+            for pk in instructor_ids
+        ], batch_size)
+
+        course_ids = list(ids.take(Course, scale.courses))
+        _insert(Course, [
+            Course(
+                id=pk,
+                instructor_id=rng.choice(instructor_ids),
+                title=f"{' '.join(rng.sample(WORDS, 3)).title()} {pk}",
+                description=' '.join(rng.choices(WORDS, k=40)),
+                category_id=rng.choice(category_ids),
+                status='published',
+                is_approved=True,
+            )
+            for pk in course_ids
+        ], batch_size)
+
+        lesson_ids = ids.take(Lesson, scale.courses * total)
+        lessons_by_course = {}
+        lessons = []
+        for i, pk in enumerate(lesson_ids):
+            course_id = course_ids[i // total]
+            order = i % total + 1
+            lessons_by_course.setdefault(course_id, []).append(pk)
+            lessons.append(Lesson(id=pk, course_id=course_id, title=f"Lesson {order}", order=order))
+        _insert(Lesson, lessons, batch_size)
+
+        quiz_ids = ids.take(Quiz, scale.courses)
+        quiz_by_course = dict(zip(course_ids, quiz_ids))
+        _insert(Quiz, [
+            Quiz(id=quiz_id, course_id=course_id, title=f"Quiz {course_id}")
+            for course_id, quiz_id in quiz_by_course.items()
+        ], batch_size)
+
+        question_ids = iter(ids.take(Question, scale.courses * scale.questions_per_quiz))
+        _insert(Question, [
+            Question(
+                id=next(question_ids), quiz_id=quiz_id, text=f"Question {n}",
+                option1="a", option2="b", option3="c", option4="d",
+                correct_option=rng.randint(1, 4),
+            )
+            for quiz_id in quiz_ids
+            for n in range(scale.questions_per_quiz)
+        ], batch_size)
+
+    counts['users'] += len(instructor_ids)
+    counts['courses'] = scale.courses
+    counts['lessons'] = len(lessons)
+    counts['questions'] = scale.courses * scale.questions_per_quiz
+    log(f"{scale.courses} courses, {len(lessons)} lessons")
+
+    # Students, each batch with its enrollments, progress and results
+    per_student = scale.enrollments_per_student
+
+    for first in range(0, scale.students, batch_size):
+        size = min(batch_size, scale.students - first)
+        student_ids = ids.take(User, size)
+        enrollment_ids = iter(ids.take(Enrollment, size * per_student))
+
+        students = []
+        enrollments = []
+        progress = []
+        results = []
+        enrolled_at = connection.ops.adapt_datetimefield_value(timezone.now())
+
+        for student_id in student_ids:
+            students.append(User(
+                id=student_id, username=f"{prefix}-student{student_id}",
+                password=password, role='student'
+            ))
+            for course_id in rng.sample(course_ids, per_student):
+                enrollment_id = next(enrollment_ids)
+                done = rng.randint(0, total)
+                # Lesson orders run 1..total, so the first incomplete
+                # lesson is order done + 1
+                enrollments.append((
+                    enrollment_id, student_id, course_id, enrolled_at,
+                    done, total, min(done + 1, total),
+                ))
+
+                course_lessons = lessons_by_course[course_id]
+                progress.extend(
+                    (enrollment_id, lesson_id, True) for lesson_id in course_lessons[:done]
+                )
+                if done < total:
+                    # The lesson player creates a row for the lesson being watched
+                    progress.append((enrollment_id, course_lessons[done], False))
+                else:
+                    score = rng.randint(20, 100)
+                    results.append(QuizResult(
+                        quiz_id=quiz_by_course[course_id], user_id=student_id,
+                        score=score, passed=score >= 50,
+                    ))
+
+        with transaction.atomic():
+            _insert(User, students, batch_size)
+            _insert_rows(Enrollment, ENROLLMENT_FIELDS, enrollments, batch_size)
+            _insert_rows(LessonProgress, PROGRESS_FIELDS, progress, batch_size)
+            _insert(QuizResult, results, batch_size)
+
+        counts['users'] += len(students)
+        counts['enrollments'] += len(enrollments)
+        counts['progress'] += len(progress)
+        counts['results'] += len(results)
+        log(f"{first + size}/{scale.students} students, {counts['progress']} progress rows")
+
+    _reset_sequences()
+    get_backend().rebuild()
+    # bulk_create sends no signals
+    for namespace in (CATALOGUE, CATEGORIES, COUNTS):
+        namespace.invalidate()
+    return counts
+
+
+def _reset_sequences():
+    # SQLite follows explicit IDs on its own; PostgreSQL sequences do not
+    if connection.vendor == 'sqlite':
+        return
+    models = [Category, User, Course, Lesson, Quiz, Question, Enrollment]
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)
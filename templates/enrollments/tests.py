@@ -1,3 +1,393 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+
+from accounts.models import User
+from courses.models import Category, Course, Lesson
+from .models import Enrollment, LessonProgress
+from . import cohort, counters, gating
+
+
+class ProgressCounterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create_user(
+            username="teacher", password="pass12345",
+            role='instructor', is_approved=True
+        )
+        cls.student = User.objects.create_user(
+            username="student", password="pass12345", role='student'
+        )
+        cls.category = Category.objects.create(name="Programming")
+
+    def setUp(self):
+        self.course = Course.objects.create(
+            instructor=self.instructor,
+            title="Course",
+            description="Description",
+            category=self.category,
+            status='published',
+            is_approved=True
+        )
+        self.lessons = Lesson.objects.bulk_create([
+            Lesson(course=self.course, title=f"Lesson {i}", order=i)
+            for i in range(1, 5)
+        ])
+
+    def enroll(self):
+        self.client.force_login(self.student)
+        self.client.get(reverse('enroll_course', args=[self.course.id]))
+        return Enrollment.objects.get(student=self.student, course=self.course)
+
+    def test_enroll_sets_total_lessons(self):
+        enrollment = self.enroll()
+
+        self.assertEqual(enrollment.total_lessons, 4)
+        self.assertEqual(enrollment.completed_lessons, 0)
+
+    def test_enroll_seeds_progress_in_constant_queries(self):
+        Lesson.objects.bulk_create([
+            Lesson(course=self.course, title=f"Extra {i}", order=i)
+            for i in range(5, 101)
+        ])
+        self.client.force_login(self.student)
+
+        # session, user, course, lesson IDs, enrollment get + insert,
+        # one progress insert, plus savepoints: none of it per lesson
+        with self.assertNumQueries(11):
+            self.client.get(reverse('enroll_course', args=[self.course.id]))
+
+        enrollment = Enrollment.objects.get(student=self.student, course=self.course)
+        self.assertEqual(enrollment.total_lessons, 100)
+        self.assertEqual(enrollment.lessonprogress_set.count(), 100)
+
+    def test_reenroll_fills_missing_progress(self):
+        enrollment = self.enroll()
+        LessonProgress.objects.filter(enrollment=enrollment, lesson=self.lessons[2]).delete()
+
+        self.enroll()
+
+        self.assertEqual(enrollment.lessonprogress_set.count(), 4)
+
+    def test_new_lesson_backfills_progress(self):
+        enrollment = self.enroll()
+
+        self.client.force_login(self.instructor)
+        self.client.post(
+            reverse('instructor_add_lessons', args=[self.course.id]),
+            {'title': "Lesson 5", 'order': 5}
+        )
+
+        self.assertTrue(
+            enrollment.lessonprogress_set.filter(lesson__title="Lesson 5").exists()
+        )
+
+    def test_mark_complete_increments_once(self):
+        enrollment = self.enroll()
+        url = reverse('mark_lesson_complete', args=[self.lessons[0].id])
+
+        self.client.post(url)
+        self.client.post(url)
+
+        enrollment.refresh_from_db()
+        self.assertEqual(enrollment.completed_lessons, 1)
+        self.assertEqual(enrollment.progress_percent(), 25)
+
+    def test_add_and_delete_lesson_update_totals(self):
+        enrollment = self.enroll()
+        progress = LessonProgress.objects.get(
+            enrollment=enrollment, lesson=self.lessons[3]
+        )
+        counters.mark_progress_completed(progress)
+
+        self.client.force_login(self.instructor)
+        self.client.post(
+            reverse('instructor_add_lessons', args=[self.course.id]),
+            {'title': "Lesson 5", 'order': 5}
+        )
+        enrollment.refresh_from_db()
+        self.assertEqual(enrollment.total_lessons, 5)
+
+        self.client.get(
+            reverse('instructor_delete_lesson', args=[self.course.id, self.lessons[3].id])
+        )
+        enrollment.refresh_from_db()
+        self.assertEqual(enrollment.total_lessons, 4)
+        self.assertEqual(enrollment.completed_lessons, 0)
+
+    def test_orm_lesson_changes_update_counters(self):
+        enrollment = self.enroll()
+        counters.mark_progress_completed(
+            LessonProgress.objects.get(enrollment=enrollment, lesson=self.lessons[3])
+        )
+
+        # As LessonAdmin saves and deletes, without the instructor views
+        lesson = Lesson.objects.create(course=self.course, title="Lesson 5", order=5)
+        enrollment.refresh_from_db()
+        self.assertEqual(enrollment.total_lessons, 5)
+        self.assertTrue(enrollment.lessonprogress_set.filter(lesson=lesson).exists())
+
+        self.lessons[3].delete()
+        enrollment.refresh_from_db()
+        self.assertEqual(enrollment.total_lessons, 4)
+        self.assertEqual(enrollment.completed_lessons, 0)
+
+    def test_course_delete_cascades_past_the_lesson_signals(self):
+        self.enroll()
+
+        self.course.delete()
+
+        self.assertFalse(Enrollment.objects.exists())
+
+    def test_rebuild_command_repairs_drift(self):
+        enrollment = self.enroll()
+        LessonProgress.objects.filter(
+            enrollment=enrollment, lesson__in=self.lessons[:2]
+        ).update(completed=True)
+        Enrollment.objects.filter(pk=enrollment.pk).update(
+            total_lessons=99, completed_lessons=7
+        )
+
+        call_command('rebuild_progress_counters', stdout=StringIO())
+
+        enrollment.refresh_from_db()
+        self.assertEqual(enrollment.total_lessons, 4)
+        self.assertEqual(enrollment.completed_lessons, 2)
+
+    def test_student_dashboard_reads_counters(self):
+        self.enroll()
+        url = reverse('student_dashboard')
+
+        with self.assertNumQueries(4):
+            self.client.get(url)
+
+        for i in range(3):
+            course = Course.objects.create(
+                instructor=self.instructor, title=f"Extra {i}",
+                description="Description", category=self.category,
+                status='published', is_approved=True
+            )
+            Enrollment.objects.create(student=self.student, course=course)
+
+        with self.assertNumQueries(4):
+            self.client.get(url)
+
+
+class UnlockedOrderTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        instructor = User.objects.create_user(
+            username="teacher", password="pass12345",
+            role='instructor', is_approved=True
+        )
+        cls.student = User.objects.create_user(
+            username="student", password="pass12345", role='student'
+        )
+        cls.course = Course.objects.create(
+            instructor=instructor, title="Course", description="Description",
+            status='published', is_approved=True
+        )
+        cls.lessons = Lesson.objects.bulk_create([
+            Lesson(course=cls.course, title=f"Lesson {i}", order=i * 10)
+            for i in range(1, 4)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.student)
+        self.client.get(reverse('enroll_course', args=[self.course.id]))
+        self.enrollment = Enrollment.objects.get(student=self.student, course=self.course)
+
+    def complete(self, lesson):
+        self.client.post(reverse('mark_lesson_complete', args=[lesson.id]))
+        self.enrollment.refresh_from_db()
+
+    def test_completing_the_frontier_advances_it(self):
+        self.assertEqual(self.enrollment.unlocked_order, 10)
+
+        self.complete(self.lessons[2])  # locked, ignored
+        self.assertEqual(self.enrollment.unlocked_order, 10)
+
+        self.complete(self.lessons[0])
+        self.assertEqual(self.enrollment.unlocked_order, 20)
+
+        self.complete(self.lessons[1])
+        self.complete(self.lessons[2])
+        self.assertEqual(self.enrollment.unlocked_order, 30)
+        self.assertEqual(self.enrollment.completed_lessons, 3)
+
+    def test_player_checks_locks_against_the_stored_order(self):
+        url = reverse('lesson_player', args=[self.course.id, self.lessons[2].id])
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        Enrollment.objects.filter(pk=self.enrollment.pk).update(unlocked_order=30)
+
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_lesson_changes_recompute_the_course(self):
+        for lesson in self.lessons:
+            self.complete(lesson)
+
+        # Lesson signals recompute it, whichever path made the change
+        Lesson.objects.create(course=self.course, title="Lesson 4", order=40)
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.unlocked_order, 40)
+
+        Enrollment.objects.filter(pk=self.enrollment.pk).update(unlocked_order=None)
+        self.enrollment.refresh_from_db()
+        self.assertTrue(gating.is_locked(self.enrollment, Lesson(order=50)))
+        self.assertEqual(self.enrollment.unlocked_order, 40)
+
+
+    def test_orm_lesson_changes_recompute_the_course(self):
+        self.complete(self.lessons[0])
+        self.assertEqual(self.enrollment.unlocked_order, 20)
+
+        self.lessons[2].order = 5
+        self.lessons[2].save()
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.unlocked_order, 5)
+
+        self.lessons[2].delete()
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.unlocked_order, 20)
+
+    def test_first_lesson_of_an_empty_course_opens(self):
+        course = Course.objects.create(
+            instructor=self.course.instructor, title="Empty", description="Description",
+            status='published', is_approved=True
+        )
+        self.client.get(reverse('enroll_course', args=[course.id]))
+        lesson = Lesson.objects.create(course=course, title="Lesson 1", order=1)
+
+        response = self.client.get(reverse('lesson_player', args=[course.id, lesson.id]))
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_player_redirects_to_the_course_when_no_lesson_is_open(self):
+        Enrollment.objects.filter(pk=self.enrollment.pk).update(unlocked_order=0)
+
+        response = self.client.get(
+            reverse('lesson_player', args=[self.course.id, self.lessons[0].id])
+        )
+
+        self.assertRedirects(
+            response,
+            reverse('course_detail', args=[self.course.id]),
+            fetch_redirect_response=False
+        )
+
+
+class CohortEnrollmentTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        instructor = User.objects.create_user(
+            username="teacher", password="pass12345",
+            role='instructor', is_approved=True
+        )
+        cls.admin = User.objects.create_user(
+            username="admin", password="pass12345", role='admin'
+        )
+        cls.course = Course.objects.create(
+            instructor=instructor, title="Course", description="Description",
+            status='published', is_approved=True
+        )
+        Lesson.objects.bulk_create([
+            Lesson(course=cls.course, title=f"Lesson {i}", order=i)
+            for i in range(1, 4)
+        ])
+        User.objects.bulk_create([
+            User(username=f"student{i}", role='student') for i in range(30)
+        ])
+
+    def post(self, body, content_type='application/x-ndjson'):
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('bulk_enroll'), body, content_type=content_type)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_jsonl_report_has_a_status_per_row(self):
+        body = "\n".join([
+            json.dumps({'username': "student0", 'course_id': self.course.id}),
+            json.dumps({'username': "student0", 'course_id': self.course.id}),
+            json.dumps({'username': "nobody", 'course_id': self.course.id}),
+            json.dumps({'username': "teacher", 'course_id': self.course.id}),
+            json.dumps({'username': "student1", 'course_id': 999}),
+            "not json",
+        ])
+
+        response, content = self.post(body)
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(
+            [json.loads(line)['status'] for line in content.splitlines()],
+            ['enrolled', 'duplicate', 'unknown_user', 'not_student', 'unknown_course', 'invalid']
+        )
+        enrollment = Enrollment.objects.get(student__username="student0")
+        self.assertEqual(enrollment.total_lessons, 3)
+        self.assertEqual(enrollment.lessonprogress_set.count(), 3)
+
+    def test_batches_query_a_fixed_number_of_times(self):
+        body = "username,course_id\n" + "".join(
+            f"student{i},{self.course.id}\n" for i in range(30)
+        )
+        rows = list(cohort.parse_rows(body.splitlines(keepends=True), 'csv'))
+
+        # users, courses, existing, insert, read back, progress,
+        # plus the transaction savepoint pair
+        with self.assertNumQueries(8):
+            results = list(cohort.enroll_rows(rows))
+
+        self.assertEqual({r['status'] for r in results}, {'enrolled'})
+        self.assertEqual(LessonProgress.objects.count(), 90)
+
+        _, report = self.post(body, content_type='text/csv')
+        self.assertEqual(report.splitlines()[0], "line,username,course_id,status,enrollment_id")
+        self.assertEqual(report.count("already_enrolled"), 30)
+
+    def test_admins_only(self):
+        student = User.objects.get(username="student0")
+        self.client.force_login(student)
+
+        response = self.client.post(
+            reverse('bulk_enroll'), "username,course_id\n", content_type='text/csv'
+        )
+
+        self.assertEqual(response.status_code, 403)
+
+
+class SyntheticDataTests(TestCase):
+
+    def generate(self, **options):
+        out = StringIO()
+        call_command(
+            'generate_synthetic_data', '--students=20', '--courses=5',
+            *[f'--{key}={value}' for key, value in options.items()], stdout=out
+        )
+        return out.getvalue()
+
+    def test_counters_match_progress_rows(self):
+        output = self.generate()
+
+        self.assertIn("Generated 21 users, 5 courses, 60 enrollments", output)
+        self.assertEqual(Course.objects.count(), 5)
+        self.assertEqual(Lesson.objects.count(), 50)
+        for enrollment in Enrollment.objects.all():
+            self.assertEqual(
+                enrollment.completed_lessons,
+                enrollment.lessonprogress_set.filter(completed=True).count()
+            )
+
+    def test_same_seed_same_data(self):
+        self.generate(prefix='a')
+        first = list(Enrollment.objects.order_by('id').values_list('course_id', 'completed_lessons'))
+        self.generate(prefix='b')
+        second = list(Enrollment.objects.order_by('id').values_list('course_id', 'completed_lessons'))[60:]
 
-# Create your tests here.
+        self.assertEqual(
+            [(c - 5, done) for c, done in second], first
+        )
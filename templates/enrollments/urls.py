@@ -5,4 +5,6 @@ urlpatterns = [
     path('pay/<int:course_id>/', views.pay_for_course, name='pay_for_course'),
 
     path('enroll/<int:course_id>/', views.enroll_course, name='enroll_course'),
+
+    path('bulk/', views.bulk_enroll, name='bulk_enroll'),
 ]
@@ -1,8 +1,13 @@
+import codecs
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from courses.models import Course, Lesson
-from .models import Enrollment, LessonProgress
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+from django.views.decorators.http import require_POST
+from courses.models import Course
 from .models import Payment
+from . import cohort, seeding
 
 @login_required(login_url='/accounts/login/')
 def pay_for_course(request, course_id):
@@ -16,10 +21,7 @@ def pay_for_course(request, course_id):
         transaction_id='TXN' + str(course.id) + str(request.user.id)
     )
 
-    Enrollment.objects.get_or_create(
-    student_id=request.user.id,
-    course_id=course.id
-)
+    seeding.enroll(request.user, course)
 
     
     return redirect('course_detail', pk=course.id)
@@ -29,17 +31,55 @@ def pay_for_course(request, course_id):
 def enroll_course(request, course_id):
     course = get_object_or_404(Course, id=course_id)
 
-    enrollment, created = Enrollment.objects.get_or_create(
-        student=request.user,
-        course=course
-    )
+    # Enrollment plus a progress row per lesson, in bulk
+    seeding.enroll(request.user, course)
+
+    return redirect('course_detail', pk=course.id)
+
+
+# ----------------------------
+# BULK COHORT ENROLLMENT
+# ----------------------------
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
 
-    # auto-create progress rows
-    lessons = Lesson.objects.filter(course=course)
-    for lesson in lessons:
-        LessonProgress.objects.get_or_create(
-            enrollment=enrollment,
-            lesson=lesson
+def _cohort_format(request, upload):
+    fmt = request.GET.get('format')
+    if not fmt and upload is not None:
+        fmt = upload.name.rsplit('.', 1)[-1].lower()
+    if not fmt:
+        content_type = request.content_type
+        fmt = next(
+            (name for name, value in CONTENT_TYPES.items() if value == content_type),
+            None
         )
+    return fmt if fmt in cohort.FORMATS else None
 
-    return redirect('course_detail', pk=course.id)
+
+@login_required(login_url='/accounts/login/')
+@require_POST
+def bulk_enroll(request):
+    """
+    Enroll a cohort from an uploaded file (field "file") or a raw
+    text/csv or application/x-ndjson body. The per-row report is
+    streamed back in the same format while the input is processed.
+    """
+    if request.user.role != 'admin':
+        raise PermissionDenied("Admins only.")
+
+    upload = request.FILES.get('file')
+    fmt = _cohort_format(request, upload)
+    if fmt is None:
+        return HttpResponseBadRequest("Send CSV or JSONL, or pass ?format=csv|jsonl.")
+
+    lines = codecs.iterdecode(upload if upload is not None else request, 'utf-8')
+    results = cohort.enroll_rows(cohort.parse_rows(lines, fmt))
+
+    return StreamingHttpResponse(
+        cohort.report_lines(results, fmt),
+        content_type=CONTENT_TYPES[fmt]
+    )